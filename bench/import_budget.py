@@ -0,0 +1,60 @@
+from __future__ import annotations
+import argparse
+import json
+import subprocess
+import sys
+from pathlib import Path
+from typing import List, Optional
+
+# Kontrola studeného startu: v čistém interpretu naimportuje moduly, které potřebuje
+# přihlašovací obrazovka, a ověří, že (a) se nenačetly těžké knihovny, které mají
+# přijít až s otevřením tabulek / reportu, a (b) import aplikačních modulů se vejde
+# do časového rozpočtu. Knihovny, které si natáhne už samotný streamlit, se nepočítají.
+#   python -m bench.import_budget --budget-ms 150
+ROOT = Path(__file__).resolve().parent.parent
+STARTUP_MODULES = ["modules.perf", "modules.metrics", "modules.auth", "modules.report"]
+DEFERRED = ["pandas", "openpyxl", "bcrypt", "PIL", "modules.tables", "modules.dashboard", "modules.report.main",
+            "modules.report.storage", "concurrent.futures.process"]
+
+_PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+import streamlit
+t1 = time.perf_counter()
+base = set(sys.modules)
+for name in {startup!r}:
+    __import__(name)
+t2 = time.perf_counter()
+print(json.dumps({{"streamlit_ms": (t1 - t0) * 1000, "app_ms": (t2 - t1) * 1000,
+                  "loaded": [m for m in {deferred!r} if m in sys.modules and m not in base],
+                  "by_streamlit": [m for m in {deferred!r} if m in base],
+                  "new_modules": len(set(sys.modules) - base)}}))
+"""
+
+def probe() -> dict:
+    code = _PROBE.format(startup=STARTUP_MODULES, deferred=DEFERRED)
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Rozpočet doby importu při studeném startu.")
+    ap.add_argument("--budget-ms", type=float, default=150.0, help="limit pro import aplikačních modulů")
+    ap.add_argument("--runs", type=int, default=5, help="počet měření (bere se medián)")
+    a = ap.parse_args(argv)
+    runs = [probe() for _ in range(a.runs)]
+    app_ms = sorted(r["app_ms"] for r in runs)[len(runs) // 2]
+    st_ms = sorted(r["streamlit_ms"] for r in runs)[len(runs) // 2]
+    loaded = sorted({m for r in runs for m in r["loaded"]})
+    print(f"streamlit: {st_ms:.1f} ms, aplikační moduly: {app_ms:.1f} ms (rozpočet {a.budget_ms:.0f} ms), "
+          f"nových modulů: {runs[0]['new_modules']}")
+    if runs[0]["by_streamlit"]:
+        print(f"Načteno už streamlitem (nepočítá se): {', '.join(runs[0]['by_streamlit'])}")
+    ok = True
+    if loaded:
+        print(f"CHYBA: při startu se načetly odložené moduly: {', '.join(loaded)}"); ok = False
+    if app_ms > a.budget_ms:
+        print("CHYBA: import aplikačních modulů překročil rozpočet."); ok = False
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
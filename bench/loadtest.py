@@ -0,0 +1,177 @@
+from __future__ import annotations
+import argparse
+import datetime as dt
+import json
+import os
+import resource
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# Zátěžový test: N virtuálních vyšetřovatelů souběžně prochází app.py přes
+# streamlit.testing.v1.AppTest (přihlášení -> Požáry -> nový report -> úpravy
+# všech záložek -> uložení). Všechny relace běží v jednom procesu jako na jednom
+# serveru; měří se latence kroků (p50/p95/p99) a CPU / RSS procesu.
+#   python -m bench.loadtest --users 10 --iterations 3
+ROOT = Path(__file__).resolve().parent.parent
+APP = ROOT / "app.py"
+RESULTS_DIR = ROOT / "bench" / "results"
+PASSWORD = "zatez-heslo"
+
+_lock = threading.Lock()
+_lat: Dict[str, List[float]] = defaultdict(list)
+_errors: Dict[str, int] = defaultdict(int)
+
+def _find(elements, label: Optional[str] = None, key: Optional[str] = None):
+    for el in elements:
+        if (key is not None and el.key == key) or (label is not None and el.label == label):
+            return el
+    raise LookupError(f"prvek {label or key!r} nenalezen")
+
+def _step(name: str, at, action) -> None:
+    t0 = time.perf_counter()
+    try:
+        action()
+        at.run()
+        if at.exception:
+            raise RuntimeError(at.exception[0].message)
+    except Exception:
+        with _lock: _errors[name] += 1
+        raise
+    finally:
+        with _lock: _lat[name].append((time.perf_counter() - t0) * 1000)
+
+def virtual_user(oec: str, iterations: int, timeout: float) -> None:
+    from streamlit.testing.v1 import AppTest
+    from modules.report.utils import ui_key
+    at = AppTest.from_file(str(APP), default_timeout=timeout)
+    _step("open", at, lambda: None)
+    _step("login", at, lambda: (_find(at.sidebar.text_input, label="OEČ").input(oec),
+                                _find(at.sidebar.text_input, label="Heslo").input(PASSWORD),
+                                _find(at.sidebar.button, label="Přihlásit se").click()))
+    _step("nav.pozary", at, lambda: _find(at.button, key="btn_pozary").click())
+    _step("nav.report", at, lambda: _find(at.button, key="pozary_report").click())
+    for it in range(iterations):
+        _step("report.new", at, lambda: _find(at.sidebar.button, label="➕ Založit nový report").click())
+        rid = at.session_state["current_report_id"]
+        k = lambda prefix: ui_key(prefix, rid)
+        _step("edit.event", at, lambda: _find(at.text_input, key=k("addr_obec")).input(f"Obec {it}"))
+        _step("edit.conditions", at, lambda: _find(at.text_input, key=k("cond_w")).input("zataženo"))
+        _step("edit.participants.add", at, lambda: _find(at.button, key=f"add_owners_{rid}").click())
+        _step("edit.participants", at,
+              lambda: _find(at.text_input, key=f"owners_0_fo_jmeno_{rid}").input("Jan"))
+        _step("edit.witnesses", at, lambda: _find(at.text_area, key=k("wit")).input("Svědek viděl kouř. " * 20))
+        _step("edit.sketch", at, lambda: _find(at.text_area, key=k("sketch_note")).input("Sever nahoře, 1:100"))
+        _step("edit.notes", at, lambda: _find(at.text_area, key=f"notes_{rid}").input("Poznámka " * 30))
+        _step("report.save", at, lambda: _find(at.button, label="💾 Uložit průběh").click())
+
+def _pct(s: List[float], q: float) -> float:
+    return s[min(len(s) - 1, int(round(q * (len(s) - 1))))] if s else 0.0
+
+def _rss_mb() -> float:
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 1e6
+    except ImportError:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+
+class Sampler(threading.Thread):
+    """Každých `interval` s zaznamená RSS a vytížení CPU procesu (100 % = jedno jádro)."""
+    def __init__(self, interval: float = 0.5):
+        super().__init__(name="loadtest-sampler", daemon=True)
+        self.interval, self.samples = interval, []
+        self._halt = threading.Event()
+
+    def run(self) -> None:
+        last_cpu, last_t = time.process_time(), time.perf_counter()
+        while not self._halt.wait(self.interval):
+            cpu, t = time.process_time(), time.perf_counter()
+            self.samples.append({"t": round(t, 2), "cpu_pct": round((cpu - last_cpu) / (t - last_t) * 100, 1),
+                                 "rss_mb": round(_rss_mb(), 1)})
+            last_cpu, last_t = cpu, t
+
+    def stop(self) -> None:
+        self._halt.set(); self.join()
+
+def _prepare_users(n: int) -> List[str]:
+    from bench import synth
+    from modules import auth
+    oecs = synth.make_users(n + 1, auth.USERS_DB_PATH, auth._hash_password(PASSWORD))
+    return oecs[1:]   # první je admin
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Zátěžový test souběžných vyšetřovatelů (AppTest).")
+    ap.add_argument("--users", type=int, default=10, help="počet souběžných virtuálních uživatelů")
+    ap.add_argument("--iterations", type=int, default=3, help="reportů na uživatele")
+    ap.add_argument("--ramp", type=float, default=5.0, help="rozložení startů uživatelů [s]")
+    ap.add_argument("--timeout", type=float, default=60.0, help="limit jednoho rerunu [s]")
+    ap.add_argument("--out", type=Path, default=None)
+    a = ap.parse_args(argv)
+
+    sys.path.insert(0, str(ROOT))
+    cwd = os.getcwd()
+    failures: List[str] = []
+    with tempfile.TemporaryDirectory(prefix="zpp-load-") as work:
+        os.chdir(work)   # reports/ a data/ vzniknou v dočasné složce
+        try:
+            oecs = _prepare_users(a.users)
+            sampler = Sampler(); sampler.start()
+            t0 = time.perf_counter()
+
+            def _run(oec: str) -> None:
+                try: virtual_user(oec, a.iterations, a.timeout)
+                except Exception as e:
+                    with _lock: failures.append(f"{oec}: {e}")
+
+            threads = []
+            for i, oec in enumerate(oecs):
+                th = threading.Thread(target=_run, args=(oec,), name=f"vu-{i}")
+                th.start(); threads.append(th)
+                time.sleep(a.ramp / max(1, a.users))
+            for th in threads: th.join()
+            wall = time.perf_counter() - t0
+            sampler.stop()
+        finally:
+            os.chdir(cwd)
+
+    steps = {}
+    for name, vals in _lat.items():
+        s = sorted(vals)
+        steps[name] = {"count": len(s), "errors": _errors.get(name, 0), "p50_ms": round(_pct(s, .5), 1),
+                       "p95_ms": round(_pct(s, .95), 1), "p99_ms": round(_pct(s, .99), 1),
+                       "max_ms": round(s[-1], 1), "mean_ms": round(statistics.fmean(s), 1)}
+    cpu = [x["cpu_pct"] for x in sampler.samples] or [0.0]
+    rss = [x["rss_mb"] for x in sampler.samples] or [_rss_mb()]
+    out: Dict[str, Any] = {
+        "meta": {"created": dt.datetime.now().isoformat(timespec="seconds"), "users": a.users,
+                 "iterations": a.iterations, "ramp_s": a.ramp, "wall_s": round(wall, 2),
+                 "failed_users": len(failures)},
+        "steps": steps,
+        "process": {"cpu_pct_mean": round(statistics.fmean(cpu), 1), "cpu_pct_max": max(cpu),
+                    "rss_mb_max": max(rss), "rss_mb_last": rss[-1],
+                    "maxrss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)},
+        "samples": sampler.samples,
+        "failures": failures,
+    }
+    print(f"{'krok':26s} {'počet':>6s} {'chyby':>6s} {'p50':>9s} {'p95':>9s} {'p99':>9s} {'max':>9s}")
+    for name, r in steps.items():
+        print(f"{name:26s} {r['count']:6d} {r['errors']:6d} {r['p50_ms']:9.1f} {r['p95_ms']:9.1f} "
+              f"{r['p99_ms']:9.1f} {r['max_ms']:9.1f}")
+    p = out["process"]
+    print(f"\n{a.users} uživatelů, {wall:.1f} s; CPU průměr {p['cpu_pct_mean']} % / max {p['cpu_pct_max']} %, "
+          f"RSS max {p['rss_mb_max']} MB")
+    for f in failures[:10]: print(f"  CHYBA {f}")
+    path = a.out or RESULTS_DIR / f"loadtest_{dt.datetime.now():%Y%m%dT%H%M%S}_{a.users}u.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(out, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"Výsledky: {path}")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
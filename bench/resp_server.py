@@ -0,0 +1,91 @@
+from __future__ import annotations
+import argparse
+import socketserver
+import sys
+import threading
+from pathlib import Path
+from typing import List, Optional
+
+# Zástupný server s protokolem Redis (RESP2) pro zkoušky více replik bez Redisu.
+# Umí jen příkazy, které používá modules.shared (GET, SET s PX/EX/NX/XX, DEL, PEXPIRE,
+# PTTL) a pár obslužných (PING, AUTH, SELECT, FLUSHALL); data drží shared.MemoryBackend.
+#   python -m bench.resp_server --port 6390
+#   ZPP_SHARED_URL=redis://127.0.0.1:6390/0 streamlit run app.py --server.port 8501   (a 8502, …)
+ROOT = Path(__file__).resolve().parent.parent
+
+def _bulk(v: Optional[str]) -> bytes:
+    if v is None: return b"$-1\r\n"
+    b = v.encode("utf-8")
+    return b"$%d\r\n%s\r\n" % (len(b), b)
+
+def _read_command(f) -> Optional[List[str]]:
+    line = f.readline()
+    if not line: return None
+    if not line.startswith(b"*"):              # inline příkaz (telnet / redis-cli ping)
+        return line.decode("utf-8").split()
+    args = []
+    for _ in range(int(line[1:-2])):
+        n = int(f.readline()[1:-2])
+        args.append(f.read(n + 2)[:-2].decode("utf-8"))
+    return args
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        while True:
+            try: args = _read_command(self.rfile)
+            except (OSError, ValueError): return
+            if args is None: return
+            if not args: continue
+            try: out = self.server.execute(args)
+            except Exception as e: out = f"-ERR {e}\r\n".encode()
+            try: self.wfile.write(out)
+            except OSError: return
+
+class RespServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 6390):
+        from modules.shared import MemoryBackend
+        super().__init__((host, port), _Handler)
+        self.store = MemoryBackend()
+
+    def execute(self, args: List[str]) -> bytes:
+        cmd, a, s = args[0].upper(), args[1:], self.store
+        if cmd == "PING": return b"+PONG\r\n"
+        if cmd in ("AUTH", "SELECT"): return b"+OK\r\n"
+        if cmd == "FLUSHALL":
+            with s._lock: s._data.clear()
+            return b"+OK\r\n"
+        if cmd == "GET": return _bulk(s.get(a[0]))
+        if cmd == "SET":
+            opts = [x.upper() for x in a[2:]]
+            ttl = None
+            if "PX" in opts: ttl = int(a[2 + opts.index("PX") + 1])
+            if "EX" in opts: ttl = int(a[2 + opts.index("EX") + 1]) * 1000
+            ok = s.set(a[0], a[1], ttl, nx="NX" in opts, xx="XX" in opts)
+            return b"+OK\r\n" if ok else b"$-1\r\n"
+        if cmd == "DEL": return b":%d\r\n" % sum(s.delete(k) for k in a)
+        if cmd == "PEXPIRE": return b":%d\r\n" % int(s.pexpire(a[0], int(a[1])))
+        if cmd == "PTTL": return b":%d\r\n" % s.pttl(a[0])
+        return f"-ERR unknown command '{args[0]}'\r\n".encode()
+
+def start(host: str = "127.0.0.1", port: int = 0) -> RespServer:
+    """Spustí server ve vlákně (port 0 = volný port, viz server.server_address)."""
+    srv = RespServer(host, port)
+    threading.Thread(target=srv.serve_forever, name="resp-server", daemon=True).start()
+    return srv
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description="Zástupný RESP (Redis) server pro zkoušky replik.")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=6390)
+    a = ap.parse_args(argv)
+    sys.path.insert(0, str(ROOT))
+    srv = RespServer(a.host, a.port)
+    print(f"RESP server na {a.host}:{a.port} (Ctrl+C ukončí)")
+    try: srv.serve_forever()
+    except KeyboardInterrupt: pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+from __future__ import annotations
+import argparse
+import datetime as dt
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+# Benchmarky horkých cest (úložiště reportů, hledání v tabulkách, přihlášení).
+# Běží nad syntetickými daty v dočasné složce, výsledky se ukládají jako JSON
+# do bench/results/, takže lze porovnat dvě verze:
+#   python -m bench.run
+#   python -m bench.run --compare bench/results/<starší>.json
+ROOT = Path(__file__).resolve().parent.parent
+RESULTS_DIR = ROOT / "bench" / "results"
+
+def _stats(samples: List[float]) -> Dict[str, float]:
+    s = sorted(samples)
+    return {"runs": len(s), "min_ms": round(s[0], 3), "median_ms": round(statistics.median(s), 3),
+            "p95_ms": round(s[min(len(s) - 1, int(round(.95 * (len(s) - 1))))], 3),
+            "mean_ms": round(statistics.fmean(s), 3)}
+
+def measure(fn: Callable[[], Any], repeat: int, setup: Optional[Callable[[], Any]] = None) -> Dict[str, float]:
+    samples = []
+    for _ in range(repeat):
+        if setup: setup()
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return _stats(samples)
+
+def _git_rev() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or "unknown"
+    except Exception:
+        return "unknown"
+
+def run(reports: int, users: int, rows: int, repeat: int, seed: int = 1) -> Dict[str, Any]:
+    from bench import synth
+    from modules.report import storage
+    from modules import auth
+    from modules.tables import normalize_frame, query
+
+    rng = random.Random(seed)
+    res: Dict[str, Any] = {}
+    oecs = [f"{rng.randint(100000, 999999)}" for _ in range(max(1, reports // 150))]
+
+    t0 = time.perf_counter()
+    ids = synth.make_reports(reports, oecs, seed)
+    res["synth.make_reports_total"] = {"runs": 1, "total_ms": round((time.perf_counter() - t0) * 1000, 1),
+                                       "per_report_ms": round((time.perf_counter() - t0) * 1000 / max(1, reports), 3)}
+
+    sample = [rng.choice(ids) for _ in range(repeat)]
+    it = iter(sample * 2)
+    res["storage.read_json"] = measure(lambda: storage.read_json(storage.report_path(next(it))), repeat)
+    docs = {rid: storage.read_json(storage.report_path(rid)) for rid in set(sample)}
+    it = iter(sample * 2)
+    def _write():
+        rid = next(it)
+        storage.write_json(storage.report_path(rid), docs[rid])
+    res["storage.write_json"] = measure(_write, repeat)
+
+    busiest = max(oecs, key=lambda o: sum(1 for r in ids if r.endswith("_" + o)))
+    res["storage.list_reports_for.cold"] = measure(lambda: storage.list_reports_for(busiest),
+                                                  max(3, repeat // 10), setup=storage._meta_cache.clear)
+    res["storage.list_reports_for.warm"] = measure(lambda: storage.list_reports_for(busiest), repeat)
+
+    df = synth.make_table(rows)
+    t0 = time.perf_counter()
+    norm = normalize_frame(df)                  # v aplikaci jednou za verzi souboru (cache)
+    res["tables.normalize_frame"] = {"runs": 1, "total_ms": round((time.perf_counter() - t0) * 1000, 1)}
+    cols = list(df.columns)
+    res["tables.query.all_columns"] = measure(lambda: query(df, norm, cols, q_all="drevo plzen"), max(3, repeat // 10))
+    res["tables.query.name_column"] = measure(lambda: query(df, norm, cols, q_col="kabel", col_name="Název"),
+                                             max(3, repeat // 10))
+    res["tables.query.sorted"] = measure(lambda: query(df, norm, cols, q_all="plzen", sort_by="Bod vzplanutí [°C]"),
+                                        max(3, repeat // 10))
+
+    pw_hash = auth._hash_password("bench-heslo")
+    user_oecs = synth.make_users(users, auth.USERS_DB_PATH, pw_hash)
+    res["auth._load_db"] = measure(auth._load_db, repeat)
+    db = auth._load_db()
+    res["auth._find_user.last"] = measure(lambda: auth._find_user(db, user_oecs[-1]), repeat)
+    res["auth.bcrypt_verify"] = measure(lambda: auth._verify_password("bench-heslo", pw_hash), max(3, repeat // 20))
+    return res
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Vypíše poměr mediánů proti základní verzi; vrací seznam zpomalených benchmarků."""
+    slower = []
+    base = baseline.get("results", {})
+    print(f"\nPorovnání s {baseline.get('meta', {}).get('git', '?')} ({baseline.get('meta', {}).get('created', '?')}):")
+    for name, cur in current["results"].items():
+        old = base.get(name)
+        if not old or "median_ms" not in cur or not old.get("median_ms"): continue
+        ratio = cur["median_ms"] / old["median_ms"]
+        flag = "  <-- ZPOMALENÍ" if ratio > threshold else ""
+        print(f"  {name:38s} {old['median_ms']:10.3f} -> {cur['median_ms']:10.3f} ms  x{ratio:5.2f}{flag}")
+        if flag: slower.append(name)
+    return slower
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Benchmarky úložiště, hledání a přihlášení.")
+    ap.add_argument("--reports", type=int, default=3000)
+    ap.add_argument("--users", type=int, default=2000)
+    ap.add_argument("--rows", type=int, default=20000, help="řádků syntetické tabulky PTCH")
+    ap.add_argument("--repeat", type=int, default=50)
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--out", type=Path, default=None, help="soubor s výsledky (výchozí bench/results/<čas>_<git>.json)")
+    ap.add_argument("--compare", type=Path, default=None, help="starší výsledky k porovnání")
+    ap.add_argument("--threshold", type=float, default=1.25, help="poměr mediánů, od kterého jde o zpomalení")
+    a = ap.parse_args(argv)
+
+    sys.path.insert(0, str(ROOT))
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="zpp-bench-") as work:
+        os.chdir(work)   # reports/ a data/users/ jsou relativní cesty – data nezasáhnou pracovní kopii
+        try:
+            results = run(a.reports, a.users, a.rows, a.repeat, a.seed)
+        finally:
+            os.chdir(cwd)
+    out = {"meta": {"created": dt.datetime.now().isoformat(timespec="seconds"), "git": _git_rev(),
+                    "python": platform.python_version(), "platform": platform.platform(),
+                    "params": {"reports": a.reports, "users": a.users, "rows": a.rows,
+                               "repeat": a.repeat, "seed": a.seed}},
+           "results": results}
+    for name, r in results.items():
+        print(f"{name:40s} " + "  ".join(f"{k}={v}" for k, v in r.items()))
+    path = a.out or RESULTS_DIR / f"{dt.datetime.now():%Y%m%dT%H%M%S}_{out['meta']['git']}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(out, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"\nVýsledky: {path}")
+    if a.compare:
+        slower = compare(out, json.loads(a.compare.read_text(encoding="utf-8")), a.threshold)
+        return 1 if slower else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+from __future__ import annotations
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List, Optional
+
+# Kontrola sdíleného stavu replik: stejné scénáře (relace, verze dat, zámky úprav) proti
+# paměťovému backendu a proti RESP – zástupnému serveru (bench.resp_server), nebo
+# skutečnému Redisu přes --url. Dvě „repliky“ = dva nezávislé klienty.
+#   python -m bench.shared_check [--url redis://127.0.0.1:6379/0]
+ROOT = Path(__file__).resolve().parent.parent
+
+def _scenario(replica_a, replica_b) -> List[str]:
+    from modules import shared
+    fails: List[str] = []
+    def check(name: str, ok: bool) -> None:
+        if not ok: fails.append(name)
+
+    shared.configure(replica_a)
+    token = shared.create_session({"oec": "111111", "role": "user"}, fp="ua")
+    ttl = replica_a.pttl(f"{shared.PREFIX}sess:{token}")
+    shared.save_session(token, {"oec": "111111", "role": "user"}, {"current_report_id": "R1"}, fp="ua")
+    shared.configure(replica_b)
+    rec = shared.load_session(token)
+    check("relace je vidět z druhé repliky", bool(rec) and rec["state"].get("current_report_id") == "R1")
+    check("otisk klienta zůstává", bool(rec) and rec.get("fp") == "ua")
+    check("uložení relaci neprodlouží", 0 < replica_b.pttl(f"{shared.PREFIX}sess:{token}") <= ttl)
+    check("neznámý token", shared.load_session("neexistuje") is None)
+
+    before = shared.version("report", "R1")
+    shared.configure(replica_a)
+    ver = shared.bump("report", "R1", by="a")
+    shared.configure(replica_b)
+    check("verze reportu se změnila", shared.version("report", "R1") == ver != before)
+    check("autor změny je ve verzi", ver.endswith(":a"))
+
+    lock = shared.report_lock("R1")
+    shared.configure(replica_a)
+    check("A získá zámek", shared.acquire_lock(lock, "A", {"oec": "111111"}) == (None, True))
+    check("A zámek prodlouží", shared.acquire_lock(lock, "A") == (None, False))
+    shared.configure(replica_b)
+    holder, _ = shared.acquire_lock(lock, "B")
+    check("B vidí držitele A", bool(holder) and holder.get("owner") == "A" and holder.get("oec") == "111111")
+    shared.release_lock(lock, "B")
+    check("cizí uvolnění zámek nezruší", (shared.lock_holder(lock) or {}).get("owner") == "A")
+    check("B zámek převezme", shared.acquire_lock(lock, "B", force=True) == (None, True))
+    shared.configure(replica_a)
+    check("A už zámek nemá", (shared.acquire_lock(lock, "A")[0] or {}).get("owner") == "B")
+    shared.configure(replica_b)
+    shared.release_lock(lock, "B")
+    check("zámek uvolněn", shared.lock_holder(lock) is None)
+
+    shared.drop_session(token)
+    check("relace smazána", shared.load_session(token) is None)
+    return fails
+
+def _timed(label: str, fn: Callable[[], List[str]]) -> bool:
+    t0 = time.perf_counter()
+    fails = fn()
+    print(f"{label}: {'OK' if not fails else 'CHYBA'} ({(time.perf_counter() - t0) * 1000:.1f} ms)")
+    for f in fails: print(f"  ✗ {f}")
+    return not fails
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Kontrola sdíleného stavu replik (relace, verze, zámky).")
+    ap.add_argument("--url", help="skutečný server redis://…; jinak se spustí zástupný server")
+    a = ap.parse_args(argv)
+    sys.path.insert(0, str(ROOT))
+    from modules import shared
+    ok = _timed("paměť procesu", lambda: _scenario(*(2 * [shared.MemoryBackend()])))
+    srv = None
+    if a.url:
+        url = a.url
+    else:
+        from bench import resp_server
+        srv = resp_server.start()
+        url = "redis://%s:%d/0" % srv.server_address
+    ok = _timed(f"RESP {url}", lambda: _scenario(shared.RespBackend(url), shared.RespBackend(url))) and ok
+    if srv: srv.shutdown()
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
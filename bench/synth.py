@@ -0,0 +1,86 @@
+from __future__ import annotations
+import datetime as dt
+import json
+import random
+from pathlib import Path
+from typing import Any, Dict, List
+
+# Syntetická data pro benchmarky – deterministická (seed), ve tvaru, který ukládá aplikace.
+SYNTH_END = dt.datetime(2025, 6, 30, 12, 0)   # pevný konec období – stejná data při každém běhu
+FIRST = ["Jan", "Petr", "Pavel", "Tomáš", "Jiří", "Eva", "Jana", "Marie", "Lucie", "Kateřina"]
+LAST = ["Novák", "Svoboda", "Novotný", "Dvořák", "Černý", "Procházka", "Kučera", "Veselý", "Horák", "Němec"]
+TOWNS = ["Plzeň", "Rokycany", "Klatovy", "Domažlice", "Tachov", "Stříbro", "Sušice", "Nepomuk", "Blovice", "Přeštice"]
+STREETS = ["Hlavní", "Nádražní", "Školní", "Polní", "Zahradní", "Husova", "Komenského", "Sokolská"]
+REGIONS = ["Plzeňský", "Karlovarský", "Jihočeský", "Středočeský"]
+MATERIALS = ["dřevo", "kabel", "PVC", "seno", "sláma", "textil", "papír", "polystyren", "olej", "benzín"]
+
+def _person(rng: random.Random) -> Dict[str, Any]:
+    return {"typ": "Fyzická osoba", "jmeno": rng.choice(FIRST), "prijmeni": rng.choice(LAST),
+            "narozeni": f"{rng.randint(1940, 2005)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            "bydliste": f"{rng.choice(STREETS)} {rng.randint(1, 300)}, {rng.choice(TOWNS)}",
+            "op": f"{rng.randint(100000000, 999999999)}"}
+
+def make_report(rid: str, oec: str, rng: random.Random, created: dt.datetime) -> Dict[str, Any]:
+    from modules.report import storage
+    d = storage.ensure_skeleton(rid, oec)
+    d["meta"]["created"] = created.isoformat(timespec="seconds")
+    d["meta"]["title"] = f"Požár {rng.choice(MATERIALS)} – {rng.choice(TOWNS)}"
+    ev = d["event"]
+    ev["datum_vzniku"] = created.date().isoformat()
+    ev["adresa"].update(kraj=rng.choice(REGIONS), obec=rng.choice(TOWNS), ulice=rng.choice(STREETS),
+                        cp=str(rng.randint(1, 300)), psc=f"3{rng.randint(1000, 9999)}")
+    ev["gps"].update(lat=round(49.2 + rng.random() * 0.8, 6), lon=round(12.6 + rng.random() * 1.2, 6))
+    d["conditions"].update(weather=rng.choice(["jasno", "zataženo", "déšť", "sníh"]),
+                           temperature_c=rng.randint(-15, 35), visibility="dobrá")
+    d["participants"]["owners"] = [_person(rng) for _ in range(rng.randint(1, 3))]
+    d["participants"]["users"] = [_person(rng) for _ in range(rng.randint(0, 3))]
+    d["witnesses"] = " ".join(rng.choice(MATERIALS) for _ in range(rng.randint(20, 120)))
+    d["notes"] = " ".join(rng.choice(MATERIALS + TOWNS) for _ in range(rng.randint(10, 80)))
+    d["attachments"] = [{"type": "sketch", "name": f"foto_{i}.jpg", "file": f"reports/{rid}/foto_{i}.jpg",
+                         "uploaded": d["meta"]["created"], "size": rng.randint(200_000, 4_000_000),
+                         "sha256": f"{rng.getrandbits(256):064x}"} for i in range(rng.randint(0, 8))]
+    return d
+
+def report_id(oec: str, created: dt.datetime, rng: random.Random) -> str:
+    """ID reportu (ULID) z času založení a seedovaného generátoru – report leží ve složce svého měsíce."""
+    from modules.report import storage
+    ms = int(created.replace(tzinfo=dt.timezone.utc).timestamp() * 1000)
+    return f"{storage._b32(ms, 10)}{storage._b32(rng.getrandbits(80), 16)}_{oec}"
+
+def make_reports(n: int, oecs: List[str], seed: int = 1, end: dt.datetime = SYNTH_END) -> List[str]:
+    """Zapíše `n` reportů (rozložených do dvou let před `end`) přes storage.write_json; vrací jejich ID."""
+    from modules.report import storage
+    rng = random.Random(seed)
+    ids = []
+    for _ in range(n):
+        oec = rng.choice(oecs)
+        created = end - dt.timedelta(minutes=rng.randint(0, 2 * 365 * 24 * 60))
+        rid = report_id(oec, created, rng)
+        storage.write_json(storage.report_path(rid), make_report(rid, oec, rng, created))
+        ids.append(rid)
+    return ids
+
+def make_table(rows: int, seed: int = 2):
+    """Tabulka ve tvaru listu PTCH (Název + popisné sloupce)."""
+    import pandas as pd
+    rng = random.Random(seed)
+    return pd.DataFrame({
+        "Název": [f"{rng.choice(MATERIALS).capitalize()} {rng.choice(TOWNS)} {i}" for i in range(rows)],
+        "Skupina": [rng.choice(["A", "B", "C", "D"]) for _ in range(rows)],
+        "Bod vzplanutí [°C]": [rng.randint(50, 600) for _ in range(rows)],
+        "Teplota vznícení [°C]": [rng.randint(200, 900) for _ in range(rows)],
+        "Poznámka": [" ".join(rng.choice(MATERIALS) for _ in range(8)) for _ in range(rows)],
+    })
+
+def make_users(n: int, path: Path, password_hash: str, seed: int = 3) -> List[str]:
+    """Zapíše users.json s `n` uživateli (všichni sdílí jeden hash – bcrypt by generování zdržel)."""
+    rng = random.Random(seed)
+    oecs = [f"{i:06d}" for i in rng.sample(range(100000, 999999), n)]
+    users = [{"oec": o, "role": "admin" if i == 0 else "user", "password_hash": password_hash,
+              "first_name": rng.choice(FIRST), "last_name": rng.choice(LAST), "phone": "",
+              "email": f"{o}@example.com", "region": rng.choice(REGIONS),
+              "workplace": f"HZS {rng.choice(TOWNS)}", "active": True} for i, o in enumerate(oecs)]
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({"meta": {"version": 1}, "users": users}, ensure_ascii=False, indent=2),
+                    encoding="utf-8")
+    return oecs
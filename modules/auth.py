@@ -1,16 +1,32 @@
 from __future__ import annotations
+import contextlib
+import csv
+import hashlib
+import io
 import json
+import os
+import threading
+from collections import Counter
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Callable, Dict, Any, List, Optional
 
 import streamlit as st
-import bcrypt
+import streamlit.components.v1 as components
+
+from . import metrics, shared
+from .perf import timed
+
+try:
+    from streamlit_javascript import st_javascript
+except Exception:  # bez komponenty se relace po přepojení na jinou repliku neobnoví
+    st_javascript = None
 
 USERS_DB_PATH = Path("data") / "users" / "users.json"
-USERS_DB_PATH.parent.mkdir(parents=True, exist_ok=True)
 DEFAULT_ADMIN_OEC = "123456"
 DEFAULT_ADMIN_PASS = "admin123"
+PAGE_SIZES = [25, 50, 100]
 
+@timed("auth.load_db")
 def _load_db() -> Dict[str, Any]:
     try:
         data = json.loads(USERS_DB_PATH.read_text(encoding="utf-8"))
@@ -26,13 +42,22 @@ def _load_db() -> Dict[str, Any]:
     except Exception:
         return {"meta": {"version": 1}, "users": []}
 
+@timed("auth.save_db")
 def _save_db(db: Dict[str, Any]) -> None:
-    USERS_DB_PATH.write_text(json.dumps(db, ensure_ascii=False, indent=2), encoding="utf-8")
+    USERS_DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp = USERS_DB_PATH.with_name(USERS_DB_PATH.name + ".tmp")
+    tmp.write_text(json.dumps(db, ensure_ascii=False, indent=2), encoding="utf-8")
+    tmp.replace(USERS_DB_PATH)   # atomicky – čtenář nikdy neuvidí rozepsaný soubor
+    shared.bump("users")         # ostatní repliky si přenačtou přihlášené uživatele
 
+@timed("auth.bcrypt_hash")
 def _hash_password(pw: str) -> str:
+    import bcrypt   # až při práci s hesly – přihlašovací obrazovka ho nepotřebuje
     return bcrypt.hashpw(pw.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
 
+@timed("auth.bcrypt_verify")
 def _verify_password(pw: str, pw_hash: str) -> bool:
+    import bcrypt
     try:
         return bcrypt.checkpw(pw.encode("utf-8"), pw_hash.encode("utf-8"))
     except Exception:
@@ -76,8 +101,280 @@ def ensure_admin_password(default_oec: str = DEFAULT_ADMIN_OEC, default_password
         db["users"] = users
         _save_db(db)
 
+# Pohled pro admin seznam: uživatelé, duplicity, hodnoty filtrů a hledací texty se
+# spočítají jednou pro danou verzi souboru (mtime + velikost), výsledky filtrů se
+# pamatují. Seznam pak při rerunu jen stránkuje.
+_view_lock = threading.Lock()
+_view: Dict[str, Any] = {"mtime": None}
+
+def _users_view() -> Dict[str, Any]:
+    global _view
+    try:
+        stat = USERS_DB_PATH.stat()
+        version = f"{stat.st_mtime_ns}-{stat.st_size}"
+    except FileNotFoundError:
+        version = "none"
+    with _view_lock:
+        metrics.cache("users_view", _view["mtime"] == version)
+        if _view["mtime"] != version:
+            users = _load_db().get("users", [])
+            counts = Counter(u.get("oec") for u in users if u.get("oec"))
+            _view = {
+                "mtime": version, "users": users, "filtered": {},
+                "dups": sorted(o for o, c in counts.items() if c > 1),
+                "regions": sorted({u.get("region") for u in users if u.get("region")}),
+                "workplaces": sorted({u.get("workplace") for u in users if u.get("workplace")}),
+                "search": [" ".join(str(u.get(k, "")) for k in ("oec", "first_name", "last_name", "email")).lower()
+                           for u in users],
+            }
+        return _view
+
+def _filter_users(view: Dict[str, Any], q: str, region: str, workplace: str, role: str, status: str) -> List[int]:
+    key = (q.strip().lower(), region, workplace, role, status)
+    hit = view["filtered"].get(key)
+    if hit is not None:
+        return hit
+    out = []
+    for i, u in enumerate(view["users"]):
+        if key[0] and key[0] not in view["search"][i]: continue
+        if region != "Vše" and u.get("region") != region: continue
+        if workplace != "Vše" and u.get("workplace") != workplace: continue
+        if role != "Vše" and u.get("role", "user") != role: continue
+        if status != "Vše" and bool(u.get("active", True)) != (status == "Aktivní"): continue
+        out.append(i)
+    if len(view["filtered"]) > 64: view["filtered"].clear()
+    view["filtered"][key] = out
+    return out
+
+def bulk_update(action: str, oecs: List[str]) -> tuple[int, int]:
+    """Hromadná akce (activate/deactivate/reset/delete) nad OEČ – jedno načtení a jeden zápis."""
+    targets = set(oecs)
+    protected = action in ("deactivate", "delete") and DEFAULT_ADMIN_OEC in targets
+    if protected: targets.discard(DEFAULT_ADMIN_OEC)
+    db = _load_db()
+    users = db.get("users", [])
+    if action == "delete":
+        db["users"] = [u for u in users if u.get("oec") not in targets]
+        changed = len(users) - len(db["users"])
+    else:
+        new_hash = _hash_password("test123") if action == "reset" else None   # jeden bcrypt pro všechny
+        changed = 0
+        for u in users:
+            if u.get("oec") not in targets: continue
+            if action == "reset": u["password_hash"] = new_hash
+            else: u["active"] = action == "activate"
+            changed += 1
+    if changed:
+        _save_db(db)
+    metrics.log_event("users_bulk", action=action, changed=changed)
+    return changed, int(protected)
+
+# ---------- Hromadný import ----------
+# Sloupce souboru (CSV i XLSX) -> pole uživatele; hlavičky bez ohledu na velikost písmen
+IMPORT_COLUMNS = {
+    "oeč": "oec", "oec": "oec", "jméno": "first_name", "jmeno": "first_name", "příjmení": "last_name",
+    "prijmeni": "last_name", "e-mail": "email", "email": "email", "telefon": "phone", "kraj": "region",
+    "pracoviště": "workplace", "pracoviste": "workplace", "role": "role", "heslo": "password",
+}
+IMPORT_DEFAULT_PASS = "test123"
+
+def _cell_text(cell, oec: bool = False) -> str:
+    """Hodnota buňky XLSX jako text. Číselné buňky ztrácí úvodní nuly – vrátí je formát buňky
+    (např. "000000") a u OEČ pevná délka 6 číslic; 123456.0 -> "123456"."""
+    v = cell.value
+    if v is None: return ""
+    if isinstance(v, bool) or not isinstance(v, (int, float)): return str(v).strip()
+    if isinstance(v, float) and not v.is_integer(): return str(v)
+    text = str(int(v))
+    fmt = str(getattr(cell, "number_format", "") or "")
+    if fmt and set(fmt) == {"0"}: text = text.zfill(len(fmt))
+    return text.zfill(6) if oec and len(text) < 6 else text
+
+def parse_user_file(data: bytes, name: str) -> List[Dict[str, str]]:
+    """Načte řádky CSV (oddělovač , nebo ;) nebo XLSX a přemapuje hlavičky na pole uživatele."""
+    if name.lower().endswith((".xlsx", ".xlsm")):
+        from openpyxl import load_workbook
+        ws = load_workbook(io.BytesIO(data), read_only=True, data_only=True).active
+        it = ws.iter_rows()
+        header = [str(c.value or "").strip() for c in next(it, [])]
+        raw = ({h: _cell_text(c, IMPORT_COLUMNS.get(h.lower()) == "oec") for h, c in zip(header, r)} for r in it)
+    else:
+        text = data.decode("utf-8-sig")
+        dialect = csv.Sniffer().sniff(text[:4096], delimiters=",;\t")
+        raw = csv.DictReader(io.StringIO(text), dialect=dialect)
+    out = []
+    for r in raw:
+        rec = {IMPORT_COLUMNS[k.strip().lower()]: str(v or "").strip()
+               for k, v in r.items() if k and k.strip().lower() in IMPORT_COLUMNS}
+        if any(rec.values()): out.append(rec)
+    return out
+
+def validate_import(rows: List[Dict[str, str]]) -> tuple[List[Dict[str, str]], List[str]]:
+    """Vrací (platné řádky, chyby). OEČ musí mít 6 číslic a být v souboru jen jednou."""
+    errors, seen, ok = [], Counter(r.get("oec", "") for r in rows), []
+    for i, r in enumerate(rows, start=2):   # řádek 1 = hlavička
+        oec = r.get("oec", "")
+        if not (oec.isdigit() and len(oec) == 6):
+            errors.append(f"Řádek {i}: neplatné OEČ '{oec}'.")
+        elif seen[oec] > 1:
+            errors.append(f"Řádek {i}: OEČ {oec} je v souboru vícekrát.")
+        elif r.get("role", "user") not in ("user", "admin", ""):
+            errors.append(f"Řádek {i}: neznámá role '{r['role']}'.")
+        else:
+            ok.append(r)
+    return ok, errors
+
+def _hash_many(passwords: List[str], workers: Optional[int], progress: Optional[Callable[[int, int], None]]) -> List[str]:
+    # Vlákna, ne procesy: bcrypt uvolňuje GIL a fork uvnitř vícevláknového serveru Streamlitu
+    # (autosave, metriky) může zůstat viset na zamčeném zámku
+    from concurrent.futures import ThreadPoolExecutor, as_completed   # až při importu
+    hashes: List[str] = [""] * len(passwords)
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        futs = {pool.submit(_hash_password, pw): i for i, pw in enumerate(passwords)}
+        for n, f in enumerate(as_completed(futs), start=1):
+            hashes[futs[f]] = f.result()
+            if progress: progress(n, len(passwords))
+    return hashes
+
+@timed("auth.import_users")
+def import_users(rows: List[Dict[str, str]], update_existing: bool = False,
+                 default_password: str = IMPORT_DEFAULT_PASS, workers: Optional[int] = None,
+                 progress: Optional[Callable[[int, int], None]] = None) -> Dict[str, int]:
+    """Sloučí platné řádky s databází; hesla hashuje paralelně, zapisuje jednou (atomicky)."""
+    db = _load_db()
+    by_oec = {u.get("oec"): u for u in db["users"]}
+    created, updated, skipped, todo = 0, 0, 0, []
+    for r in rows:
+        user = by_oec.get(r["oec"])
+        if user and (not update_existing or r["oec"] == DEFAULT_ADMIN_OEC):
+            skipped += 1; continue
+        if not user:
+            user = by_oec[r["oec"]] = {"oec": r["oec"], "role": "user", "active": True}
+            db["users"].append(user); created += 1
+        else:
+            updated += 1
+        user.update({k: v for k, v in r.items() if k not in ("oec", "password") and v})
+        if r.get("password") or not user.get("password_hash"):
+            todo.append((user, r.get("password") or default_password))
+    for (user, _), h in zip(todo, _hash_many([pw for _, pw in todo], workers, progress)):
+        user["password_hash"] = h
+    if created or updated:
+        _save_db(db)
+    metrics.log_event("users_import", created=created, updated=updated, skipped=skipped)
+    return {"created": created, "updated": updated, "skipped": skipped, "hashed": len(todo)}
+
+def _render_import() -> None:
+    with st.expander("📥 Hromadný import uživatelů (CSV/XLSX)"):
+        st.caption("Sloupce: OEČ, Jméno, Příjmení, E-mail, Telefon, Kraj, Pracoviště, Role, Heslo (volitelné).")
+        up = st.file_uploader("Soubor s uživateli", type=["csv", "xlsx"], key="adm_import_file")
+        if up is None:
+            return
+        try:
+            rows = parse_user_file(up.getvalue(), up.name)
+        except Exception as e:
+            st.error(f"Soubor nelze načíst: {e}"); return
+        valid, errors = validate_import(rows)
+        st.write(f"Řádků: {len(rows)}, platných: {len(valid)}, chybných: {len(errors)}")
+        if errors:
+            st.warning("\n".join(errors[:20]) + (f"\n… a dalších {len(errors) - 20}" if len(errors) > 20 else ""))
+        update_existing = st.checkbox("Aktualizovat existující uživatele", value=False, key="adm_import_update")
+        default_pw = st.text_input("Počáteční heslo (kde ho soubor neuvádí)", value=IMPORT_DEFAULT_PASS, key="adm_import_pw")
+        if st.button("Importovat", key="adm_import_go", disabled=not valid, use_container_width=True):
+            bar = st.progress(0.0, text="Hashování hesel…")
+            res = import_users(valid, update_existing, default_pw or IMPORT_DEFAULT_PASS,
+                               progress=lambda n, total: bar.progress(n / total, text=f"Hashování hesel {n}/{total}"))
+            bar.progress(1.0, text="Hotovo")
+            st.session_state["adm_flash"] = (f"Import: nových {res['created']}, aktualizovaných {res['updated']}, "
+                                             f"přeskočených {res['skipped']}.")
+            st.rerun()
+
+# Přihlášení je sdílené mezi replikami: token relace je v localStorage prohlížeče (ne v URL –
+# odkaz nikoho nepřihlásí), záznam relace (uživatel + stav navigace SHARED_STATE) ve sdíleném
+# úložišti. Po přepojení na jinou repliku se z něj session_state obnoví, jen když sedí otisk
+# prohlížeče; platnost tokenu je pevná od přihlášení. Změny uživatelů (role, deaktivace) se
+# projeví i v otevřených relacích na ostatních replikách.
+SID_STORAGE_KEY = "zpp_sid"
+SHARED_STATE = ("oec", "zvolen_modul", "aktivni_podmodul", "pozary_submodul", "current_report_id")
+
+def _session_user(u: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "oec": u.get("oec"),
+        "role": u.get("role", "user"),
+        "first_name": u.get("first_name", ""),
+        "last_name": u.get("last_name", ""),
+        "phone": u.get("phone", ""),
+        "email": u.get("email", ""),
+        "region": u.get("region", ""),
+        "workplace": u.get("workplace", ""),
+        "active": u.get("active", True)
+    }
+
+def _client_fp() -> str:
+    """Otisk prohlížeče (hash User-Agent) – token zkopírovaný jinam relaci neobnoví."""
+    try: ua = st.context.headers.get("User-Agent", "")
+    except Exception:
+        try:
+            from streamlit.web.server.websocket_headers import _get_websocket_headers
+            ua = (_get_websocket_headers() or {}).get("User-Agent", "")
+        except Exception: ua = ""
+    return hashlib.sha256(str(ua).encode()).hexdigest()[:16]
+
+def _store_token(sid: Optional[str]) -> None:
+    # Zápis/smazání tokenu v localStorage (komponenta bez výšky, stejný původ jako aplikace)
+    js = (f"localStorage.setItem({json.dumps(SID_STORAGE_KEY)}, {json.dumps(sid)});" if sid
+          else f"localStorage.removeItem({json.dumps(SID_STORAGE_KEY)});")
+    components.html(f"<script>try {{ {js} }} catch (e) {{}}</script>", height=0)
+
+def _logout() -> None:
+    sid = st.session_state.pop("sid", None)
+    if sid: shared.drop_session(sid)
+    st.session_state.pop("user", None)
+    st.session_state["sid_stored"] = "clear"        # token v prohlížeči smaže další vykreslení
+
+def _restore_session() -> Optional[Dict[str, Any]]:
+    """Obnoví přihlášení z tokenu v localStorage (jednou za relaci Streamlitu)."""
+    if st_javascript is None or st.session_state.get("sid_checked"): return None
+    sid = st_javascript(f"localStorage.getItem({json.dumps(SID_STORAGE_KEY)}) || ''", key="sid_restore_js")
+    if not isinstance(sid, str): return None       # komponenta ještě neodpověděla
+    st.session_state["sid_checked"] = True         # token zkoušet jen jednou
+    if not sid: return None
+    rec = shared.load_session(sid)
+    if not rec or not rec.get("user") or rec.get("fp") != _client_fp():
+        st.session_state["sid_stored"] = "clear"
+        return None
+    st.session_state["user"], st.session_state["sid"] = rec["user"], sid
+    st.session_state["sid_stored"] = sid
+    st.session_state["users_ver"] = None           # role/aktivitu ověřit proti databázi
+    for k, v in (rec.get("state") or {}).items():
+        if k in SHARED_STATE: st.session_state[k] = v
+    metrics.log_event("session_restored", oec=rec["user"].get("oec"))
+    return rec["user"]
+
+def _refresh_user(u: Dict[str, Any], ver: str) -> Optional[Dict[str, Any]]:
+    db_user = _find_user(_load_db(), u.get("oec", ""))
+    if not db_user or not db_user.get("active", True):
+        _logout(); return None
+    u = st.session_state["user"] = _session_user(db_user)
+    st.session_state["users_ver"] = ver
+    return u
+
 def current_user() -> Optional[Dict[str, Any]]:
-    return st.session_state.get("user")
+    u = st.session_state.get("user")
+    if u is None:
+        return None
+    ver = shared.version("users")
+    if ver != st.session_state.get("users_ver"):
+        return _refresh_user(u, ver)
+    return u
+
+def sync_shared_session() -> None:
+    """Na konci rerunu uloží stav navigace do sdílené relace (jen když se změnil)."""
+    sid, u = st.session_state.get("sid"), st.session_state.get("user")
+    if not sid or not u: return
+    snap = (u, {k: st.session_state.get(k) for k in SHARED_STATE})
+    if st.session_state.get("sid_snapshot") != snap:
+        shared.save_session(sid, *snap, fp=_client_fp())
+        st.session_state["sid_snapshot"] = snap
 
 def require_role(role: str) -> bool:
     u = current_user()
@@ -90,29 +387,35 @@ def require_role(role: str) -> bool:
 
 def render_login(sidebar: bool = True) -> None:
     container = st.sidebar if sidebar else st
-    db = _load_db()
 
+    try: st.query_params.pop("sid", None)    # token ze starších odkazů (?sid=…) se už nepoužívá
+    except Exception: pass
+    with (st.sidebar if sidebar else contextlib.nullcontext()):
+        if st.session_state.get("user") is None:
+            _restore_session()   # obnoví relaci z jiné repliky
+        current_user()
+        stored, sid = st.session_state.get("sid_stored"), st.session_state.get("sid")
+        if stored != sid and (sid or stored == "clear"):
+            _store_token(sid)
+            st.session_state["sid_stored"] = sid
     container.header("🔐 Přihlášení")
     oec = container.text_input("OEČ", max_chars=6)
     pwd = container.text_input("Heslo", type="password")
     if container.button("Přihlásit se", use_container_width=True):
-        u = _find_user(db, oec)
-        if not u or not u.get("active", True):
+        u = _find_user(_load_db(), oec)
+        with metrics.timer("zpp_login_duration_ms", doc="Doba ověření přihlášení."):
+            ok = bool(u and u.get("active", True)) and _verify_password(pwd, u.get("password_hash", ""))
+        result = "ok" if ok else ("bad_password" if u and u.get("active", True) else "unknown_user")
+        metrics.inc("zpp_logins_total", labels={"result": result}, doc="Pokusy o přihlášení podle výsledku.")
+        metrics.log_event("login", oec=oec, result=result)
+        if result == "unknown_user":
             container.error("Uživatel nenalezen nebo je deaktivován.")
-        elif not _verify_password(pwd, u.get("password_hash", "")):
+        elif result == "bad_password":
             container.error("Špatné heslo.")
         else:
-            st.session_state["user"] = {
-                "oec": u.get("oec"),
-                "role": u.get("role", "user"),
-                "first_name": u.get("first_name", ""),
-                "last_name": u.get("last_name", ""),
-                "phone": u.get("phone", ""),
-                "email": u.get("email", ""),
-                "region": u.get("region", ""),
-                "workplace": u.get("workplace", ""),
-                "active": u.get("active", True)
-            }
+            st.session_state["user"] = _session_user(u)
+            st.session_state["sid"] = shared.create_session(st.session_state["user"], fp=_client_fp())
+            st.session_state["users_ver"] = shared.version("users")
             st.success(f"Přihlášen: {u.get('first_name','')} {u.get('last_name','')} ({u.get('oec')})")
             st.rerun()
 
@@ -120,7 +423,7 @@ def render_login(sidebar: bool = True) -> None:
         u = st.session_state["user"]
         container.success(f"Přihlášen {u.get('first_name','')} {u.get('last_name','')} – OEČ {u['oec']}")
         if container.button("Odhlásit se", use_container_width=True):
-            st.session_state.pop("user", None)
+            _logout()
             st.rerun()
 
 def render_admin_panel() -> None:
@@ -128,14 +431,11 @@ def render_admin_panel() -> None:
         return
 
     st.header("🛠️ Admin panel – uživatelé")
-    db = _load_db()
-
-    from collections import Counter
-    counts = Counter([x.get("oec") for x in db.get("users", []) if x.get("oec")])
-    dups = [o for o, c in counts.items() if c > 1]
-    if dups:
-        st.warning("Zjištěny duplicitní OEČ: " + ", ".join(dups))
+    view = _users_view()
+    if view["dups"]:
+        st.warning("Zjištěny duplicitní OEČ: " + ", ".join(view["dups"]))
         if st.button("🧹 Sloučit duplicity OEČ (ponechat poslední záznam)", key="dedup_users"):
+            db = _load_db()
             new_users = {}
             for rec in db.get("users", []):
                 o = rec.get("oec")
@@ -147,58 +447,60 @@ def render_admin_panel() -> None:
             st.rerun()
 
     st.subheader("Seznam")
-    for idx, u in enumerate(db.get("users", [])):
-        user_oec = u.get('oec', '')
-        key_suffix = f"{idx}_{user_oec}"
-
-        with st.expander(f"{user_oec} – {u.get('first_name','')} {u.get('last_name','')} ({u.get('role','user')})"):
-            c1, c2, c3 = st.columns(3)
-            with c1:
-                st.write(f"Email: {u.get('email','')}")
-                st.write(f"Telefon: {u.get('phone','')}")
-            with c2:
-                st.write(f"Kraj: {u.get('region','')}")
-                st.write(f"Pracoviště: {u.get('workplace','')}")
-            with c3:
-                st.write(f"Aktivní: {'Ano' if u.get('active', True) else 'Ne'}")
-
-            colA, colB, colC = st.columns(3)
-
-            # Dynamický popisek tlačítka
-            status_label = "Deaktivovat" if u.get("active", True) else "Aktivovat"
-            if colA.button(f"{status_label} {user_oec}", key=f"toggle_{key_suffix}"):
-                if user_oec != DEFAULT_ADMIN_OEC:
-                    for rec in db["users"]:
-                        if rec.get("oec") == user_oec:
-                            rec["active"] = not rec.get("active", True)
-                            if st.session_state.get("user", {}).get("oec") == user_oec:
-                                st.session_state["user"]["active"] = rec["active"]
-                            break
-                    _save_db(db)
-                    db = _load_db()
-                    st.rerun()
-                else:
-                    st.warning("Základního admina nelze deaktivovat.")
-
-            if colB.button(f"Resetovat heslo {user_oec}", key=f"reset_{key_suffix}"):
-                for rec in db["users"]:
-                    if rec.get("oec") == user_oec:
-                        rec["password_hash"] = _hash_password("test123")
-                        break
-                _save_db(db)
-                db = _load_db()
-                st.success(f"Heslo uživatele {user_oec} bylo resetováno na 'test123'.")
-                st.rerun()
-
-            if colC.button(f"Smazat {user_oec}", key=f"del_{key_suffix}"):
-                if user_oec != DEFAULT_ADMIN_OEC:
-                    db["users"] = [rec for rec in db["users"] if rec.get("oec") != user_oec]
-                    _save_db(db)
-                    db = _load_db()
-                    st.success(f"Uživatel {user_oec} smazán.")
-                    st.rerun()
-                else:
-                    st.warning("Základního admina nelze smazat.")
+    f1, f2, f3, f4, f5 = st.columns([2, 1, 1, 1, 1])
+    q = f1.text_input("Hledat (OEČ, jméno, e-mail)", key="adm_q")
+    region = f2.selectbox("Kraj", ["Vše"] + view["regions"], key="adm_region")
+    workplace = f3.selectbox("Pracoviště", ["Vše"] + view["workplaces"], key="adm_workplace")
+    role = f4.selectbox("Role", ["Vše", "user", "admin"], key="adm_role")
+    status = f5.selectbox("Stav", ["Vše", "Aktivní", "Neaktivní"], key="adm_status")
+    idx = _filter_users(view, q, region, workplace, role, status)
+
+    p1, p2, p3 = st.columns([1, 1, 3])
+    page_size = p1.selectbox("Na stránku", PAGE_SIZES, key="adm_page_size")
+    pages = max(1, -(-len(idx) // page_size))
+    if st.session_state.get("adm_page", 1) > pages:   # po zúžení filtru
+        st.session_state["adm_page"] = pages
+    page = int(p2.number_input("Stránka", min_value=1, max_value=pages, step=1, key="adm_page"))
+    p3.caption(f"Nalezeno {len(idx)} z {len(view['users'])} uživatelů, stránka {page}/{pages}")
+
+    # Vykresluje se jen aktuální stránka – cena nezávisí na počtu uživatelů
+    rows = [{"Vybrat": False, "OEČ": u.get("oec", ""), "Jméno": f"{u.get('first_name','')} {u.get('last_name','')}".strip(),
+             "Role": u.get("role", "user"), "Kraj": u.get("region", ""), "Pracoviště": u.get("workplace", ""),
+             "E-mail": u.get("email", ""), "Telefon": u.get("phone", ""), "Aktivní": u.get("active", True)}
+            for u in (view["users"][i] for i in idx[(page - 1) * page_size: page * page_size])]
+    selected: List[str] = []
+    if rows:
+        edited = st.data_editor(
+            rows, hide_index=True, use_container_width=True,
+            disabled=[c for c in rows[0] if c != "Vybrat"],
+            key=f"adm_grid_{view['mtime']}_{hash((q, region, workplace, role, status, page, page_size))}",
+        )
+        selected = [r["OEČ"] for r in edited if r.get("Vybrat")]
+    else:
+        st.info("Filtru neodpovídá žádný uživatel.")
+
+    st.caption(f"Vybráno: {len(selected)}")
+    b1, b2, b3, b4 = st.columns(4)
+    action = None
+    if b1.button("✅ Aktivovat", key="adm_bulk_on", disabled=not selected, use_container_width=True): action = "activate"
+    if b2.button("⛔ Deaktivovat", key="adm_bulk_off", disabled=not selected, use_container_width=True): action = "deactivate"
+    if b3.button("🔑 Resetovat heslo", key="adm_bulk_reset", disabled=not selected, use_container_width=True): action = "reset"
+    confirm = b4.checkbox("Potvrdit smazání", key="adm_bulk_del_ok")
+    if b4.button("🗑️ Smazat", key="adm_bulk_del", disabled=not (selected and confirm), use_container_width=True): action = "delete"
+    if action:
+        changed, skipped = bulk_update(action, selected)
+        me = st.session_state.get("user", {})
+        if me.get("oec") in selected and action in ("activate", "deactivate"):
+            me["active"] = action == "activate"
+        msg = f"Upraveno uživatelů: {changed}."
+        if action == "reset": msg += " Nové heslo: 'test123'."
+        if skipped: msg += " Základního admina nelze deaktivovat ani smazat."
+        st.session_state["adm_flash"] = msg
+        st.rerun()
+    if st.session_state.get("adm_flash"):
+        st.success(st.session_state.pop("adm_flash"))
+
+    _render_import()
 
     st.subheader("➕ Přidat / upravit uživatele")
     form_key = "user_form_main"
@@ -218,6 +520,7 @@ def render_admin_panel() -> None:
             if not (oec.isdigit() and len(oec) == 6):
                 st.error("OEČ musí mít 6 číslic.")
             else:
+                db = _load_db()
                 user = _find_user(db, oec)
                 if not user:
                     user = {"oec": oec}
@@ -240,7 +543,6 @@ def render_admin_panel() -> None:
                     user["password_hash"] = _hash_password("test123")
 
                 _save_db(db)
-                db = _load_db()
                 st.success(f"Uživatel {oec} uložen.")
                 st.rerun()
 
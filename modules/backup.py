@@ -0,0 +1,154 @@
+from __future__ import annotations
+import argparse
+import datetime as dt
+import hashlib
+import json
+import os
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path, PurePosixPath
+from typing import Any, Dict, List, Optional
+
+# Inkrementální deduplikovaná záloha.
+# Soubory se dělí na bloky po CHUNK bajtech, každý blok se uloží jednou pod svým SHA-256
+# (chunks/ab/abcdef…, komprimovaný zlibem). Snímek je jen manifest: cesta -> velikost,
+# mtime a seznam bloků. Nezměněné soubory (stejná velikost i mtime) se ani nečtou.
+CHUNK = 4 << 20
+DEFAULT_REPO = Path(os.environ.get("ZPP_BACKUP_REPO", "backup"))
+DEFAULT_SOURCES = ["reports", "data"]
+
+def _chunk_path(repo: Path, h: str) -> Path:
+    return repo / "chunks" / h[:2] / h
+
+def _put_chunk(repo: Path, blob: bytes) -> tuple[str, int]:
+    h = hashlib.sha256(blob).hexdigest()
+    p = _chunk_path(repo, h)
+    if p.exists(): return h, 0
+    p.parent.mkdir(parents=True, exist_ok=True)
+    tmp = p.with_name(p.name + f".{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.write_bytes(zlib.compress(blob, 6))
+    tmp.replace(p)
+    return h, len(blob)
+
+def _backup_file(repo: Path, path: Path) -> tuple[List[str], int]:
+    chunks, new_bytes = [], 0
+    with path.open("rb") as f:
+        while True:
+            blob = f.read(CHUNK)
+            if not blob: break
+            h, n = _put_chunk(repo, blob)
+            chunks.append(h); new_bytes += n
+    return chunks, new_bytes
+
+def list_snapshots(repo: Path = DEFAULT_REPO) -> List[str]:
+    return sorted(p.stem for p in (repo / "snapshots").glob("*.json"))
+
+def load_manifest(repo: Path, name: str) -> Dict[str, Any]:
+    return json.loads((repo / "snapshots" / f"{name}.json").read_text(encoding="utf-8"))
+
+def _walk(sources: List[str]):
+    for src in sources:
+        root = Path(src)
+        if root.is_file():
+            yield root
+        for p in sorted(root.rglob("*")) if root.is_dir() else []:
+            if p.is_file() and not p.name.endswith((".tmp", ".part")):
+                yield p
+
+def backup(sources: List[str] = DEFAULT_SOURCES, repo: Path = DEFAULT_REPO, workers: int = 8) -> Dict[str, Any]:
+    """Vytvoří nový snímek; čte a hashuje jen soubory změněné od minulého snímku."""
+    snaps = list_snapshots(repo)
+    prev = load_manifest(repo, snaps[-1])["files"] if snaps else {}
+    files: Dict[str, Any] = {}
+    todo = []
+    for p in _walk(sources):
+        info = p.stat()
+        rel = PurePosixPath(*p.parts).as_posix()
+        old = prev.get(rel)
+        if old and old["size"] == info.st_size and old["mtime_ns"] == info.st_mtime_ns:
+            files[rel] = old
+        else:
+            todo.append((rel, p, info))
+    new_bytes = 0
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        for (rel, p, info), (chunks, n) in zip(todo, ex.map(lambda t: _backup_file(repo, t[1]), todo)):
+            files[rel] = {"size": info.st_size, "mtime_ns": info.st_mtime_ns, "chunks": chunks}
+            new_bytes += n
+    name = dt.datetime.now().strftime("%Y%m%dT%H%M%S")
+    manifest = {"created": dt.datetime.now().isoformat(timespec="seconds"), "sources": sources, "files": files}
+    out = repo / "snapshots" / f"{name}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out.with_suffix(".tmp")
+    tmp.write_text(json.dumps(manifest, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+    tmp.replace(out)
+    return {"snapshot": name, "files": len(files), "changed": len(todo), "new_bytes": new_bytes}
+
+def resolve_snapshot(repo: Path, at: Optional[str] = None) -> Optional[str]:
+    """Poslední snímek nejpozději v čase `at` (YYYYmmdd[THHMMSS]); bez `at` nejnovější."""
+    snaps = list_snapshots(repo)
+    if at: snaps = [s for s in snaps if s[:len(at)] <= at]
+    return snaps[-1] if snaps else None
+
+def _dest(target: Path, rel: str) -> Path:
+    """Cíl obnovy uvnitř `target`; absolutní cesty a cesty mimo cíl (..) manifest nesmí obsahovat."""
+    root = target.resolve()
+    dest = (root / rel).resolve()
+    if Path(rel).is_absolute() or PurePosixPath(rel).is_absolute() or Path(rel).drive or not dest.is_relative_to(root):
+        raise ValueError(f"Cesta '{rel}' ve snímku míří mimo cílovou složku – obnova přerušena.")
+    return dest
+
+def _is_report_file(rel: str, key: str) -> bool:
+    """Soubor reportu `key` (x.json, x.json.gz, x.json.zst) nebo soubor v jeho složce příloh."""
+    parts = rel.split("/")
+    return parts[-1] in {f"{key}.json", f"{key}.json.gz", f"{key}.json.zst"} or key in parts[:-1]
+
+def _restore_file(repo: Path, target: Path, rel: str, rec: Dict[str, Any]) -> None:
+    dest = _dest(target, rel)
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dest.with_name(dest.name + ".restore")
+    with tmp.open("wb") as f:
+        for h in rec["chunks"]:
+            f.write(zlib.decompress(_chunk_path(repo, h).read_bytes()))
+    tmp.replace(dest)
+    os.utime(dest, ns=(rec["mtime_ns"], rec["mtime_ns"]))
+
+def restore(target: Path, repo: Path = DEFAULT_REPO, at: Optional[str] = None,
+            report: Optional[str] = None, workers: int = 8) -> Dict[str, Any]:
+    """Obnoví snímek (nebo jen jeden report i s přílohami) do složky `target`."""
+    name = resolve_snapshot(repo, at)
+    if not name: raise FileNotFoundError("V úložišti záloh není žádný snímek.")
+    files = load_manifest(repo, name)["files"]
+    if report:
+        from modules.report.utils import fs_safe
+        key = fs_safe(report)
+        files = {rel: r for rel, r in files.items() if _is_report_file(rel, key)}
+    for rel in files: _dest(target, rel)        # celý snímek ověřit dřív, než se cokoli zapíše
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        list(ex.map(lambda kv: _restore_file(repo, target, *kv), files.items()))
+    return {"snapshot": name, "files": len(files)}
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description="Deduplikovaná záloha reportů a dat.")
+    ap.add_argument("--repo", type=Path, default=DEFAULT_REPO)
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    b = sub.add_parser("backup"); b.add_argument("sources", nargs="*", default=DEFAULT_SOURCES)
+    sub.add_parser("list")
+    r = sub.add_parser("restore")
+    r.add_argument("target", type=Path)
+    r.add_argument("--at", help="čas snímku YYYYmmdd[THHMMSS] – použije se poslední starší")
+    r.add_argument("--report", help="obnovit jen jeden report (ID) i s přílohami")
+    for p in (b, r): p.add_argument("--workers", type=int, default=8)
+    a = ap.parse_args(argv)
+    if a.cmd == "backup":
+        res = backup(a.sources, a.repo, a.workers)
+        print(f"Snímek {res['snapshot']}: {res['files']} souborů, změněno {res['changed']}, "
+              f"nových dat {res['new_bytes']/1e6:.2f} MB")
+    elif a.cmd == "list":
+        for s in list_snapshots(a.repo): print(s)
+    else:
+        res = restore(a.target, a.repo, a.at, a.report, a.workers)
+        print(f"Obnoveno ze snímku {res['snapshot']}: {res['files']} souborů -> {a.target}")
+
+if __name__ == "__main__":
+    main()
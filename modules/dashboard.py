@@ -0,0 +1,68 @@
+from __future__ import annotations
+import datetime as dt
+from typing import Dict, List
+import pandas as pd
+import streamlit as st
+from .auth import require_role
+from .perf import span
+from .report import stats
+
+# Stránka statistik (jen pro správce – obsahuje přehled po vyšetřovatelích) – čte jen
+# materializované souhrny (reports/_index/stats.json), žádný soubor reportu ani seznam
+# reportů, takže se načte hned i při tisících reportů.
+
+def _rows(table: Dict[str, int], names: List[str]) -> List[dict]:
+    return [{**dict(zip(names, k.split("|"))), "Požárů": n} for k, n in table.items()]
+
+def _months(n: int) -> List[str]:
+    d = dt.date.today().replace(day=1)
+    out = []
+    for _ in range(n):
+        out.append(d.strftime("%Y-%m"))
+        d = (d - dt.timedelta(days=1)).replace(day=1)
+    return out[::-1]
+
+def render_stats_page() -> None:
+    if not require_role("admin"):
+        st.error("Statistiky jsou dostupné jen správcům."); return
+    with span("stats.load"):
+        db = stats.load()
+    t = db["tables"]
+    st.markdown("## 📊 Statistiky požárů")
+    if not db["meta"].get("reports"):
+        st.info("Zatím nejsou započteny žádné reporty (přepočet: python -m modules.report.stats)."); return
+    today = dt.date.today()
+    this_month = today.strftime("%Y-%m")
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("Celkem", sum(t["kraj"].values()))
+    c2.metric(f"Rok {today.year}", sum(n for m, n in t["month"].items() if m.startswith(str(today.year))))
+    c3.metric("Tento měsíc", t["month"].get(this_month, 0))
+    c4.metric("Vyšetřovatelů", len(t["oec"]))
+    if db["meta"].get("updated"): st.caption(f"Aktualizováno {db['meta']['updated'].replace('T', ' ')}")
+
+    kraje = sorted(k for k in t["kraj"])
+    kraj = st.selectbox("Kraj", ["Všechny kraje"] + kraje, key="stats_kraj")
+    last = st.slider("Posledních měsíců", 6, 60, 24, step=6, key="stats_months")
+    months = _months(last)
+
+    st.markdown("#### Požáry podle měsíců")
+    if kraj == "Všechny kraje":
+        per_month = {m: t["month"].get(m, 0) for m in months}
+    else:
+        per_month = {m: t["kraj_month"].get(f"{kraj}|{m}", 0) for m in months}
+    st.bar_chart(pd.Series(per_month, name="Požárů"))
+
+    g1, g2 = st.columns(2)
+    with g1:
+        st.markdown("#### Podle krajů" if kraj == "Všechny kraje" else f"#### Obce – {kraj}")
+        if kraj == "Všechny kraje":
+            rows = _rows(t["kraj"], ["Kraj"])
+        else:
+            rows = [r for r in _rows(t["obec"], ["Kraj", "Obec"]) if r["Kraj"] == kraj]
+        st.dataframe(sorted(rows, key=lambda r: -r["Požárů"]), use_container_width=True, hide_index=True)
+    with g2:
+        st.markdown("#### Podle vyšetřovatelů")
+        rows = [{"OEČ": oec, "Celkem": n, "Tento měsíc": t["oec_month"].get(f"{oec}|{this_month}", 0),
+                 f"Posledních {last} měs.": sum(t["oec_month"].get(f"{oec}|{m}", 0) for m in months)}
+                for oec, n in t["oec"].items()]
+        st.dataframe(sorted(rows, key=lambda r: -r["Celkem"]), use_container_width=True, hide_index=True)
@@ -0,0 +1,183 @@
+from __future__ import annotations
+import bisect
+import contextlib
+import json
+import logging
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+
+# Provozní metriky pro monitoring serveru.
+# Čítače a histogramy žijí v paměti procesu (zápis = jeden zámek a pár sčítání),
+# ven se vystavují v textovém formátu Prometheus přes malý HTTP server na pozadí
+# (ZPP_METRICS_PORT) a volitelně jako JSON řádky do logu (ZPP_METRICS_LOG).
+BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+SESSION_TTL_S = 600
+
+_lock = threading.Lock()
+_counters: Dict[Tuple[str, Tuple], float] = {}
+_hists: Dict[Tuple[str, Tuple], list] = {}          # [počty v bucketech..., +Inf, součet]
+_help: Dict[str, Tuple[str, str]] = {}               # jméno -> (typ, popis)
+_sessions: Dict[str, float] = {}
+_session_mem: Dict[str, Tuple[int, int, str]] = {}   # relace -> (bajty, klíče, uživatel)
+
+_log = logging.getLogger("zpp.metrics")
+
+def _key(name: str, labels: Optional[Dict[str, str]]) -> Tuple[str, Tuple]:
+    return name, tuple(sorted((labels or {}).items()))
+
+def inc(name: str, value: float = 1, labels: Optional[Dict[str, str]] = None, doc: str = "") -> None:
+    k = _key(name, labels)
+    with _lock:
+        _help.setdefault(name, ("counter", doc))
+        _counters[k] = _counters.get(k, 0) + value
+
+def observe_ms(name: str, ms: float, labels: Optional[Dict[str, str]] = None, doc: str = "") -> None:
+    k = _key(name, labels)
+    i = bisect.bisect_left(BUCKETS_MS, ms)
+    with _lock:
+        _help.setdefault(name, ("histogram", doc))
+        h = _hists.get(k)
+        if h is None:
+            h = _hists[k] = [0] * (len(BUCKETS_MS) + 2)
+        h[i] += 1
+        h[-1] += ms
+
+@contextlib.contextmanager
+def timer(name: str, labels: Optional[Dict[str, str]] = None, doc: str = ""):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_ms(name, (time.perf_counter() - t0) * 1000, labels, doc)
+
+def cache(name: str, hit: bool) -> None:
+    inc("zpp_cache_requests_total", labels={"cache": name, "result": "hit" if hit else "miss"},
+        doc="Dotazy do in-process cache podle výsledku.")
+
+def touch_session(session_id: str) -> None:
+    now = time.monotonic()
+    with _lock:
+        _sessions[session_id] = now
+        if len(_sessions) > 64:   # úklid jen občas, ne při každém rerunu
+            for sid, t in list(_sessions.items()):
+                if now - t > SESSION_TTL_S:
+                    _sessions.pop(sid, None); _session_mem.pop(sid, None)
+
+def session_memory(session_id: str, nbytes: int, keys: int, user: str = "") -> int:
+    """Zapíše velikost session_state relace (po každém rerunu); vrátí předchozí velikost."""
+    with _lock:
+        prev = _session_mem.get(session_id, (0, 0, ""))[0]
+        _session_mem[session_id] = (nbytes, keys, user)
+    return prev
+
+def session_memory_top(top: int = 10) -> dict:
+    """Paměť aktivních relací procesu: součet, maximum a největší relace."""
+    now = time.monotonic()
+    with _lock:
+        rows = [(sid, *v) for sid, v in _session_mem.items() if now - _sessions.get(sid, 0) <= SESSION_TTL_S]
+    rows.sort(key=lambda r: r[1], reverse=True)
+    return {"sessions": len(rows), "bytes": sum(r[1] for r in rows), "max": rows[0][1] if rows else 0,
+            "top": [{"relace": sid[:8], "uživatel": user, "bytes": b, "keys": k} for sid, b, k, user in rows[:top]]}
+
+def active_sessions() -> int:
+    now = time.monotonic()
+    with _lock:
+        return sum(1 for t in _sessions.values() if now - t <= SESSION_TTL_S)
+
+def log_event(event: str, **fields) -> None:
+    """Strukturovaný záznam (JSON řádek) – jen pokud je logger zapnutý."""
+    if _log.isEnabledFor(logging.INFO):
+        _log.info(json.dumps({"ts": time.time(), "event": event, **fields}, ensure_ascii=False, default=str))
+
+def _fmt_labels(labels: Tuple, extra: Tuple = ()) -> str:
+    items = list(labels) + list(extra)
+    if not items: return ""
+    esc = lambda v: str(v).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in items) + "}"
+
+def render_prometheus() -> str:
+    with _lock:
+        counters, hists, helps = dict(_counters), {k: list(v) for k, v in _hists.items()}, dict(_help)
+    lines = []
+    seen = set()
+    def header(name: str):
+        if name in seen: return
+        seen.add(name)
+        typ, text = helps.get(name, ("untyped", ""))
+        if text: lines.append(f"# HELP {name} {text}")
+        lines.append(f"# TYPE {name} {typ}")
+    for (name, labels), v in sorted(counters.items()):
+        header(name)
+        lines.append(f"{name}{_fmt_labels(labels)} {v:g}")
+    for (name, labels), h in sorted(hists.items()):
+        header(name)
+        acc = 0
+        for b, n in zip(BUCKETS_MS, h):
+            acc += n
+            lines.append(f"{name}_bucket{_fmt_labels(labels, (('le', f'{b:g}'),))} {acc}")
+        acc += h[len(BUCKETS_MS)]
+        lines.append(f"{name}_bucket{_fmt_labels(labels, (('le', '+Inf'),))} {acc}")
+        lines.append(f"{name}_sum{_fmt_labels(labels)} {h[-1]:.3f}")
+        lines.append(f"{name}_count{_fmt_labels(labels)} {acc}")
+    lines.append("# TYPE zpp_active_sessions gauge")
+    lines.append(f"zpp_active_sessions {active_sessions()}")
+    mem = session_memory_top(0)
+    lines.append("# HELP zpp_session_memory_bytes Odhad velikosti session_state aktivních relací.")
+    lines.append("# TYPE zpp_session_memory_bytes gauge")
+    lines.append(f'zpp_session_memory_bytes{{stat="sum"}} {mem["bytes"]}')
+    lines.append(f'zpp_session_memory_bytes{{stat="max"}} {mem["max"]}')
+    return "\n".join(lines) + "\n"
+
+def snapshot() -> dict:
+    with _lock:
+        return {
+            "counters": [{"name": n, "labels": dict(l), "value": v} for (n, l), v in _counters.items()],
+            "histograms": [{"name": n, "labels": dict(l), "count": sum(h[:-1]), "sum_ms": h[-1]}
+                           for (n, l), h in _hists.items()],
+            "active_sessions": sum(1 for t in _sessions.values() if time.monotonic() - t <= SESSION_TTL_S),
+        }
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.startswith("/metrics.json"):
+            body, ctype = json.dumps(snapshot(), ensure_ascii=False).encode("utf-8"), "application/json"
+        elif self.path.startswith("/metrics"):
+            body, ctype = render_prometheus().encode("utf-8"), "text/plain; version=0.0.4; charset=utf-8"
+        else:
+            self.send_error(404); return
+        self.send_response(200)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):  # bez výpisu každého scrape do konzole
+        pass
+
+_server: Optional[ThreadingHTTPServer] = None
+_server_lock = threading.Lock()
+
+def start_http_server(port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Spustí (jednou za proces) HTTP endpoint /metrics a /metrics.json na pozadí."""
+    global _server
+    with _server_lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((host, port), _Handler)
+            threading.Thread(target=_server.serve_forever, name="metrics-http", daemon=True).start()
+        return _server
+
+def init_from_env() -> None:
+    port = os.environ.get("ZPP_METRICS_PORT")
+    if port:
+        try: start_http_server(int(port), os.environ.get("ZPP_METRICS_HOST", "127.0.0.1"))
+        except OSError: pass   # port drží jiný proces (např. druhá instance)
+    log_path = os.environ.get("ZPP_METRICS_LOG")
+    if log_path and not _log.handlers:
+        h = logging.StreamHandler() if log_path == "-" else logging.FileHandler(log_path, encoding="utf-8")
+        h.setFormatter(logging.Formatter("%(message)s"))
+        _log.addHandler(h)
+        _log.setLevel(logging.INFO)
+        _log.propagate = False
@@ -0,0 +1,123 @@
+from __future__ import annotations
+import contextlib
+import cProfile
+import functools
+import io
+import pstats
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Any, Callable, Dict, List, Optional
+
+# Lehké měření doby běhu. span("jméno") / @timed("jméno") zaznamenají trvání do
+# procesového histogramu (posledních WINDOW měření na span) a do seznamu spanů
+# aktuálního rerunu. Admin panel z toho počítá p50/p95.
+WINDOW = 500
+
+_lock = threading.Lock()
+_samples: Dict[str, deque] = defaultdict(lambda: deque(maxlen=WINDOW))
+_counts: Dict[str, int] = defaultdict(int)
+_local = threading.local()
+
+def _record(name: str, ms: float) -> None:
+    with _lock:
+        _samples[name].append(ms)
+        _counts[name] += 1
+    spans = getattr(_local, "spans", None)
+    if spans is not None:
+        spans.append((name, ms))
+
+@contextlib.contextmanager
+def span(name: str):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        _record(name, (time.perf_counter() - t0) * 1000)
+
+def timed(name: Optional[str] = None) -> Callable:
+    def deco(fn: Callable) -> Callable:
+        label = name or f"{fn.__module__}.{fn.__qualname__}"
+        @functools.wraps(fn)
+        def wrapper(*a, **kw):
+            with span(label):
+                return fn(*a, **kw)
+        return wrapper
+    return deco
+
+def begin_rerun() -> None:
+    """Začátek skriptu – spany tohoto vlákna se od teď sbírají do nového rerunu."""
+    _local.spans = []
+    _local.t0 = time.perf_counter()
+
+def end_rerun() -> List[tuple]:
+    spans = getattr(_local, "spans", None) or []
+    t0 = getattr(_local, "t0", None)
+    if t0 is not None:
+        _record("rerun", (time.perf_counter() - t0) * 1000)
+    _local.spans = None
+    return spans
+
+def _pct(sorted_vals: List[float], q: float) -> float:
+    if not sorted_vals: return 0.0
+    i = min(len(sorted_vals) - 1, max(0, int(round(q * (len(sorted_vals) - 1)))))
+    return sorted_vals[i]
+
+def summary() -> List[Dict[str, Any]]:
+    with _lock:
+        snap = {k: sorted(v) for k, v in _samples.items()}
+        counts = dict(_counts)
+    out = []
+    for name, vals in snap.items():
+        out.append({"span": name, "count": counts.get(name, 0), "p50_ms": round(_pct(vals, .5), 2),
+                    "p95_ms": round(_pct(vals, .95), 2), "max_ms": round(vals[-1] if vals else 0, 2)})
+    out.sort(key=lambda r: r["p95_ms"], reverse=True)
+    return out
+
+def reset() -> None:
+    with _lock:
+        _samples.clear(); _counts.clear()
+
+@contextlib.contextmanager
+def profile(enabled: bool, sink: Dict[str, str]):
+    """cProfile jednoho rerunu; textový výpis (top 40 podle cumtime) se uloží do sink["text"]."""
+    if not enabled:
+        yield; return
+    prof = cProfile.Profile()
+    prof.enable()
+    try:
+        yield
+    finally:
+        prof.disable()
+        buf = io.StringIO()
+        pstats.Stats(prof, stream=buf).sort_stats("cumulative").print_stats(40)
+        sink["text"] = buf.getvalue()
+
+def render_perf_panel() -> None:
+    import streamlit as st
+    from modules.auth import require_role
+    if not require_role("admin"):
+        return
+    st.header("⏱️ Výkon – doba běhu")
+    rows = summary()
+    if rows:
+        st.dataframe(rows, use_container_width=True, hide_index=True)
+    else:
+        st.info("Zatím nejsou žádná měření.")
+    last = st.session_state.get("perf_last_spans") or []
+    if last:
+        with st.expander("Spany posledního rerunu", expanded=False):
+            st.dataframe([{"span": n, "ms": round(ms, 2)} for n, ms in last], use_container_width=True, hide_index=True)
+    c1, c2 = st.columns(2)
+    with c1:
+        if st.button("🧪 Profilovat příští rerun (cProfile)", use_container_width=True, key="perf_profile_next"):
+            st.session_state["perf_profile_next"] = True
+            st.rerun()
+    with c2:
+        if st.button("🧹 Vynulovat měření", use_container_width=True, key="perf_reset"):
+            reset(); st.rerun()
+    if st.session_state.get("perf_profile_text"):
+        with st.expander("Výstup profileru", expanded=True):
+            st.code(st.session_state["perf_profile_text"])
+    from modules.report.session import render_memory_panel
+    render_memory_panel()
@@ -1 +1,13 @@
-from .main import render_report
+def render_report():
+    # Report (záložky, úložiště, streamlit komponenty) se načte až při prvním otevření
+    from .main import render_report as _render
+    return _render()
+
+def render_checklist():
+    from .main import render_checklist as _render
+    return _render()
+
+def release_report_state():
+    # Mimo stránku reportu uvolní session_state naposledy otevřeného reportu
+    from .session import track
+    track(None)
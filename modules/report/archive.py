@@ -0,0 +1,151 @@
+from __future__ import annotations
+import argparse
+import datetime as dt
+import os
+import shutil
+import threading
+import zipfile
+from pathlib import Path
+from . import codec, storage
+from .utils import fs_safe
+from .. import metrics, shared
+
+# Archiv uzavřených reportů. Report uzavřený déle než N dní se i se složkou příloh
+# přesune do měsíčního balíku reports/_archive/YYYY-MM.zip (měsíc založení reportu).
+# Centrální index _archive/index.json mapuje ID reportu na balík a jeho členy,
+# čtení jednoho reportu je tak jeden přímý přístup do ZIPu. Balík se nikdy nedoplňuje
+# na místě: reporty se připíšou do kopie a ta balík atomicky nahradí, takže pád nebo
+# plný disk uprostřed zápisu nepoškodí už archivované reporty. Reporty otevřené
+# k úpravám (zámek ve shared) se archivují až při dalším běhu.
+ARCHIVE_DIR = storage.REPORTS_DIR / "_archive"
+_STORED = {".jpg", ".jpeg", ".png", ".webp", ".pdf", ".gz", ".zst"}   # už komprimované formáty
+_lock = threading.Lock()
+_cache: dict = {"mtime": None, "db": {}}
+
+def index_path() -> Path:
+    return ARCHIVE_DIR / "index.json"
+
+def load_index() -> dict:
+    p = index_path()
+    try: mtime = p.stat().st_mtime
+    except FileNotFoundError: return {}
+    metrics.cache("archive_index", _cache["mtime"] == mtime)
+    if _cache["mtime"] != mtime:
+        _cache.update(mtime=mtime, db=storage.read_json(p).get("reports", {}))
+    return _cache["db"]
+
+def is_archived(rid: str) -> bool:
+    return rid in load_index()
+
+def read_report(rid: str) -> dict:
+    rec = load_index().get(rid)
+    if not rec: return {}
+    with zipfile.ZipFile(ARCHIVE_DIR / rec["bundle"]) as z:
+        return codec.decode(z.read(rec["report"]), rec.get("format", "json"))
+
+def read_attachment(rid: str, name: str) -> bytes | None:
+    rec = load_index().get(rid)
+    if not rec or name not in rec.get("files", []): return None
+    with zipfile.ZipFile(ARCHIVE_DIR / rec["bundle"]) as z:
+        return z.read(name)
+
+def list_archived(oec: str | None = None) -> list[dict]:
+    out = [{"id": rid, "title": r.get("title", rid), "oec": r.get("oec"), "created": r.get("created", ""),
+            "archived": True} for rid, r in load_index().items() if not oec or r.get("oec") == oec]
+    out.sort(key=lambda r: r["created"], reverse=True)
+    return out
+
+def closed_before(data: dict, cutoff: dt.date) -> bool:
+    closed = (data.get("meta") or {}).get("closed_at")
+    if not closed: return False
+    try: return dt.date.fromisoformat(str(closed)[:10]) <= cutoff
+    except ValueError: return False
+
+def _bundle_name(data: dict) -> str:
+    created = str((data.get("meta") or {}).get("created") or dt.date.today().isoformat())
+    return f"{created[:7]}.zip"
+
+def _write_members(z: zipfile.ZipFile, existing: set, p: Path, rid: str, att_dir: Path) -> tuple[str, list[str]]:
+    prefix = fs_safe(rid)
+    member = f"{prefix}/{p.name}"
+    if member not in existing:
+        z.write(p, member)
+    files = []
+    if att_dir.is_dir():
+        for f in sorted(att_dir.rglob("*")):
+            if not f.is_file(): continue
+            name = f"{prefix}/files/{f.relative_to(att_dir).as_posix()}"
+            if name not in existing:
+                ctype = zipfile.ZIP_STORED if f.suffix.lower() in _STORED else zipfile.ZIP_DEFLATED
+                z.write(f, name, compress_type=ctype)
+            files.append(name)
+    return member, files
+
+def _archive_bundle(bundle: str, items: list[tuple[Path, dict, str]], db: dict) -> None:
+    """Připíše reporty do kopie balíku, kopii atomicky vymění za balík, uloží index
+    a teprve pak smaže originály."""
+    ARCHIVE_DIR.mkdir(parents=True, exist_ok=True)
+    dest = ARCHIVE_DIR / bundle
+    tmp = dest.with_name(dest.name + ".tmp")
+    if dest.exists(): shutil.copy2(dest, tmp)
+    else: tmp.unlink(missing_ok=True)
+    done = []
+    try:
+        with zipfile.ZipFile(tmp, "a", compression=zipfile.ZIP_DEFLATED) as z:
+            existing = set(z.namelist())
+            for p, data, rid in items:
+                att_dir = storage.attachments_dir(rid, create=False)
+                member, files = _write_members(z, existing, p, rid, att_dir)
+                meta = data.get("meta") or {}
+                done.append((p, att_dir))
+                db[rid] = {"bundle": bundle, "report": member, "format": codec.format_of(p), "files": files,
+                           "title": meta.get("title", rid), "oec": meta.get("oec"), "created": meta.get("created", ""),
+                           "closed_at": meta.get("closed_at"), "kopis": (meta.get("kopis") or {}).get("id"),
+                           "archived_at": dt.datetime.now().isoformat(timespec="seconds")}
+        with open(tmp, "rb") as f: os.fsync(f.fileno())
+        tmp.replace(dest)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        for _, _, rid in items: db.pop(rid, None)
+        raise
+    # Index se uloží dřív, než se smažou originály – report je vždy dohledatelný
+    storage.write_index(index_path(), {"meta": {"version": 1}, "reports": db})
+    for p, att_dir in done:
+        p.unlink(missing_ok=True)
+        shutil.rmtree(att_dir, ignore_errors=True)
+
+def _cancel_autosave(p: Path) -> None:
+    # Čekající autosave téhož procesu by soubor po archivaci vytvořil znovu (jiné procesy
+    # archivované reporty přeskočí samy – autosave kontroluje index archivu)
+    from . import autosave
+    if autosave._writer is not None: autosave._writer.cancel(p)
+
+def archive_closed(days: int = 90, dry_run: bool = False) -> list[str]:
+    """Přesune do archivu reporty uzavřené alespoň před `days` dny; vrací jejich ID."""
+    cutoff = dt.date.today() - dt.timedelta(days=days)
+    by_bundle: dict[str, list[tuple[Path, dict, str]]] = {}
+    with _lock:
+        db = dict(load_index())
+        for p in list(storage.iter_report_files()):
+            data = storage.read_json(p)
+            if not data or not closed_before(data, cutoff): continue
+            rid = data.get("meta", {}).get("id") or storage.report_stem(p)
+            if shared.lock_holder(shared.report_lock(rid)): continue   # právě se upravuje
+            by_bundle.setdefault(_bundle_name(data), []).append((p, data, rid))
+        if not dry_run:
+            for bundle, items in by_bundle.items():
+                for p, _, _ in items: _cancel_autosave(p)
+                _archive_bundle(bundle, items, db)
+    return [rid for items in by_bundle.values() for _, _, rid in items]
+
+def main(argv: list[str] | None = None) -> None:
+    ap = argparse.ArgumentParser(description="Archivace uzavřených reportů do měsíčních balíků.")
+    ap.add_argument("--days", type=int, default=90, help="uzavřené alespoň před tolika dny")
+    ap.add_argument("--dry-run", action="store_true")
+    a = ap.parse_args(argv)
+    ids = archive_closed(a.days, a.dry_run)
+    print(("K archivaci" if a.dry_run else "Archivováno") + f": {len(ids)}")
+    for rid in ids: print(f"  {rid}")
+
+if __name__ == "__main__":
+    main()
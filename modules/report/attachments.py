@@ -0,0 +1,101 @@
+from __future__ import annotations
+import base64
+import datetime as dt
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+from .utils import fs_safe
+from .. import metrics
+
+# Příjem příloh k reportu – soubor se po blocích proudí do dočasného souboru ve složce
+# reportu, průběžně se počítá SHA-256 a podle něj se duplicitní nahrání (rerun se stejným
+# souborem v uploaderu) nepřidá znovu. Celková velikost příloh reportu je omezena kvótou.
+CHUNK = 1 << 20
+MAX_FILE_BYTES = int(os.environ.get("ZPP_MAX_ATTACHMENT_MB", "50")) << 20
+MAX_REPORT_BYTES = int(os.environ.get("ZPP_MAX_REPORT_MB", "300")) << 20
+
+class QuotaError(Exception):
+    pass
+
+def find_by_hash(ctx, sha256: str) -> dict | None:
+    for a in ctx.data.get("attachments") or []:
+        if a.get("sha256") == sha256:
+            return a
+    return None
+
+def used_bytes(ctx) -> int:
+    total = 0
+    for a in ctx.data.get("attachments") or []:
+        size = a.get("size")
+        if size is None:
+            try: size = Path(a.get("file", "")).stat().st_size
+            except OSError: size = 0
+        total += int(size)
+    return total
+
+def check_quota(ctx, size: int) -> None:
+    if size > MAX_FILE_BYTES or used_bytes(ctx) + size > MAX_REPORT_BYTES:
+        raise QuotaError(
+            f"Soubor překračuje limit příloh reportu "
+            f"({MAX_FILE_BYTES >> 20} MB na soubor, {MAX_REPORT_BYTES >> 20} MB celkem).")
+
+def _unique_dest(folder: Path, name: str, sha256: str) -> Path:
+    dest = folder / name
+    if dest.exists():
+        dest = folder / f"{dest.stem}_{sha256[:8]}{dest.suffix}"
+    return dest
+
+def ingest(ctx, fileobj, name: str, kind: str = "sketch", prefix: str = "") -> tuple[dict, bool]:
+    """Uloží soubor k reportu; vrací (záznam přílohy, True pokud jde o nový soubor)."""
+    used = used_bytes(ctx)
+    folder = ctx.attachments_dir()
+    h, size = hashlib.sha256(), 0
+    fd, tmp_name = tempfile.mkstemp(dir=folder, suffix=".part")
+    tmp = Path(tmp_name)
+    try:
+        if hasattr(fileobj, "seek"): fileobj.seek(0)
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = fileobj.read(CHUNK)
+                if not chunk: break
+                size += len(chunk)
+                if size > MAX_FILE_BYTES or used + size > MAX_REPORT_BYTES:
+                    check_quota(ctx, size)
+                h.update(chunk)
+                out.write(chunk)
+        sha = h.hexdigest()
+        existing = find_by_hash(ctx, sha)
+        if existing:
+            tmp.unlink(missing_ok=True)
+            return existing, False
+        dest = _unique_dest(folder, f"{prefix}{fs_safe(name)}", sha)
+        tmp.replace(dest)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    entry = {
+        "type": kind,
+        "name": dest.name,
+        "file": str(dest),
+        "uploaded": dt.datetime.now().isoformat(timespec="seconds"),
+        "size": size,
+        "sha256": sha,
+    }
+    ctx.data.setdefault("attachments", []).append(entry)
+    metrics.inc("zpp_attachment_bytes_written_total", size, labels={"kind": kind}, doc="Zapsané bajty příloh.")
+    return entry, True
+
+def data_url(src, mime: str) -> str:
+    """data: URL ze souboru (cesta) nebo otevřeného streamu – base64 po blocích dělitelných 3."""
+    parts = []
+    f = open(src, "rb") if isinstance(src, (str, Path)) else src
+    try:
+        if hasattr(f, "seek"): f.seek(0)
+        while True:
+            chunk = f.read(3 * CHUNK)
+            if not chunk: break
+            parts.append(base64.b64encode(chunk).decode("ascii"))
+    finally:
+        if f is not src: f.close()
+    return f"data:{mime};base64," + "".join(parts)
@@ -0,0 +1,153 @@
+from __future__ import annotations
+import atexit
+import datetime as dt
+import json
+import threading
+import time
+from pathlib import Path
+from . import archive, storage
+from .. import metrics
+
+# Automatické ukládání reportů – jedno vlákno na proces.
+# submit() jen vloží snímek dat do fronty (poslední snímek téhož souboru přepíše předchozí),
+# vlákno soubor zapíše, až se report DEBOUNCE_S sekund nezměnil (nejpozději po MAX_DELAY_S).
+DEBOUNCE_S = 2.0
+MAX_DELAY_S = 10.0
+
+class AutosaveWriter:
+    def __init__(self, debounce: float = DEBOUNCE_S, max_delay: float = MAX_DELAY_S):
+        self.debounce, self.max_delay = debounce, max_delay
+        self._pending: dict[str, dict] = {}          # cesta -> {"path", "data", "first", "last"}
+        self._inflight: dict[str, dict] = {}         # právě zapisované snímky
+        self._seq = 0                                 # pořadí snímků (rostoucí)
+        self._barrier: dict[str, int] = {}           # cesta -> snímky s nižším pořadím jsou zastaralé
+        self._cond = threading.Condition()
+        self._io_lock = threading.Lock()               # zápis na disk (autosave i ruční uložení)
+        self._saved_at: dict[str, str] = {}
+        self._stats = {"submitted": 0, "coalesced": 0, "written": 0, "errors": 0, "cancelled": 0, "last_write_ms": 0.0}
+        self._stop = False
+        self._thread = threading.Thread(target=self._run, name="report-autosave", daemon=True)
+        self._thread.start()
+
+    def submit(self, path: Path, data: dict, by: str = "") -> None:
+        # Snímek přes JSON – UI vlákno může ctx.data dál měnit
+        snap = json.loads(json.dumps(data, ensure_ascii=False, default=str))
+        now = time.monotonic()
+        with self._cond:
+            key = str(path)
+            prev = self._pending.get(key)
+            self._stats["submitted"] += 1
+            if prev: self._stats["coalesced"] += 1
+            self._seq += 1
+            self._pending[key] = {"path": path, "data": snap, "seq": self._seq, "by": by,
+                                  "first": prev["first"] if prev else now, "last": now}
+            self._cond.notify()
+
+    def latest(self, path: Path) -> dict | None:
+        """Čekající (ještě nezapsaný) snímek souboru – rerun musí vidět data novější než disk."""
+        with self._cond:
+            item = self._pending.get(str(path)) or self._inflight.get(str(path))
+            return json.loads(json.dumps(item["data"], ensure_ascii=False)) if item else None
+
+    def cancel(self, path: Path) -> None:
+        """Zahodí čekající i právě zapisovaný snímek. Po návratu už vlákno soubor nepřepíše
+        žádným snímkem odeslaným před voláním (rozpracovaný zápis se dokončí dřív)."""
+        with self._cond:
+            key = str(path)
+            self._pending.pop(key, None)
+            self._inflight.pop(key, None)
+            self._seq += 1
+            self._barrier[key] = self._seq
+        with self._io_lock:
+            pass
+
+    def write_now(self, path: Path, data: dict, by: str = "") -> None:
+        """Synchronní uložení – zahodí čekající starší snímek, aby ho vlákno nezapsalo až po něm."""
+        self.cancel(path)
+        with self._io_lock:
+            storage.write_json(path, data, by=by)
+            self._saved_at[str(path)] = dt.datetime.now().isoformat(timespec="seconds")
+
+    def _due(self, now: float) -> tuple[list[dict], float | None]:
+        due, wait = [], None
+        for key, item in list(self._pending.items()):
+            at = min(item["last"] + self.debounce, item["first"] + self.max_delay)
+            if at <= now or self._stop:
+                due.append(self._pending.pop(key))
+                self._inflight[key] = due[-1]
+            else:
+                wait = at - now if wait is None else min(wait, at - now)
+        return due, wait
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                due, wait = self._due(time.monotonic())
+                if not due:
+                    if self._stop: return
+                    self._cond.wait(timeout=wait)
+                    continue
+            for item in due:
+                self._write(item)
+
+    def _write(self, item: dict) -> None:
+        t0 = time.perf_counter()
+        try:
+            with self._io_lock:
+                with self._cond:
+                    stale = item.get("seq", 0) < self._barrier.get(str(item["path"]), 0)
+                # Report mezitím archivovaný (i jiným procesem) – soubor už nevytvářet znovu
+                stale = stale or archive.is_archived((item["data"].get("meta") or {}).get("id") or "")
+                if not stale: storage.write_json(item["path"], item["data"], by=item.get("by", ""))
+            if stale:
+                self._stats["cancelled"] += 1
+            else:
+                self._saved_at[str(item["path"])] = dt.datetime.now().isoformat(timespec="seconds")
+                self._stats["written"] += 1
+        except Exception:
+            self._stats["errors"] += 1
+        self._stats["last_write_ms"] = round((time.perf_counter() - t0) * 1000, 2)
+        with self._cond:
+            if self._inflight.get(str(item["path"])) is item:
+                self._inflight.pop(str(item["path"]), None)
+
+    def flush(self) -> None:
+        """Okamžitě zapíše vše, co čeká ve frontě (volá se i při ukončení procesu)."""
+        with self._cond:
+            items = list(self._pending.values()); self._pending.clear()
+            for item in items: self._inflight[str(item["path"])] = item
+        for item in items:
+            self._write(item)
+
+    def close(self) -> None:
+        with self._cond:
+            self._stop = True; self._cond.notify()
+        self._thread.join(timeout=5)
+        self.flush()
+
+    def saved_at(self, path: Path) -> str | None:
+        return self._saved_at.get(str(path))
+
+    def stats(self) -> dict:
+        with self._cond:
+            depth = len(self._pending)
+        return {"queue_depth": depth, **self._stats}
+
+def load(path: Path) -> dict:
+    """Aktuální stav reportu: čekající snímek z fronty, jinak obsah souboru."""
+    metrics.inc("zpp_report_loads_total", doc="Počet načtení reportů.")
+    with metrics.timer("zpp_report_load_duration_ms", doc="Doba načtení reportu."):
+        pending = writer().latest(path)
+        metrics.cache("autosave_pending", pending is not None)
+        return pending if pending is not None else storage.read_json(path)
+
+_writer: AutosaveWriter | None = None
+_writer_lock = threading.Lock()
+
+def writer() -> AutosaveWriter:
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = AutosaveWriter()
+            atexit.register(_writer.close)
+        return _writer
@@ -0,0 +1,136 @@
+from __future__ import annotations
+import atexit
+import datetime as dt
+import hashlib
+import io
+import queue
+import threading
+from pathlib import Path
+from . import attachments
+from .. import metrics
+
+# Sériové focení – UI vlákno jen spočítá hash a předá bajty pracovnímu vláknu, které fotku
+# uloží a vytvoří náhled (thumbs/<jméno>.jpg). Do reportu se záznam přílohy dostane až po
+# úspěšném zápisu (collect() při dalším vykreslení) – neuložená fotka v reportu nikdy není.
+THUMB_PX = 320
+
+def thumb_path(photo: Path) -> Path:
+    return photo.parent / "thumbs" / f"{photo.stem}.jpg"
+
+def _make_thumb(raw: bytes, dest: Path) -> None:
+    try:
+        from PIL import Image
+    except Exception:
+        return  # bez Pillow galerie zobrazí přímo originál
+    img = Image.open(io.BytesIO(raw))
+    img.thumbnail((THUMB_PX, THUMB_PX))
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    img.convert("RGB").save(dest, "JPEG", quality=80)
+
+class CaptureWorker:
+    def __init__(self):
+        self._q: queue.Queue = queue.Queue()
+        self._pending: dict[str, list[dict]] = {}   # složka reportu -> záznamy čekající na zápis
+        self._done: dict[str, list[dict]] = {}      # složka reportu -> uložené, report je ještě nepřevzal
+        self._failed: dict[str, list[str]] = {}     # složka reportu -> jména fotek, které se neuložily
+        self._lock = threading.Lock()
+        self.errors = 0
+        self._thread = threading.Thread(target=self._run, name="capture-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, raw: bytes, dest: Path, entry: dict) -> None:
+        with self._lock:
+            self._pending.setdefault(str(dest.parent), []).append(entry)
+        self._q.put((raw, dest, entry))
+
+    def pending(self, folder: Path) -> int:
+        with self._lock:
+            return len(self._pending.get(str(folder), ()))
+
+    def queued(self, folder: Path) -> list[dict]:
+        """Záznamy fotek složky, které ještě nejsou v reportu (čekající i uložené)."""
+        with self._lock:
+            return self._pending.get(str(folder), []) + self._done.get(str(folder), [])
+
+    def take_done(self, folder: Path) -> list[dict]:
+        with self._lock:
+            return self._done.pop(str(folder), [])
+
+    def take_failed(self, folder: Path) -> list[str]:
+        with self._lock:
+            return self._failed.pop(str(folder), [])
+
+    def _run(self) -> None:
+        while True:
+            job = self._q.get()
+            if job is None:
+                self._q.task_done(); return
+            raw, dest, entry = job
+            ok = False
+            try:
+                tmp = dest.with_suffix(dest.suffix + ".part")
+                tmp.write_bytes(raw)
+                tmp.replace(dest)
+                ok = True
+                _make_thumb(raw, thumb_path(dest))
+            except Exception as e:
+                if not ok:
+                    self.errors += 1
+                    metrics.inc("zpp_capture_errors_total", doc="Fotky, které se nepodařilo uložit.")
+                    metrics.log_event("capture_error", file=str(dest), error=str(e))
+                # chyba náhledu fotku neruší – galerie zobrazí originál
+            finally:
+                with self._lock:
+                    k = str(dest.parent)
+                    left = [e for e in self._pending.get(k, []) if e is not entry]
+                    if left: self._pending[k] = left
+                    else: self._pending.pop(k, None)
+                    if ok: self._done.setdefault(k, []).append(entry)
+                    else: self._failed.setdefault(k, []).append(entry["name"])
+                self._q.task_done()
+
+    def close(self) -> None:
+        self._q.put(None)
+        self._thread.join(timeout=30)
+
+_worker: CaptureWorker | None = None
+_worker_lock = threading.Lock()
+
+def worker() -> CaptureWorker:
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = CaptureWorker()
+            atexit.register(_worker.close)
+        return _worker
+
+def enqueue_photo(ctx, raw: bytes, mime: str) -> tuple[dict, bool]:
+    """Předá fotku k uložení na pozadí; vrací (záznam, True pokud je nová). Záznam přidá
+    do reportu až collect() po úspěšném zápisu."""
+    sha = hashlib.sha256(raw).hexdigest()
+    queued = worker().queued(ctx.attachments_dir())
+    existing = attachments.find_by_hash(ctx, sha) or next((e for e in queued if e["sha256"] == sha), None)
+    if existing:
+        return existing, False
+    attachments.check_quota(ctx, len(raw) + sum(e["size"] for e in queued))
+    ext = ".png" if mime == "image/png" else ".jpg"
+    now = dt.datetime.now()
+    dest = ctx.attachments_dir() / f"sketch_cam_{now:%Y%m%d_%H%M%S_%f}_{sha[:8]}{ext}"
+    entry = {
+        "type": "sketch",
+        "name": dest.name,
+        "file": str(dest),
+        "thumb": str(thumb_path(dest)),
+        "uploaded": now.isoformat(timespec="seconds"),
+        "size": len(raw),
+        "sha256": sha,
+    }
+    worker().submit(raw, dest, entry)
+    metrics.inc("zpp_attachment_bytes_written_total", len(raw), labels={"kind": "camera"}, doc="Zapsané bajty příloh.")
+    return entry, True
+
+def collect(ctx) -> int:
+    """Převezme do reportu fotky, které vlákno už uložilo; vrací jejich počet."""
+    done = [e for e in worker().take_done(ctx.attachments_dir()) if not attachments.find_by_hash(ctx, e["sha256"])]
+    ctx.data.setdefault("attachments", []).extend(done)
+    return len(done)
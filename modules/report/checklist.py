@@ -0,0 +1,225 @@
+from __future__ import annotations
+import datetime as dt
+import hashlib
+import heapq
+import json
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+import streamlit as st
+
+# Checklisty řízené daty. Šablony (data/checklists/*.json, s PyYAML i *.yaml) se při
+# načtení jednou zkompilují: podmínky viditelnosti (visible_if) na funkce a index
+# závislostí pole -> položky, které na něm závisí. Po změně odpovědi se přepočítají
+# jen závislé položky (a dál jen ty, jejichž viditelnost se opravdu změnila).
+# Odpovědi jsou v reportu: ctx.data["checklist"][id šablony]["answers"].
+CHECKLIST_DIR = Path("data") / "checklists"
+TYPES = {"check", "select", "multi", "text", "number"}
+
+Rule = Callable[[Callable[[str], Any]], bool]
+
+@dataclass
+class Node:
+    id: str
+    pos: int
+    label: str
+    section: Optional[str] = None            # u položky ID sekce, u sekce None
+    spec: Dict[str, Any] = field(default_factory=dict)
+    rule: Optional[Rule] = None
+
+@dataclass
+class Template:
+    id: str
+    title: str
+    version: int
+    nodes: Dict[str, Node]                    # v pořadí šablony (sekce před svými položkami)
+    dependents: Dict[str, List[str]]          # pole/sekce -> uzly, jejichž viditelnost na něm závisí
+    sections: List[tuple]                     # [(uzel sekce, [uzly položek])]
+
+    def evaluate_all(self, answers: dict) -> Dict[str, bool]:
+        visible: Dict[str, bool] = {}
+        for node in self.nodes.values():
+            visible[node.id] = self._visible(node, answers, visible)
+        return visible
+
+    def update(self, visible: Dict[str, bool], answers: dict, changed: List[str]) -> int:
+        """Přepočte viditelnost jen uzlů závislých na `changed`; vrací počet vyhodnocených pravidel."""
+        heap = [(self.nodes[d].pos, d) for c in changed for d in self.dependents.get(c, ())]
+        heapq.heapify(heap)
+        done, evaluated = set(), 0
+        while heap:
+            _, nid = heapq.heappop(heap)
+            if nid in done: continue
+            done.add(nid)
+            evaluated += 1
+            now = self._visible(self.nodes[nid], answers, visible)
+            if now != visible.get(nid):
+                visible[nid] = now
+                for d in self.dependents.get(nid, ()):
+                    heapq.heappush(heap, (self.nodes[d].pos, d))
+        return evaluated
+
+    def _visible(self, node: Node, answers: dict, visible: Dict[str, bool]) -> bool:
+        if node.section and not visible.get(node.section, True):
+            return False
+        if node.rule is None:
+            return True
+        # Skrytá položka se chová jako nevyplněná
+        return bool(node.rule(lambda f: answers.get(f) if visible.get(f) else None))
+
+def _match(val: Any, want: Any) -> bool:
+    return want in val if isinstance(val, list) else val == want
+
+def _compile_rule(cond: dict, known: set, where: str) -> tuple[Rule, set]:
+    if "all" in cond or "any" in cond:
+        parts = [_compile_rule(c, known, where) for c in (cond["all"] if "all" in cond else cond["any"]) or []]
+        fns = [p[0] for p in parts]
+        deps = set().union(*(p[1] for p in parts))
+        return ((lambda g: all(f(g) for f in fns)) if "all" in cond else (lambda g: any(f(g) for f in fns))), deps
+    if "not" in cond:
+        fn, deps = _compile_rule(cond["not"], known, where)
+        return (lambda g: not fn(g)), deps
+    f = cond.get("field")
+    if f not in known:
+        raise ValueError(f"{where}: podmínka odkazuje na '{f}', které není definováno před ní")
+    if "eq" in cond:
+        v = cond["eq"]; return (lambda g: _match(g(f), v)), {f}
+    if "ne" in cond:
+        v = cond["ne"]; return (lambda g: not _match(g(f), v)), {f}
+    if "in" in cond:
+        vs = list(cond["in"]); return (lambda g: any(_match(g(f), v) for v in vs)), {f}
+    if "set" in cond:
+        v = bool(cond["set"]); return (lambda g: bool(g(f)) == v), {f}
+    raise ValueError(f"{where}: neznámý tvar podmínky {cond}")
+
+def compile_template(raw: dict) -> Template:
+    tid = str(raw["id"])
+    nodes: Dict[str, Node] = {}
+    dependents: Dict[str, List[str]] = {}
+    sections = []
+
+    def add(node: Node, cond: Optional[dict]) -> None:
+        if node.id in nodes:
+            raise ValueError(f"{tid}: duplicitní ID '{node.id}'")
+        if cond:
+            node.rule, deps = _compile_rule(cond, set(nodes), f"{tid}/{node.id}")
+            for d in deps: dependents.setdefault(d, []).append(node.id)
+        if node.section:
+            dependents.setdefault(node.section, []).append(node.id)
+        nodes[node.id] = node
+
+    for s in raw.get("sections", []):
+        sid = f"§{s['id']}"
+        sec = Node(sid, len(nodes), s.get("title", s["id"]))
+        add(sec, s.get("visible_if"))
+        items = []
+        for it in s.get("items", []):
+            if it.get("type", "check") not in TYPES:
+                raise ValueError(f"{tid}/{it.get('id')}: neznámý typ '{it.get('type')}'")
+            node = Node(str(it["id"]), len(nodes), it.get("label", it["id"]), section=sid, spec=it)
+            add(node, it.get("visible_if"))
+            items.append(node)
+        sections.append((sec, items))
+    return Template(tid, raw.get("title", tid), int(raw.get("version", 1)), nodes, dependents, sections)
+
+def _read(p: Path) -> dict:
+    if p.suffix == ".json":
+        return json.loads(p.read_text(encoding="utf-8"))
+    import yaml   # volitelné – bez PyYAML se YAML šablony přeskočí
+    return yaml.safe_load(p.read_text(encoding="utf-8"))
+
+_lock = threading.Lock()
+_cache: Dict[str, tuple] = {}        # cesta -> (mtime, Template | chyba)
+
+def load_templates() -> tuple[Dict[str, Template], List[str]]:
+    """Zkompilované šablony (kompilace jen při změně souboru) a seznam chyb načítání."""
+    paths = sorted(p for pat in ("*.json", "*.yaml", "*.yml") for p in CHECKLIST_DIR.glob(pat))
+    out, errors = {}, []
+    with _lock:
+        for p in paths:
+            mtime = p.stat().st_mtime
+            hit = _cache.get(str(p))
+            if not hit or hit[0] != mtime:
+                try: res = compile_template(_read(p))
+                except ImportError: continue
+                except Exception as e: res = f"{p.name}: {e}"
+                hit = _cache[str(p)] = (mtime, res)
+            if isinstance(hit[1], Template): out[hit[1].id] = hit[1]
+            else: errors.append(hit[1])
+    return out, errors
+
+# ---------- UI ----------
+
+def _answers(ctx, tpl: Template) -> dict:
+    rec = ctx.data.setdefault("checklist", {}).setdefault(tpl.id, {"version": tpl.version, "answers": {}})
+    return rec["answers"]
+
+def _fingerprint(answers: dict) -> str:
+    return hashlib.blake2b(json.dumps(answers, sort_keys=True, default=str).encode("utf-8"), digest_size=8).hexdigest()
+
+def _visibility(ctx, tpl: Template) -> Dict[str, bool]:
+    # Viditelnost žije v relaci; celé vyhodnocení jen při prvním zobrazení, nové verzi šablony
+    # nebo když se odpovědi změnily jinak než widgetem (znovunačtený report, sloučený koncept)
+    key = ctx.key(f"cl_vis_{tpl.id}")
+    state = st.session_state.get(key)
+    answers = _answers(ctx, tpl)
+    fp = _fingerprint(answers)
+    if not state or state.get("tpl") is not tpl or state.get("fp") != fp:
+        state = st.session_state[key] = {"tpl": tpl, "fp": fp, "visible": tpl.evaluate_all(answers)}
+    return state["visible"]
+
+def _widget_key(ctx, tpl: Template, item_id: str) -> str:
+    return ctx.key(f"cl_{tpl.id}_{item_id}")
+
+def _on_change(ctx, tpl: Template, item_id: str) -> None:
+    visible = _visibility(ctx, tpl)            # platná pro odpovědi před změnou
+    answers = _answers(ctx, tpl)
+    answers[item_id] = st.session_state.get(_widget_key(ctx, tpl, item_id))
+    ctx.data["checklist"][tpl.id]["updated"] = dt.datetime.now().isoformat(timespec="seconds")
+    tpl.update(visible, answers, [item_id])
+    st.session_state[ctx.key(f"cl_vis_{tpl.id}")]["fp"] = _fingerprint(answers)
+
+def _render_item(ctx, tpl: Template, node: Node, value: Any) -> None:
+    spec, key = node.spec, _widget_key(ctx, tpl, node.id)
+    kw = dict(key=key, on_change=_on_change, args=(ctx, tpl, node.id), help=spec.get("help"))
+    typ = spec.get("type", "check")
+    if typ == "check":
+        st.checkbox(node.label, value=bool(value), **kw)
+    elif typ == "select":
+        opts = ["—"] + list(spec.get("options", []))
+        st.selectbox(node.label, opts, index=opts.index(value) if value in opts else 0, **kw)
+    elif typ == "multi":
+        opts = list(spec.get("options", []))
+        st.multiselect(node.label, opts, default=[v for v in (value or []) if v in opts], **kw)
+    elif typ == "number":
+        st.number_input(node.label, value=float(value or 0), **kw)
+    else:
+        st.text_input(node.label, value=value or "", **kw)
+
+def _answered(v: Any) -> bool:
+    return v not in (None, "", "—", [], False)
+
+def render(ctx) -> None:
+    templates, errors = load_templates()
+    for e in errors: st.error(f"Chybná šablona checklistu – {e}")
+    if not templates:
+        st.info(f"Nejsou k dispozici žádné šablony checklistu (složka {CHECKLIST_DIR})."); return
+    ids = list(templates)
+    tid = st.selectbox("Checklist", ids, format_func=lambda i: templates[i].title, key=ctx.key("cl_template")) \
+        if len(ids) > 1 else ids[0]
+    tpl = templates[tid]
+    answers = _answers(ctx, tpl)
+    visible = _visibility(ctx, tpl)
+
+    shown = [n for _, items in tpl.sections for n in items if visible.get(n.id)]
+    done = sum(1 for n in shown if _answered(answers.get(n.id)))
+    st.progress(done / len(shown) if shown else 0.0, text=f"Vyplněno {done} z {len(shown)} položek")
+    for sec, items in tpl.sections:
+        if not visible.get(sec.id): continue
+        vis_items = [n for n in items if visible.get(n.id)]
+        if not vis_items: continue
+        n_done = sum(1 for n in vis_items if _answered(answers.get(n.id)))
+        with st.expander(f"{sec.label} ({n_done}/{len(vis_items)})", expanded=n_done < len(vis_items)):
+            for node in vis_items:
+                _render_item(ctx, tpl, node, answers.get(node.id))
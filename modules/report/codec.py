@@ -0,0 +1,88 @@
+from __future__ import annotations
+import argparse
+import gzip
+import json
+import os
+import time
+from pathlib import Path
+
+try:
+    import zstandard
+except Exception:  # volitelná závislost – bez ní jen json / json.gz
+    zstandard = None
+
+# Formáty souborů reportů. "json" je původní odsazený formát, ostatní ukládají
+# minifikovaný JSON komprimovaný gzipem nebo zstd. Čtení pozná formát podle přípony.
+FORMATS = {"json": "", "json.gz": ".gz", "json.zst": ".zst"}
+COMPRESSED = (".gz", ".zst")
+
+def configured_format() -> str:
+    fmt = os.environ.get("ZPP_REPORT_FORMAT", "json")
+    if fmt == "json.zst" and zstandard is None: fmt = "json.gz"
+    return fmt if fmt in FORMATS else "json"
+
+def format_of(p: Path) -> str:
+    if p.suffix == ".gz": return "json.gz"
+    if p.suffix == ".zst": return "json.zst"
+    return "json"
+
+def base_path(p: Path) -> Path:
+    """reports/x.json.gz -> reports/x.json"""
+    return p.with_suffix("") if p.suffix in COMPRESSED else p
+
+def variant(p: Path, fmt: str) -> Path:
+    b = base_path(p)
+    return b.with_name(b.name + FORMATS[fmt])
+
+def variants(p: Path) -> list[Path]:
+    return [variant(p, f) for f in FORMATS]
+
+def encode(data: dict, fmt: str) -> bytes:
+    if fmt == "json":
+        return json.dumps(data, ensure_ascii=False, indent=2, default=str).encode("utf-8")
+    raw = json.dumps(data, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+    if fmt == "json.gz":
+        return gzip.compress(raw, compresslevel=6, mtime=0)
+    return zstandard.ZstdCompressor(level=6).compress(raw)
+
+def decode(blob: bytes, fmt: str) -> dict:
+    if fmt == "json.gz": blob = gzip.decompress(blob)
+    elif fmt == "json.zst":
+        if zstandard is None: raise RuntimeError("Pro čtení .zst je potřeba balíček zstandard.")
+        blob = zstandard.ZstdDecompressor().decompress(blob)
+    return json.loads(blob.decode("utf-8"))
+
+def _recompress_one(args: tuple[str, str]) -> tuple[int, int, bool]:
+    from . import storage
+    src, fmt = Path(args[0]), args[1]
+    before = src.stat().st_size
+    if format_of(src) == fmt: return before, before, True
+    try: data = decode(src.read_bytes(), format_of(src))
+    except Exception: return before, before, False   # poškozený soubor nechat beze změny
+    dest = storage.store_report_file(src, data, fmt)
+    return before, dest.stat().st_size, True
+
+def recompress(fmt: str, workers: int | None = None) -> dict:
+    from concurrent.futures import ProcessPoolExecutor
+    from . import storage
+    files = [str(p) for p in storage.iter_report_files()]
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        sizes = list(ex.map(_recompress_one, [(f, fmt) for f in files], chunksize=16))
+    return {"files": len(files), "failed": sum(1 for *_, ok in sizes if not ok),
+            "bytes_before": sum(s[0] for s in sizes), "bytes_after": sum(s[1] for s in sizes),
+            "seconds": round(time.perf_counter() - t0, 2)}
+
+def main(argv: list[str] | None = None) -> None:
+    ap = argparse.ArgumentParser(description="Převede všechny reporty do zvoleného formátu.")
+    ap.add_argument("--to", choices=list(FORMATS), default="json.gz")
+    ap.add_argument("--workers", type=int, default=None)
+    a = ap.parse_args(argv)
+    if a.to == "json.zst" and zstandard is None:
+        ap.error("Formát json.zst vyžaduje balíček zstandard.")
+    r = recompress(a.to, a.workers)
+    print(f"Reportů: {r['files']} (nečitelných {r['failed']}), "
+          f"{r['bytes_before']/1e6:.2f} MB -> {r['bytes_after']/1e6:.2f} MB za {r['seconds']} s")
+
+if __name__ == "__main__":
+    main()
@@ -14,8 +14,23 @@ class ReportCtx:
     def path(self) -> Path:
         return storage.report_path(self.rid)
 
+    def _stamp(self) -> None:
+        # Kdo report uložil – relace podle toho rozliší vlastní zápis od cizího (shared.bump)
+        from .session import owner
+        self.data.setdefault("meta", {})["editor"] = owner()
+
     def save(self) -> None:
-        storage.write_json(self.path(), self.data)
+        from . import autosave, sync
+        self._stamp()
+        sync.checkpoint(self)
+        autosave.writer().write_now(self.path(), self.data, by=self.data["meta"]["editor"])
+
+    def autosave(self) -> None:
+        """Uložení na pozadí (s prodlevou) – neblokuje UI a opakované změny se sloučí."""
+        from . import autosave, sync
+        self._stamp()
+        self.data["meta"]["sync_version"] = sync.current_version(self)
+        autosave.writer().submit(self.path(), self.data, by=self.data["meta"]["editor"])
 
     def key(self, prefix: str) -> str:
         return ui_key(prefix, self.rid)
@@ -0,0 +1,138 @@
+from __future__ import annotations
+import datetime as dt
+import math
+from pathlib import Path
+from . import storage
+from .. import metrics
+
+# Prostorový index reportů – pravidelná mřížka po CELL_DEG stupních.
+# Soubor drží polohu každého reportu a seznam reportů v každé buňce,
+# aktualizuje se inkrementálně při každém uložení reportu.
+CELL_DEG = 0.02          # ~2,2 km v zeměpisné šířce
+EARTH_R_KM = 6371.0
+
+_cache: dict = {"mtime": None, "db": None}
+
+def index_path() -> Path:
+    return storage.INDEX_DIR / "geo.json"
+
+def parse_coord(v) -> float | None:
+    if v is None or v == "": return None
+    try: return float(str(v).replace(",", "."))
+    except Exception: return None
+
+def report_point(data: dict) -> tuple[float, float] | None:
+    gps = (data.get("event") or {}).get("gps") or {}
+    lat, lon = parse_coord(gps.get("lat")), parse_coord(gps.get("lon"))
+    if lat is None or lon is None: return None
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180): return None
+    return lat, lon
+
+def _cell(lat: float, lon: float) -> str:
+    return f"{math.floor(lat / CELL_DEG)}:{math.floor(lon / CELL_DEG)}"
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lon2 - lon1)
+    a = math.sin(dp/2)**2 + math.cos(p1) * math.cos(p2) * math.sin(dl/2)**2
+    return 2 * EARTH_R_KM * math.asin(min(1.0, math.sqrt(a)))
+
+def _empty() -> dict:
+    return {"meta": {"cell_deg": CELL_DEG, "version": 1}, "reports": {}, "cells": {}}
+
+def _load() -> dict:
+    p = index_path()
+    try: mtime = p.stat().st_mtime
+    except FileNotFoundError: return _empty()
+    metrics.cache("geo_index", _cache["mtime"] == mtime)
+    if _cache["mtime"] != mtime:
+        db = storage.read_json(p)
+        if db.get("meta", {}).get("cell_deg") != CELL_DEG:
+            db = _empty()
+        db.setdefault("reports", {}); db.setdefault("cells", {})
+        _cache.update(mtime=mtime, db=db)
+    return _cache["db"]
+
+def _save(db: dict) -> None:
+    storage.write_index(index_path(), db)
+    try: _cache.update(mtime=index_path().stat().st_mtime, db=db)
+    except FileNotFoundError: pass
+
+def _event_date(data: dict) -> str:
+    ev = data.get("event") or {}
+    return str(ev.get("datum_vzniku") or data.get("meta", {}).get("created", ""))[:10]
+
+def _drop(db: dict, rid: str) -> bool:
+    rec = db["reports"].pop(rid, None)
+    if not rec: return False
+    ids = db["cells"].get(rec["cell"], [])
+    if rid in ids: ids.remove(rid)
+    if not ids: db["cells"].pop(rec["cell"], None)
+    return True
+
+def _record(rid: str, data: dict, pt: tuple[float, float]) -> dict:
+    return {"lat": pt[0], "lon": pt[1], "cell": _cell(*pt), "date": _event_date(data),
+            "title": data.get("meta", {}).get("title", rid), "oec": data.get("meta", {}).get("oec")}
+
+def _apply(db: dict, rid: str, data: dict) -> bool:
+    pt = report_point(data)
+    if pt is None: return _drop(db, rid)
+    rec = _record(rid, data, pt)
+    if db["reports"].get(rid) == rec: return False
+    _drop(db, rid)
+    db["reports"][rid] = rec
+    db["cells"].setdefault(rec["cell"], []).append(rid)
+    return True
+
+def update(rid: str, data: dict) -> None:
+    """Promítne polohu uloženého reportu do indexu (voláno ze storage.write_json)."""
+    update_many([(rid, data)])
+
+def update_many(items: list[tuple[str, dict]]) -> None:
+    """Jako update pro celou dávku – index se načte a zapíše jen jednou."""
+    with storage.index_lock("geo"):
+        db = _load()
+        changed = False
+        for rid, data in items:
+            changed = _apply(db, rid, data) or changed
+        if changed: _save(db)
+
+def nearby(lat: float, lon: float, radius_km: float = 2.0, days: int | None = 365,
+           exclude: str | None = None) -> list[dict]:
+    """Reporty do radius_km od bodu (a volitelně ne starší než days dní), seřazené podle vzdálenosti."""
+    db = _load()
+    since = (dt.date.today() - dt.timedelta(days=days)).isoformat() if days else ""
+    dlat = radius_km / 111.0
+    dlon = radius_km / (111.0 * max(0.01, math.cos(math.radians(lat))))
+    i0, i1 = math.floor((lat - dlat) / CELL_DEG), math.floor((lat + dlat) / CELL_DEG)
+    j0, j1 = math.floor((lon - dlon) / CELL_DEG), math.floor((lon + dlon) / CELL_DEG)
+    out = []
+    for i in range(i0, i1 + 1):
+        for j in range(j0, j1 + 1):
+            for rid in list(db["cells"].get(f"{i}:{j}", [])):
+                if rid == exclude: continue
+                rec = db["reports"].get(rid) or {}
+                if since and rec.get("date", "") < since: continue
+                d = haversine_km(lat, lon, rec["lat"], rec["lon"])
+                if d <= radius_km:
+                    out.append({"id": rid, "distance_km": round(d, 3), **rec})
+    out.sort(key=lambda r: r["distance_km"])
+    return out
+
+def rebuild() -> int:
+    """Přestaví index od nuly ze všech reportů na disku."""
+    with storage.index_lock("geo"):            # souběžné update_many počká, jinak by se ztratilo
+        db = _empty()
+        for p in storage.iter_report_files():
+            d = storage.read_json(p)
+            rid = d.get("meta", {}).get("id") or storage.report_stem(p)
+            pt = report_point(d)
+            if pt is None: continue
+            rec = _record(rid, d, pt)
+            db["reports"][rid] = rec
+            db["cells"].setdefault(rec["cell"], []).append(rid)
+        _save(db)
+    return len(db["reports"])
+
+if __name__ == "__main__":
+    print(f"Indexováno reportů s GPS: {rebuild()}")
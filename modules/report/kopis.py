@@ -0,0 +1,298 @@
+from __future__ import annotations
+import argparse
+import csv
+import datetime as dt
+import re
+import sys
+import unicodedata
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+from . import archive, geo, storage
+from .. import metrics, shared
+
+# Hromadné založení reportů z exportu operačního střediska (KOPIS, CSV nebo XML).
+# Soubor se čte proudově (po řádcích / po elementech), řádky se mapují na event
+# a event.adresa kostry reportu a ukládají se po dávkách paralelně přes storage.
+# Duplicity se hledají podle čísla události (meta.kopis.id, index reports/_index/kopis.json).
+# Opakovaný běh je idempotentní: existující události se přeskočí, s --update se jim
+# přepíší jen pole, která od posledního importu nikdo ručně nezměnil (drží hodnotu kostry
+# nebo minulého importu); jinak se nová hodnota zapíše jako konflikt do meta.kopis.conflicts.
+# Reporty otevřené k úpravám (zámek ve shared) se nechají na příští běh.
+#   python -m modules.report.kopis export.csv --oec 123456 [--update] [--dry-run]
+RECORD_TAGS = {"udalost", "incident", "zasah", "record", "row"}
+
+# cílové pole (cesta v reportu) -> možné názvy sloupců / elementů exportu (bez diakritiky, malými)
+FIELDS: Dict[str, tuple] = {
+    "event.datum_ohlaseni": ("datum_ohlaseni", "datum ohlaseni", "ohlaseno_datum"),
+    "event.cas_ohlaseni": ("cas_ohlaseni", "cas ohlaseni", "ohlaseno_cas"),
+    "event.datum_vzniku": ("datum_vzniku", "datum vzniku"),
+    "event.cas_vzniku": ("cas_vzniku", "cas vzniku"),
+    "event.datum_zpozorovani": ("datum_zpozorovani", "datum zpozorovani"),
+    "event.cas_zpozorovani": ("cas_zpozorovani", "cas zpozorovani"),
+    "event.adresa.kraj": ("kraj",),
+    "event.adresa.obec": ("obec", "mesto"),
+    "event.adresa.ulice": ("ulice",),
+    "event.adresa.cp": ("cp", "c.p.", "cislo_popisne", "cislo popisne"),
+    "event.adresa.co": ("co", "c.o.", "cislo_orientacni", "cislo orientacni"),
+    "event.adresa.parcelni": ("parcelni", "parcela", "cislo_parcelni"),
+    "event.adresa.psc": ("psc",),
+    "event.gps.lat": ("lat", "gps_lat", "zemepisna_sirka", "wgs84_lat"),
+    "event.gps.lon": ("lon", "gps_lon", "zemepisna_delka", "wgs84_lon"),
+}
+ID_KEYS = ("cislo_udalosti", "cislo udalosti", "id_udalosti", "incident", "udalost_id", "id")
+# datum a čas v jednom sloupci, např. "11.08.2025 21:07:32"
+STAMP_KEYS = {"ohlaseni": ("ohlaseni", "cas_ohlaseni_kopis", "datum_cas_ohlaseni", "ohlaseno"),
+              "vzniku": ("vznik", "datum_cas_vzniku"),
+              "zpozorovani": ("zpozorovani", "datum_cas_zpozorovani")}
+OEC_KEYS = ("oec", "vysetrovatel_oec", "vysetrovatel")
+TYPE_KEYS = ("typ", "typ_udalosti", "druh", "popis")
+_OEC_RE = re.compile(r"^\d{6}$")
+
+
+def index_path() -> Path:
+    return storage.INDEX_DIR / "kopis.json"
+
+def _norm(s: str) -> str:
+    s = unicodedata.normalize("NFD", str(s).strip().lower())
+    return "".join(c for c in s if unicodedata.category(c) != "Mn")
+
+def _pick(row: Dict[str, str], keys: tuple) -> str:
+    for k in keys:
+        v = row.get(k)
+        if v not in (None, ""): return v
+    return ""
+
+# ---------- čtení exportu ----------
+
+def _clean(row: dict) -> Dict[str, str]:
+    return {_norm(k): str(v).strip() for k, v in row.items() if k is not None and v is not None}
+
+def read_csv(path: Path, encoding: str = "utf-8-sig") -> Iterator[Dict[str, str]]:
+    with open(path, newline="", encoding=encoding) as f:
+        sample = f.read(8192); f.seek(0)
+        try: dialect = csv.Sniffer().sniff(sample, delimiters=";,\t")
+        except csv.Error: dialect = csv.excel
+        for row in csv.DictReader(f, dialect=dialect):
+            yield _clean(row)
+
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+def read_xml(path: Path) -> Iterator[Dict[str, str]]:
+    # Zpracovaný záznam se vyprázdní a odpojí od rodiče, paměť nezávisí na velikosti exportu
+    parents: List[ET.Element] = []
+    for ev, el in ET.iterparse(str(path), events=("start", "end")):
+        if ev == "start":
+            parents.append(el); continue
+        parents.pop()
+        if _norm(_local(el.tag)) not in RECORD_TAGS: continue
+        row = dict(el.attrib)
+        for ch in el.iter():
+            if ch is not el and not len(ch) and (ch.text or "").strip():
+                row[_local(ch.tag)] = ch.text
+        el.clear()
+        if parents: parents[-1].remove(el)
+        yield _clean(row)
+
+def read_export(path: Path, encoding: str = "utf-8-sig") -> Iterator[Dict[str, str]]:
+    return read_xml(path) if path.suffix.lower() == ".xml" else read_csv(path, encoding)
+
+# ---------- mapování na report ----------
+
+_DATE_RE = re.compile(r"(\d{4})-(\d{1,2})-(\d{1,2})|(\d{1,2})\.\s*(\d{1,2})\.\s*(\d{4})")
+_TIME_RE = re.compile(r"(?<![\d.])(\d{1,2}):(\d{2})(?::(\d{2}))?")
+
+def parse_date(v: str) -> Optional[str]:
+    m = _DATE_RE.search(v or "")
+    if not m: return None
+    y, mo, d = (m.group(1), m.group(2), m.group(3)) if m.group(1) else (m.group(6), m.group(5), m.group(4))
+    try: return dt.date(int(y), int(mo), int(d)).isoformat()
+    except ValueError: return None
+
+def parse_time(v: str) -> Optional[str]:
+    m = _TIME_RE.search((v or "").replace("T", " "))
+    if not m: return None
+    try: return dt.time(int(m.group(1)), int(m.group(2)), int(m.group(3) or 0)).strftime("%H:%M:%S")
+    except ValueError: return None
+
+def map_row(row: Dict[str, str]) -> Dict[str, str]:
+    """Hodnoty pro report podle cest FIELDS; jen to, co export opravdu obsahuje."""
+    out: Dict[str, str] = {}
+    for which, keys in STAMP_KEYS.items():
+        stamp = _pick(row, keys)
+        if stamp:
+            if parse_date(stamp): out[f"event.datum_{which}"] = parse_date(stamp)
+            if parse_time(stamp): out[f"event.cas_{which}"] = parse_time(stamp)
+    for path, keys in FIELDS.items():
+        v = _pick(row, keys)
+        if not v: continue
+        last = path.rsplit(".", 1)[-1]
+        if last.startswith("datum_"): v = parse_date(v)
+        elif last.startswith("cas_"): v = parse_time(v)
+        elif path.startswith("event.gps."): v = geo.parse_coord(v)
+        if v is not None and v != "": out[path] = v
+    return out
+
+def _get(data: dict, path: str):
+    for part in path.split("."):
+        data = data.get(part) if isinstance(data, dict) else None
+    return data
+
+def _set(data: dict, path: str, value) -> None:
+    *head, last = path.split(".")
+    for part in head: data = data.setdefault(part, {})
+    data[last] = value
+
+def _title(kid: str, row: Dict[str, str], fields: Dict[str, str]) -> str:
+    parts = [f"KOPIS {kid}", _pick(row, TYPE_KEYS), fields.get("event.adresa.obec", "")]
+    return " – ".join(p for p in parts if p)
+
+def _with_event_times(fields: Dict[str, str]) -> Dict[str, str]:
+    """Doplní chybějící vznik/zpozorování z ohlášení. Kostra má u dat dnešek (den importu) –
+    ten by report zařadil do špatného měsíce, takže chybějící datum zůstane prázdné."""
+    out = dict(fields)
+    for kind in ("datum", "cas"):
+        src = fields.get(f"event.{kind}_ohlaseni")
+        for which in ("vzniku", "zpozorovani"):
+            if src: out.setdefault(f"event.{kind}_{which}", src)
+    for which in ("ohlaseni", "vzniku", "zpozorovani"):
+        out.setdefault(f"event.datum_{which}", "")
+    return out
+
+def new_report(kid: str, oec: str, row: Dict[str, str], fields: Dict[str, str]) -> dict:
+    data = storage.ensure_skeleton(storage.gen_report_id(oec), oec)
+    fields = _with_event_times(fields)
+    for path, v in fields.items(): _set(data, path, v)
+    data["meta"]["title"] = _title(kid, row, fields)
+    data["meta"]["kopis"] = {"id": kid, "imported": dt.datetime.now().isoformat(timespec="seconds"),
+                             "fields": fields}
+    return data
+
+def _untouched(data: dict, path: str, cur) -> bool:
+    """Pole drží výchozí hodnotu kostry reportu (nikdo ho nevyplnil)."""
+    if cur in (None, ""): return True
+    last = path.rsplit(".", 1)[-1]
+    if last.startswith("datum_"): return cur == str(data["meta"].get("created", ""))[:10]
+    if last.startswith("cas_"): return cur == "00:00:00"
+    return False
+
+def merge(data: dict, fields: Dict[str, str]) -> tuple[List[str], List[str]]:
+    """Přepíše pole z nového exportu; ručně změněná pole nechá být a novou hodnotu zapíše
+    do meta.kopis.conflicts. Vrací (změněné cesty, nové konflikty)."""
+    rec = data["meta"].setdefault("kopis", {})
+    prev = rec.get("fields", {})
+    conflicts = rec.setdefault("conflicts", {})
+    changed, clashed = [], []
+    for path, v in fields.items():
+        cur = _get(data, path)
+        if cur == v:
+            conflicts.pop(path, None); continue
+        if (cur == prev[path]) if path in prev else _untouched(data, path, cur):
+            _set(data, path, v); changed.append(path); conflicts.pop(path, None)
+        elif v != prev.get(path) and conflicts.get(path) != v:   # upraveno ručně, export se liší
+            conflicts[path] = v; clashed.append(path)
+    if not conflicts: rec.pop("conflicts", None)
+    if changed or clashed or prev != fields:
+        rec["fields"] = {**prev, **fields}
+        rec["imported"] = dt.datetime.now().isoformat(timespec="seconds")
+    return changed, clashed
+
+# ---------- index čísel událostí ----------
+
+def rebuild_index() -> Dict[str, str]:
+    """Číslo události -> ID reportu ze všech reportů na disku i v archivu."""
+    db = {}
+    for p in storage.iter_report_files():
+        meta = storage._report_meta(p)
+        kid = (meta.get("kopis") or {}).get("id")
+        if kid: db[str(kid)] = meta.get("id") or storage.report_stem(p)
+    for rid, rec in archive.load_index().items():
+        if rec.get("kopis"): db.setdefault(str(rec["kopis"]), rid)
+    storage.write_index(index_path(), {"incidents": db})
+    return db
+
+def load_index() -> Dict[str, str]:
+    if not index_path().exists(): return rebuild_index()
+    return dict(storage.read_json(index_path()).get("incidents", {}))
+
+# ---------- import ----------
+
+def ingest(path: Path, oec: Optional[str] = None, update: bool = False, dry_run: bool = False,
+           batch: int = 500, workers: Optional[int] = None, encoding: str = "utf-8-sig") -> Dict[str, int]:
+    """Načte export a založí (příp. s update aktualizuje) reporty. Vrací počty podle výsledku."""
+    stats = {"created": 0, "updated": 0, "unchanged": 0, "skipped": 0, "locked": 0, "invalid": 0, "conflicts": 0}
+    with storage.index_lock("kopis"):
+        db = load_index()
+        pending: Dict[str, dict] = {}
+
+        def flush() -> None:
+            if not pending: return
+            if not dry_run:
+                storage.write_many([(storage.report_path(d["meta"]["id"]), d) for d in pending.values()], workers)
+            for kid, d in pending.items(): db[kid] = d["meta"]["id"]
+            if not dry_run:
+                storage.write_index(index_path(), {"incidents": db})
+            pending.clear()
+
+        for row in read_export(Path(path), encoding):
+            kid = _pick(row, ID_KEYS)
+            fields = map_row(row)
+            owner = _pick(row, OEC_KEYS) or oec
+            if not kid or not owner or not _OEC_RE.match(owner):
+                stats["invalid"] += 1; continue
+            if kid in pending:                      # opakovaný řádek v jednom exportu
+                merge(pending[kid], fields); continue
+            rid = db.get(kid)
+            data = storage.read_json(storage.report_path(rid)) if rid else {}
+            if rid and not data and archive.is_archived(rid):
+                stats["skipped"] += 1; continue     # uzavřený a archivovaný – jen pro čtení
+            if data:
+                if not update: stats["skipped"] += 1
+                elif shared.lock_holder(shared.report_lock(rid)):
+                    stats["locked"] += 1                 # právě se upravuje – dorovná příští běh
+                else:
+                    changed, clashed = merge(data, fields)
+                    stats["conflicts"] += len(clashed)
+                    if changed or clashed: stats["updated"] += 1; pending[kid] = data
+                    else: stats["unchanged"] += 1
+            else:
+                stats["created"] += 1
+                pending[kid] = new_report(kid, owner, row, fields)
+            if len(pending) >= batch: flush()
+        flush()
+    for result, n in stats.items():
+        if n: metrics.inc("zpp_kopis_rows_total", n, {"result": result}, doc="Řádky importu KOPIS podle výsledku.")
+    metrics.log_event("kopis_import", file=str(path), dry_run=dry_run, **stats)
+    return stats
+
+def main(argv: list[str] | None = None) -> None:
+    ap = argparse.ArgumentParser(description="Založení reportů z exportu KOPIS (CSV/XML).")
+    ap.add_argument("export", type=Path, help="soubor exportu (.csv nebo .xml)")
+    ap.add_argument("--oec", help="OEČ vyšetřovatele pro řádky bez sloupce OEČ")
+    ap.add_argument("--update", action="store_true", help="aktualizovat už založené události")
+    ap.add_argument("--dry-run", action="store_true")
+    ap.add_argument("--batch", type=int, default=500, help="reportů v jedné dávce zápisu")
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--encoding", default="utf-8-sig", help="kódování CSV (např. cp1250)")
+    ap.add_argument("--rebuild-index", action="store_true", help="znovu sestavit index čísel událostí")
+    ap.add_argument("--force", action="store_true", help="--update i bez sdíleného úložiště (ZPP_SHARED_URL)")
+    a = ap.parse_args(argv)
+    if a.update and not a.dry_run and not shared.is_shared():
+        # Bez sdíleného úložiště import nevidí zámky otevřených reportů v aplikaci
+        # a rozpracované úpravy by přepsal (nebo je aplikace přepíše zpět)
+        if not a.force:
+            ap.error("--update vyžaduje ZPP_SHARED_URL (zámky reportů sdílené s aplikací); "
+                     "bez něj jen při zastavené aplikaci a s --force")
+        print("VAROVÁNÍ: bez ZPP_SHARED_URL nejsou vidět zámky reportů otevřených v aplikaci – "
+              "aktualizace může přepsat rozpracované úpravy.", file=sys.stderr)
+    if a.rebuild_index:
+        print(f"Indexováno událostí: {len(rebuild_index())}")
+    s = ingest(a.export, a.oec, a.update, a.dry_run, a.batch, a.workers, a.encoding)
+    print(("Nanečisto – " if a.dry_run else "") +
+          f"založeno: {s['created']}, aktualizováno: {s['updated']}, beze změny: {s['unchanged']}, "
+          f"přeskočeno: {s['skipped']}, upravované (zamčené): {s['locked']}, neplatné řádky: {s['invalid']}, "
+          f"konflikty s ručními úpravami: {s['conflicts']}")
+
+if __name__ == "__main__":
+    main()
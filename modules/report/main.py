@@ -1,15 +1,85 @@
 
 from __future__ import annotations
+import datetime as dt
+import threading
+import time
 import streamlit as st
-from . import storage
+from . import archive, autosave, checklist, session, similar, storage, sync
+from .. import shared
 from .context import ReportCtx
-from .utils import get_query_params, set_query_params
+from ..perf import span
+from .utils import get_query_params, set_query_params, ui_key
 from .tabs import event as tab_event
 from .tabs import conditions as tab_conditions
 from .tabs import participants as tab_participants
 from .tabs import witnesses as tab_witnesses
 from .tabs import sketch as tab_sketch
 
+# Záložky, poznámky a výběr reportu jsou fragmenty: změna widgetu v nich přepočítá
+# jen danou sekci, ne celé app.py. Starší Streamlit bez fragmentů vše přepočítá celé.
+_fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None) or (lambda fn: fn)
+_TABS = {"event": tab_event, "conditions": tab_conditions, "participants": tab_participants,
+         "witnesses": tab_witnesses, "sketch": tab_sketch}
+_run = threading.local()   # _run.full = právě běží celý skript (ne jen fragment)
+
+def _commit(ctx) -> None:
+    """Zápis změn do konceptu + autosave; při celém rerunu to dělá až konec render_report."""
+    if getattr(_run, "full", False): return
+    if _edit_lock(ctx.rid, ctx.oec) or ui_key("report_data", ctx.rid) not in st.session_state:
+        st.rerun()                              # zámek převzal někdo jiný, nebo vypršel a data se načtou znovu
+    batch = sync.record(ctx)
+    if batch: ctx.autosave()
+    sync.render_client_buffer(ctx, batch)
+
+@_fragment
+def _render_section(name: str, ctx) -> None:
+    with span(f"tab.{name}"):
+        _TABS[name].render_tab(ctx)
+    _commit(ctx)
+
+def _render_similar(ctx) -> None:
+    with span("report.similar"):
+        hits = similar.candidates(ctx.data, exclude=ctx.rid)
+    with st.expander(f"🔁 Podobné reporty: {len(hits)}", expanded=False):
+        if not hits:
+            st.caption("Žádný jiný report se stejnou adresou, osobou ani podobným svědectvím či poznámkami.")
+        for r in hits:
+            why = (["stejná adresa"] if r["address"] else []) + (["stejná osoba (OP/IČO)"] if r["person"] else []) \
+                + ([f"podobný text {r['text']:.0%}"] if r["text"] else [])
+            st.write(f"• {r.get('date','')} – {r['title']} (OEČ {r.get('oec') or ''}) – {', '.join(why)}")
+
+@_fragment
+def _render_notes(ctx) -> None:
+    ctx.data["notes"] = st.text_area("🗒️ Poznámky (společné)", value=ctx.data.get("notes",""), height=140, key=f"notes_{ctx.rid}")
+    _commit(ctx)
+
+@_fragment
+def _render_checklist_body(ctx) -> None:
+    with span("tab.checklist"):
+        checklist.render(ctx)
+    _commit(ctx)
+
+@_fragment
+def _render_picker(oec: str) -> None:
+    st.markdown("### 📄 Reporty")
+    if st.button("➕ Založit nový report", use_container_width=True):
+        rid = storage.gen_report_id(oec)
+        storage.write_json(storage.report_path(rid), storage.ensure_skeleton(rid, oec), by=session.owner())
+        st.session_state.current_report_id = rid
+        st.rerun()
+
+    with_archive = st.checkbox("Zobrazit i archivované", value=False, key="sb_with_archive")
+    my_reports = storage.list_reports_for(oec, include_archived=with_archive)
+    if my_reports:
+        labels = [f"{'🗄️ ' if r.get('archived') else ''}{r['title']} ({r['id']})" for r in my_reports]
+        ids = [r["id"] for r in my_reports]
+        idx = st.selectbox("Vyber report", list(range(len(labels))), format_func=lambda i: labels[i] if labels else "", key="sb_select_any")
+        if st.button("Otevřít", use_container_width=True):
+            st.session_state.current_report_id = ids[idx]
+            st.rerun()
+    else:
+        st.info("Zatím nemáš žádný report.")
+
 def _force_wide_layout_css():
     st.markdown("""
     <style>
@@ -18,6 +88,55 @@ def _force_wide_layout_css():
     </style>
     """, unsafe_allow_html=True)
 
+def _render_archived(rid: str):
+    st.warning("Report je uzavřen a archivován – otevřen jen pro čtení.")
+    data = storage.read_report(rid)
+    rec = archive.load_index().get(rid, {})
+    st.markdown(f"### {data.get('meta', {}).get('title', rid)}")
+    st.caption(f"Uzavřen {rec.get('closed_at', '')}, archivován {rec.get('archived_at', '')[:10]} ({rec.get('bundle', '')})")
+    with st.expander("Obsah reportu", expanded=True):
+        st.json({k: v for k, v in data.items() if k != "attachments"})
+    files = [n for n in rec.get("files", []) if "/thumbs/" not in n]
+    if files:
+        name = st.selectbox("Přílohy", files, format_func=lambda n: n.rsplit("/", 1)[-1], key=f"arch_file_{rid}")
+        st.download_button("⬇️ Stáhnout přílohu", data=archive.read_attachment(rid, name) or b"",
+                           file_name=name.rsplit("/", 1)[-1], key=f"arch_dl_{rid}")
+    if st.button("🚪 Zavřít", use_container_width=True):
+        st.session_state.current_report_id = None; st.rerun()
+
+def _edit_lock(rid: str, oec: str) -> dict | None:
+    """Drží zámek úprav reportu (obnova nejvýš jednou za třetinu platnosti). None = můžeme upravovat,
+    jinak záznam toho, kdo report upravuje."""
+    k_lock, k_take = ui_key("report_lock", rid), ui_key("report_takeover", rid)
+    last = st.session_state.get(k_lock)
+    if last and not st.session_state.get(k_take) and time.monotonic() - last < shared.LOCK_TTL_S / 3:
+        return None
+    u = st.session_state.get("user") or {}
+    info = {"oec": u.get("oec") or oec, "name": f"{u.get('first_name', '')} {u.get('last_name', '')}".strip()}
+    holder, fresh = shared.acquire_lock(shared.report_lock(rid), session.owner(), info,
+                                        force=st.session_state.pop(k_take, False))
+    if holder or fresh:
+        # Bez zámku nebo s nově získaným zámkem (i po vypršení vlastního) se data načtou znovu ze souboru
+        st.session_state.pop(ui_key("report_data", rid), None)
+    if holder:
+        st.session_state.pop(k_lock, None); return holder
+    st.session_state[k_lock] = time.monotonic()
+    return None
+
+def _render_locked(rid: str, holder: dict):
+    since = str(holder.get("since", ""))[11:16]
+    who = f"{holder.get('name') or ''} (OEČ {holder.get('oec', '')})".strip()
+    st.warning(f"Report právě upravuje {who} od {since} – zobrazen jen pro čtení.")
+    data = storage.read_report(rid)
+    st.markdown(f"### {data.get('meta', {}).get('title', rid)}")
+    with st.expander("Obsah reportu", expanded=True):
+        st.json({k: v for k, v in data.items() if k != "attachments"})
+    c1, c2 = st.columns(2)
+    if c1.button("🔓 Převzít úpravy", use_container_width=True, help="Druhý uživatel přijde o neuložené změny."):
+        st.session_state[ui_key("report_takeover", rid)] = True; st.rerun()
+    if c2.button("🚪 Zavřít", use_container_width=True, key=f"locked_close_{rid}"):
+        st.session_state.current_report_id = None; st.rerun()
+
 def render_report():
     _force_wide_layout_css()
     st.markdown("## 📝 Report")
@@ -33,31 +152,88 @@ def render_report():
         st.stop()
 
     with st.sidebar:
-        st.markdown("### 📄 Reporty")
-        if st.button("➕ Založit nový report", use_container_width=True):
-            rid = storage.gen_report_id(oec)
-            storage.write_json(storage.report_path(rid), storage.ensure_skeleton(rid, oec))
-            st.session_state.current_report_id = rid
-            st.rerun()
-
-        my_reports = storage.list_reports_for(oec)
-        if my_reports:
-            labels = [f"{r['title']} ({r['id']})" for r in my_reports]
-            ids = [r["id"] for r in my_reports]
-            idx = st.selectbox("Vyber report", list(range(len(labels))), format_func=lambda i: labels[i] if labels else "", key="sb_select_any")
-            if st.button("Otevřít", use_container_width=True):
-                st.session_state.current_report_id = ids[idx]
-                st.rerun()
-        else:
-            st.info("Zatím nemáš žádný report.")
+        _render_picker(oec)
 
     rid = st.session_state.get("current_report_id")
+    session.track(rid)
     if not rid:
         st.info("Vyber existující report vlevo, nebo založ nový v levém panelu."); st.stop()
 
-    path = storage.report_path(rid)
-    data = storage.read_json(path) or storage.ensure_skeleton(rid, oec)
+    if archive.is_archived(rid):
+        _render_archived(rid); return
+    holder = _edit_lock(rid, oec)
+    if holder:
+        _render_locked(rid, holder); return
+    data = _load_data(rid, oec)
+    if data is None:
+        _render_archived(rid); return
+    _run.full = True
+    try:
+        _render_body(ReportCtx(rid=rid, data=data, oec=oec))
+    finally:
+        _run.full = False
+
+def _load_data(rid: str, oec: str) -> dict | None:
+    # Data otevřeného reportu žijí v session_state – fragmenty i další reruny pracují
+    # se stejným slovníkem a soubor se nečte při každé interakci. None = archivovaný report.
+    data_key, ver_key = ui_key("report_data", rid), ui_key("report_ver", rid)
+    mt_key = ui_key("report_mtime", rid)
+    data = st.session_state.get(data_key)
+    ver = shared.version("report", rid)
+    stale = ver != st.session_state.get(ver_key) and not ver.endswith(f":{session.owner()}")
+    if not stale and autosave.writer().latest(storage.report_path(rid)) is None:
+        # Bez ZPP_SHARED_URL verzi nevidí jiné procesy (import KOPIS) – cizí zápis prozradí mtime souboru
+        mtime, seen = storage.report_mtime(rid), st.session_state.get(mt_key)
+        stale = bool(seen) and mtime != seen and not storage.written_here(rid, mtime)
+        st.session_state[mt_key] = mtime
+    if data is not None and stale:
+        # Report mezitím uložil někdo jiný (jiná replika, import KOPIS) – platí uložená verze
+        st.session_state.pop(data_key, None); data = None
+        st.session_state.pop(ui_key("sync_saved", rid), None)   # cizí uložení je nový výchozí stav
+        st.toast("Report byl mezitím změněn jinde – načtena aktuální verze.")
+    st.session_state[ver_key] = ver
+    if data is None:
+        data = autosave.load(storage.report_path(rid))
+        if not data and archive.is_archived(rid):
+            return None
+        data = st.session_state[data_key] = data or storage.ensure_skeleton(rid, oec)
+        sync.remember(rid, data, replace=False)
+    return data
+
+def render_checklist():
+    """Checklist k otevřenému reportu – odpovědi se ukládají do reportu (ctx.data["checklist"])."""
+    oec = st.session_state.get("oec")
+    with st.sidebar:
+        _render_picker(oec)
+    rid = st.session_state.get("current_report_id")
+    session.track(rid)
+    if not rid:
+        st.info("Checklist se vyplňuje k reportu – vyber existující report vlevo, nebo založ nový."); return
+    holder = _edit_lock(rid, oec)
+    if holder:
+        _render_locked(rid, holder); return
+    data = _load_data(rid, oec)
+    if data is None:
+        st.warning("Report je archivován, checklist už nelze měnit."); return
     ctx = ReportCtx(rid=rid, data=data, oec=oec)
+    if not sync.is_restored(ctx):
+        sync.restore(ctx)
+    st.caption(f"Report: **{data.get('meta', {}).get('title', rid)}**")
+    _run.full = True
+    try:
+        _render_checklist_body(ctx)
+    finally:
+        _run.full = False
+    batch = sync.record(ctx)
+    if batch: ctx.autosave()
+    sync.render_client_buffer(ctx, batch)
+
+def _render_body(ctx: ReportCtx):
+    rid, data = ctx.rid, ctx.data
+    if not sync.is_restored(ctx):
+        if sync.restore(ctx):
+            st.info("Obnoven neuložený koncept reportu z posledního připojení.")
+    sync.apply_batch(ctx, sync.pull_client_deltas(ctx))
 
     c1,c2,c3 = st.columns([3,1,1])
     with c1:
@@ -75,20 +251,25 @@ def render_report():
         if st.button("💾✅ Uložit a zavřít", use_container_width=True):
             ctx.save(); st.session_state.current_report_id = None; st.rerun()
 
+    closed = st.checkbox("🔒 Případ uzavřen (po čase se přesune do archivu)",
+                         value=bool(data.get("meta", {}).get("closed_at")), key=f"closed_{rid}")
+    if closed:
+        data["meta"].setdefault("closed_at", dt.date.today().isoformat())
+    else:
+        data["meta"].pop("closed_at", None)
+
     if st.button("🚪 Zavřít bez uložení", use_container_width=True):
-        st.session_state.current_report_id = None; st.rerun()
+        sync.discard(ctx); st.session_state.current_report_id = None; st.rerun()
 
+    _render_similar(ctx)
     st.markdown("---")
 
-    t_event, t_cond, t_part, t_wit, t_sk = st.tabs(["Událost","Podmínky","Účastníci","Svědectví","Náčrtek"])
-    with t_event: tab_event.render_tab(ctx)
-    with t_cond:  tab_conditions.render_tab(ctx)
-    with t_part:  tab_participants.render_tab(ctx)
-    with t_wit:   tab_witnesses.render_tab(ctx)
-    with t_sk:    tab_sketch.render_tab(ctx)
+    tabs = st.tabs(["Událost","Podmínky","Účastníci","Svědectví","Náčrtek"])
+    for tab, name in zip(tabs, _TABS):
+        with tab: _render_section(name, ctx)
 
     st.markdown("---")
-    ctx.data["notes"] = st.text_area("🗒️ Poznámky (společné)", value=ctx.data.get("notes",""), height=140, key=f"notes_{rid}")
+    _render_notes(ctx)
 
     b1,b2,b3 = st.columns(3)
     with b1:
@@ -96,4 +277,10 @@ def render_report():
     with b2:
         if st.button("💾✅ Uložit a zavřít (dole)", use_container_width=True): ctx.save(); st.session_state.current_report_id=None; st.rerun()
     with b3:
-        if st.button("🚪 Zavřít bez uložení (dole)", use_container_width=True): st.session_state.current_report_id=None; st.rerun()
+        if st.button("🚪 Zavřít bez uložení (dole)", use_container_width=True): sync.discard(ctx); st.session_state.current_report_id=None; st.rerun()
+
+    batch = sync.record(ctx)
+    if batch: ctx.autosave()
+    sync.render_client_buffer(ctx, batch)
+    saved = autosave.writer().saved_at(ctx.path())
+    if saved: st.caption(f"💾 Automaticky uloženo {saved[11:]}")
@@ -0,0 +1,101 @@
+from __future__ import annotations
+import hashlib
+import os
+import sys
+import streamlit as st
+from .. import metrics, shared
+from .utils import ui_key
+
+# Úklid session_state. Klíče widgetů i pomocná data reportu (koncept, nonce, cache)
+# končí ID reportu – ctx.key() přidává ID očištěné přes ui_key, účastníci surové ID.
+# Po zavření nebo přepnutí reportu se klíče starého reportu smažou, takže dlouhá směna
+# s mnoha otevřenými reporty nezvětšuje paměť serveru bez omezení.
+OPEN_KEY = "open_report_id"
+BUDGET_MB = float(os.environ.get("ZPP_SESSION_BUDGET_MB", "64"))
+
+def owner() -> str:
+    """Identita relace pro zámky a verze reportů – hash tokenu přihlášení (přežije přepojení
+    na jinou repliku), jinak ID relace Streamlitu. Samotný token se nikam nezapisuje."""
+    sid = st.session_state.get("sid")
+    if not sid:
+        try:
+            from streamlit.runtime.scriptrunner import get_script_run_ctx
+            sid = get_script_run_ctx().session_id
+        except Exception:
+            sid = "local"
+    return hashlib.sha256(str(sid).encode()).hexdigest()[:16]
+
+def _suffixes(rid: str) -> tuple[str, ...]:
+    return tuple({ui_key("", rid), f"_{rid}"})
+
+def report_keys(rid: str, keep: str | None = None) -> list[str]:
+    sfx, keep_sfx = _suffixes(rid), _suffixes(keep) if keep else ()
+    return [k for k in list(st.session_state.keys())
+            if isinstance(k, str) and k.endswith(sfx) and not (keep_sfx and k.endswith(keep_sfx))]
+
+def evict_report(rid: str, keep: str | None = None) -> int:
+    """Smaže ze session_state všechny klíče reportu `rid` (kromě klíčů reportu `keep`)."""
+    keys = report_keys(rid, keep)
+    for k in keys:
+        del st.session_state[k]
+    return len(keys)
+
+def track(rid: str | None) -> None:
+    """Volá se při každém vykreslení; po zavření nebo přepnutí reportu uklidí ten předchozí."""
+    prev = st.session_state.get(OPEN_KEY)
+    if prev == rid:
+        return
+    if prev:
+        shared.release_lock(shared.report_lock(prev), owner())
+        n = evict_report(prev, keep=rid)
+        metrics.inc("zpp_session_keys_evicted_total", n, doc="Klíče session_state uvolněné po zavření reportu.")
+    if rid: st.session_state[OPEN_KEY] = rid
+    else: st.session_state.pop(OPEN_KEY, None)
+
+def _size(obj, seen: set, depth: int = 0) -> int:
+    if id(obj) in seen or depth > 8:
+        return 0
+    seen.add(id(obj))
+    if hasattr(obj, "getbuffer") and hasattr(obj, "size"):   # UploadedFile – buffer nahraného souboru
+        return int(obj.size) + sys.getsizeof(obj)
+    n = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        n += sum(_size(k, seen, depth + 1) + _size(v, seen, depth + 1) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        n += sum(_size(v, seen, depth + 1) for v in obj)
+    return n
+
+def memory_report(top: int = 15) -> dict:
+    """Odhad paměti relace: celkem, počet klíčů a největší klíče."""
+    sizes = {}
+    for k in list(st.session_state.keys()):
+        try: sizes[str(k)] = _size(st.session_state[k], set())
+        except Exception: continue
+    biggest = sorted(sizes.items(), key=lambda kv: kv[1], reverse=True)[:top]
+    return {"keys": len(sizes), "bytes": sum(sizes.values()), "budget_mb": BUDGET_MB,
+            "top": [{"klíč": k, "kB": round(v / 1024, 1)} for k, v in biggest]}
+
+def record_memory(session_id: str) -> None:
+    """Velikost relace do metrik procesu – volá se na konci každého rerunu (app.py)."""
+    rep = memory_report(top=0)
+    prev = metrics.session_memory(session_id, rep["bytes"], rep["keys"], str(st.session_state.get("oec") or ""))
+    if rep["bytes"] > BUDGET_MB * 1e6 >= prev:      # jen při překročení, ne při každém rerunu
+        metrics.inc("zpp_session_over_budget_total", doc="Relace nad paměťovým rozpočtem.")
+        metrics.log_event("session_over_budget", bytes=rep["bytes"], keys=rep["keys"])
+
+def render_memory_panel() -> None:
+    rep = memory_report()
+    mb = rep["bytes"] / 1e6
+    st.subheader("🧠 Paměť relací")
+    allm = metrics.session_memory_top()
+    st.caption(f"Aktivní relace tohoto procesu: {allm['sessions']}, celkem přibližně {allm['bytes'] / 1e6:.2f} MB, "
+               f"největší {allm['max'] / 1e6:.2f} MB (rozpočet {BUDGET_MB:.0f} MB na relaci)")
+    if allm["top"]:
+        st.dataframe([{"relace": r["relace"], "uživatel": r["uživatel"], "klíčů": r["keys"],
+                       "MB": round(r["bytes"] / 1e6, 2), "nad rozpočtem": r["bytes"] > BUDGET_MB * 1e6}
+                      for r in allm["top"]], use_container_width=True, hide_index=True)
+    st.caption(f"Tato relace: {rep['keys']} klíčů, přibližně {mb:.2f} MB")
+    if mb > rep["budget_mb"]:
+        st.warning("Relace překračuje paměťový rozpočet.")
+    if rep["top"]:
+        st.dataframe(rep["top"], use_container_width=True, hide_index=True)
@@ -0,0 +1,210 @@
+from __future__ import annotations
+import functools
+import hashlib
+import operator
+import os
+import re
+import secrets
+import struct
+import unicodedata
+from pathlib import Path
+from . import geo, storage
+from .. import metrics
+
+# Index podobnosti reportů (sériové požáry, duplicity) bez porovnávání každý s každým:
+#  - text svědectví a poznámek -> MinHash podpis (NUM_PERM minim nad znakovými SHINGLE-gramy)
+#    rozdělený do BANDS pásem; reporty se stejným pásmem jsou kandidáti (LSH),
+#  - normalizovaná adresa (obec, ulice, č.p./č.o./parcela) -> hash,
+#  - totožnost účastníků (číslo OP, IČO) -> hash.
+# Hashe adres a totožností jsou s tajným klíčem (keyed BLAKE2b): čísla OP mají malý rozsah
+# a bez klíče by šla dohledat hrubou silou. Klíč je v ZPP_INDEX_SECRET (všechny repliky
+# stejný), jinak se při prvním použití vygeneruje do data/index.key. Se změnou klíče se
+# index zahodí – python -m modules.report.similar ho přestaví.
+# Aktualizuje se inkrementálně při uložení reportu (storage._update_indexes).
+NUM_PERM = 64
+BANDS = 16                  # 16 pásem po 4 řádcích ~ práh podobnosti kolem 0,5
+SHINGLE = 5
+MIN_TEXT = 20               # kratší text se neindexuje
+MIN_SIM = 0.3               # odhad Jaccardovy podobnosti, od kterého se text hlásí jako shoda
+_UNPACK = struct.Struct(f">{NUM_PERM}I").unpack
+SECRET_PATH = Path("data") / "index.key"
+
+_cache: dict = {"mtime": None, "db": None}
+
+def index_path() -> Path:
+    return storage.INDEX_DIR / "similar.json"
+
+def _norm(s) -> str:
+    s = unicodedata.normalize("NFD", str(s or "").lower())
+    s = "".join(c for c in s if unicodedata.category(c) != "Mn")
+    return re.sub(r"[^0-9a-z]+", " ", s).strip()
+
+@functools.lru_cache(maxsize=1)
+def _secret() -> bytes:
+    env = os.environ.get("ZPP_INDEX_SECRET", "")
+    if env: return hashlib.sha256(env.encode("utf-8")).digest()
+    try: return SECRET_PATH.read_bytes()
+    except FileNotFoundError: pass
+    SECRET_PATH.parent.mkdir(parents=True, exist_ok=True)
+    key = secrets.token_bytes(32)
+    try:
+        fd = os.open(SECRET_PATH, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:                 # mezitím ho vytvořil jiný proces
+        return SECRET_PATH.read_bytes()
+    with os.fdopen(fd, "wb") as f: f.write(key)
+    return key
+
+def _h(s: str, size: int = 8) -> str:
+    return hashlib.blake2b(s.encode("utf-8"), digest_size=size, key=_secret()).hexdigest()
+
+# ---------- klíče ----------
+
+def text_of(data: dict) -> str:
+    return _norm(f"{data.get('witnesses') or ''} {data.get('notes') or ''}")
+
+@functools.lru_cache(maxsize=256)   # text se při rerunu většinou nemění
+def signature(text: str) -> tuple[int, ...] | None:
+    if len(text) < MIN_TEXT: return None
+    # Každý shingle -> NUM_PERM nezávislých 32bit hashů z jednoho SHAKE výstupu; minima po sloupcích
+    rows = [_UNPACK(hashlib.shake_128(sh.encode()).digest(4 * NUM_PERM))
+            for sh in {text[i:i + SHINGLE] for i in range(len(text) - SHINGLE + 1)}]
+    return tuple(map(min, zip(*rows)))
+
+def _bands(sig) -> list[str]:
+    r = NUM_PERM // BANDS
+    return [f"{i}:{_h(','.join(map(str, sig[i * r:(i + 1) * r])), 6)}" for i in range(BANDS)]
+
+def _sig_hex(sig) -> str:
+    return "".join(f"{v:08x}" for v in sig)
+
+def _sig_from_hex(s: str) -> tuple[int, ...]:
+    return _UNPACK(bytes.fromhex(s))
+
+def estimate(a, b) -> float:
+    return sum(map(operator.eq, a, b)) / NUM_PERM
+
+def address_key(data: dict) -> str | None:
+    a = (data.get("event") or {}).get("adresa") or {}
+    obec = _norm(a.get("obec"))
+    ulice = re.sub(r"^(ul|ulice) ", "", _norm(a.get("ulice")))
+    num = _norm(a.get("cp")) or _norm(a.get("parcelni")) and f"p{_norm(a.get('parcelni'))}"
+    if not obec or not (ulice or num): return None
+    return _h(f"{obec}|{ulice}|{num}|{_norm(a.get('co'))}")
+
+def _people(data: dict):
+    part = data.get("participants") or {}
+    for group in ("owners", "users"):
+        for p in part.get(group) or []:
+            yield p
+            if isinstance(p.get("zastupce"), dict): yield p["zastupce"]
+
+def identity_keys(data: dict) -> list[str]:
+    keys = set()
+    for p in _people(data):
+        op = re.sub(r"[^0-9A-Z]", "", str(p.get("op") or "").upper())
+        ico = re.sub(r"\D", "", str(p.get("ico") or ""))
+        if len(op) >= 6: keys.add(_h(f"op:{op}"))
+        if ico: keys.add(_h(f"ico:{ico.zfill(8)}"))
+    return sorted(keys)
+
+def keys_of(data: dict) -> dict:
+    sig = signature(text_of(data))
+    return {"sig": _sig_hex(sig) if sig else "", "addr": address_key(data), "ids": identity_keys(data)}
+
+# ---------- index ----------
+
+def _empty() -> dict:
+    return {"meta": {"version": 2, "num_perm": NUM_PERM, "bands": BANDS, "shingle": SHINGLE, "key": _h("key", 4)},
+            "reports": {}, "bands": {}, "addr": {}, "ids": {}}
+
+def _load() -> dict:
+    p = index_path()
+    try: mtime = p.stat().st_mtime
+    except FileNotFoundError: return _empty()
+    metrics.cache("similar_index", _cache["mtime"] == mtime)
+    if _cache["mtime"] != mtime:
+        db = storage.read_json(p)
+        if db.get("meta") != _empty()["meta"]:
+            db = _empty()
+        _cache.update(mtime=mtime, db=db)
+    return _cache["db"]
+
+def _save(db: dict) -> None:
+    storage.write_index(index_path(), db)
+    try: _cache.update(mtime=index_path().stat().st_mtime, db=db)
+    except FileNotFoundError: pass
+
+def _postings(rec: dict) -> list[tuple[str, str]]:
+    out = [("bands", b) for b in (_bands(_sig_from_hex(rec["sig"])) if rec.get("sig") else [])]
+    if rec.get("addr"): out.append(("addr", rec["addr"]))
+    out += [("ids", k) for k in rec.get("ids", [])]
+    return out
+
+def _drop(db: dict, rid: str) -> bool:
+    rec = db["reports"].pop(rid, None)
+    if not rec: return False
+    for table, key in _postings(rec):
+        ids = db[table].get(key, [])
+        if rid in ids: ids.remove(rid)
+        if not ids: db[table].pop(key, None)
+    return True
+
+def _apply(db: dict, rid: str, data: dict) -> bool:
+    k = keys_of(data)
+    if not (k["sig"] or k["addr"] or k["ids"]): return _drop(db, rid)
+    meta = data.get("meta") or {}
+    rec = {**k, "title": meta.get("title", rid), "oec": meta.get("oec"), "date": geo._event_date(data)}
+    if db["reports"].get(rid) == rec: return False
+    _drop(db, rid)
+    db["reports"][rid] = rec
+    for table, key in _postings(rec):
+        db[table].setdefault(key, []).append(rid)
+    return True
+
+def update_many(items: list[tuple[str, dict]]) -> None:
+    """Promítne uložené reporty do indexu (voláno ze storage); zápis jen při změně."""
+    with storage.index_lock("similar"):
+        db = _load()
+        changed = False
+        for rid, data in items:
+            changed = _apply(db, rid, data) or changed
+        if changed: _save(db)
+
+def candidates(data: dict, exclude: str | None = None, limit: int = 20) -> list[dict]:
+    """Podobné reporty k (i neuloženému) obsahu reportu, nejsilnější shody první."""
+    db, k = _load(), keys_of(data)
+    hits: dict[str, dict] = {}
+    def hit(rid: str) -> dict:
+        return hits.setdefault(rid, {"address": False, "person": 0, "text": 0.0})
+    if k["addr"]:
+        for rid in db["addr"].get(k["addr"], []): hit(rid)["address"] = True
+    for key in k["ids"]:
+        for rid in db["ids"].get(key, []): hit(rid)["person"] += 1
+    if k["sig"]:
+        sig = _sig_from_hex(k["sig"])
+        for rid in {r for b in _bands(sig) for r in db["bands"].get(b, [])}:
+            other = db["reports"].get(rid, {}).get("sig")
+            sim = estimate(sig, _sig_from_hex(other)) if other else 0.0
+            if sim >= MIN_SIM: hit(rid)["text"] = sim
+    hits.pop(exclude, None)
+    out = []
+    for rid, h in hits.items():
+        rec = db["reports"].get(rid) or {}
+        score = h["address"] + min(h["person"], 1) + h["text"]
+        out.append({"id": rid, "title": rec.get("title", rid), "oec": rec.get("oec"), "date": rec.get("date", ""),
+                    "score": round(score, 3), **h})
+    out.sort(key=lambda r: (r["score"], r["date"]), reverse=True)
+    return out[:limit]
+
+def rebuild() -> int:
+    """Přestaví index od nuly ze všech reportů na disku."""
+    with storage.index_lock("similar"):        # souběžné update_many počká, jinak by se ztratilo
+        db = _empty()
+        for p in storage.iter_report_files():
+            d = storage.read_json(p)
+            _apply(db, d.get("meta", {}).get("id") or storage.report_stem(p), d)
+        _save(db)
+    return len(db["reports"])
+
+if __name__ == "__main__":
+    print(f"Indexováno reportů: {rebuild()}")
@@ -0,0 +1,138 @@
+from __future__ import annotations
+import argparse
+import time
+from pathlib import Path
+from . import archive, geo, storage
+from .. import metrics
+
+# Materializované statistiky požárů: počty podle kraje, obce, měsíce a OEČ.
+# U každého reportu se pamatuje, kam byl naposledy započten (kraj, obec, měsíc, OEČ),
+# takže uložení reportu jen odečte staré a přičte nové hodnoty – bez čtení ostatních
+# reportů. Souhrny jsou v stats.json (jediný soubor, který čte stránka statistik – velikost
+# nezávisí na počtu reportů), započtení jednotlivých reportů v stats_reports.json (čte se jen
+# při zápisu). Archivované reporty se počítají dál.
+#   python -m modules.report.stats [--workers N]    # plné přepočítání
+UNKNOWN = "(neuvedeno)"
+# tabulka -> dimenze, ze kterých se skládá klíč ("|" mezi hodnotami)
+TABLES: dict[str, tuple[str, ...]] = {
+    "kraj": ("kraj",),
+    "obec": ("kraj", "obec"),
+    "month": ("month",),
+    "kraj_month": ("kraj", "month"),
+    "oec": ("oec",),
+    "oec_month": ("oec", "month"),
+}
+
+_cache: dict = {"mtime": None, "db": None}
+_rcache: dict = {"mtime": None, "reports": None}
+
+def index_path() -> Path:
+    return storage.INDEX_DIR / "stats.json"
+
+def reports_path() -> Path:
+    return storage.INDEX_DIR / "stats_reports.json"
+
+def dims(data: dict) -> dict[str, str]:
+    """Hodnoty, podle kterých se report počítá."""
+    a = ((data.get("event") or {}).get("adresa")) or {}
+    meta = data.get("meta") or {}
+    return {"kraj": str(a.get("kraj") or "").strip() or UNKNOWN,
+            "obec": str(a.get("obec") or "").strip() or UNKNOWN,
+            "month": geo._event_date(data)[:7] or UNKNOWN,
+            "oec": str(meta.get("oec") or "") or UNKNOWN}
+
+def _empty() -> dict:
+    return {"meta": {"version": 2, "reports": 0}, "tables": {t: {} for t in TABLES}}
+
+def load() -> dict:
+    """Souhrny {"meta": {"reports": počet, "updated"}, "tables"} – bez seznamu reportů."""
+    p = index_path()
+    try: mtime = p.stat().st_mtime
+    except FileNotFoundError: return _empty()
+    metrics.cache("stats_index", _cache["mtime"] == mtime)
+    if _cache["mtime"] != mtime:
+        db = storage.read_json(p)
+        if db.get("meta", {}).get("version") != 2:   # jiná verze – prázdné, doplní rebuild()
+            db = _empty()
+        for t in TABLES: db.setdefault("tables", {}).setdefault(t, {})
+        _cache.update(mtime=mtime, db=db)
+    return _cache["db"]
+
+def _load_reports() -> dict[str, dict[str, str]]:
+    p = reports_path()
+    if not load()["meta"].get("reports"): return {}   # souhrny prázdné (i po změně verze)
+    try: mtime = p.stat().st_mtime
+    except FileNotFoundError: return {}
+    if _rcache["mtime"] != mtime:
+        _rcache.update(mtime=mtime, reports=storage.read_json(p).get("reports") or {})
+    return _rcache["reports"]
+
+def _save(db: dict, reports: dict[str, dict[str, str]]) -> None:
+    db["meta"].update(version=2, reports=len(reports), updated=time.strftime("%Y-%m-%dT%H:%M:%S"))
+    storage.write_index(reports_path(), {"reports": reports})
+    storage.write_index(index_path(), db)
+    try:
+        _rcache.update(mtime=reports_path().stat().st_mtime, reports=reports)
+        _cache.update(mtime=index_path().stat().st_mtime, db=db)
+    except FileNotFoundError: pass
+
+def _add(db: dict, d: dict[str, str], sign: int) -> None:
+    for t, keys in TABLES.items():
+        k = "|".join(d[x] for x in keys)
+        n = db["tables"][t].get(k, 0) + sign
+        if n > 0: db["tables"][t][k] = n
+        else: db["tables"][t].pop(k, None)
+
+def _apply(db: dict, reports: dict[str, dict[str, str]], rid: str, new: dict[str, str]) -> bool:
+    old = reports.get(rid)
+    if old == new: return False
+    if old: _add(db, old, -1)
+    _add(db, new, +1)
+    reports[rid] = new
+    return True
+
+def update_many(items: list[tuple[str, dict]]) -> None:
+    """Delta po uložení reportů (voláno ze storage); zápis jen při změně započtení."""
+    with storage.index_lock("stats"):
+        db, reports = load(), _load_reports()
+        changed = False
+        for rid, data in items:
+            changed = _apply(db, reports, rid, dims(data)) or changed
+        if changed: _save(db, reports)
+
+# ---------- plné přepočítání ----------
+
+def _dims_of_file(path: str) -> tuple[str, dict[str, str]] | None:
+    p = Path(path)
+    d = storage.read_json(p)
+    if not d: return None
+    return d.get("meta", {}).get("id") or storage.report_stem(p), dims(d)
+
+def _dims_of_archived(rid: str) -> tuple[str, dict[str, str]] | None:
+    d = archive.read_report(rid)
+    return (rid, dims(d)) if d else None
+
+def rebuild(workers: int | None = None) -> int:
+    """Přepočte statistiky ze všech reportů (i archivovaných) paralelně v procesech."""
+    from concurrent.futures import ProcessPoolExecutor
+    with storage.index_lock("stats"):          # souběžné update_many počká, jinak by se ztratilo
+        files = [str(p) for p in storage.iter_report_files()]
+        hot = {storage.report_stem(Path(f)) for f in files}
+        cold = [rid for rid in archive.load_index() if rid not in hot]
+        db, reports = _empty(), {}
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            for res in list(ex.map(_dims_of_file, files, chunksize=64)) + list(ex.map(_dims_of_archived, cold, chunksize=16)):
+                if res: _apply(db, reports, *res)
+        _save(db, reports)
+    return len(reports)
+
+def main(argv: list[str] | None = None) -> None:
+    ap = argparse.ArgumentParser(description="Plné přepočítání statistik požárů.")
+    ap.add_argument("--workers", type=int, default=None)
+    a = ap.parse_args(argv)
+    t0 = time.perf_counter()
+    n = rebuild(a.workers)
+    print(f"Započteno reportů: {n} za {time.perf_counter() - t0:.1f} s")
+
+if __name__ == "__main__":
+    main()
@@ -1,49 +1,256 @@
 
 from __future__ import annotations
 from pathlib import Path
+import contextlib
 import json
+import os
+import re
+import threading
+import time
 import datetime as dt
+from concurrent.futures import ThreadPoolExecutor
+from . import codec
+from .. import metrics, shared
+from ..perf import timed
 from .utils import fs_safe
 
-REPORTS_DIR = Path("reports")
-REPORTS_DIR.mkdir(parents=True, exist_ok=True)
+try:
+    import fcntl
+except ImportError:  # Windows – indexy chrání jen zámek vláken (jediný proces)
+    fcntl = None
+
+REPORTS_DIR = Path("reports")   # složky vznikají až při prvním zápisu
+INDEX_DIR = REPORTS_DIR / "_index"
+
+# ID reportu: ULID (48 bitů ms + 80 bitů náhody, Crockford base32) + "_" + OEČ.
+# Lexikografické pořadí ID = chronologické, soubory leží v reports/YYYY/MM/<id>.json.
+# Starší ID ("HH:MM_dd.mm.YYYY_oec" aj.) zůstávají v ploché složce reports/.
+_B32 = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+_ULID_RE = re.compile(r"^([0-9A-HJKMNP-TV-Z]{26})_(.+)$")
+_ulid_lock = threading.Lock()
+_ulid_last = [0, 0]   # poslední (ms, náhoda) – monotónní ID i v rámci jedné milisekundy
+
+def _b32(n: int, width: int) -> str:
+    return "".join(_B32[(n >> (5 * i)) & 31] for i in reversed(range(width)))
+
+def new_ulid() -> str:
+    with _ulid_lock:
+        ms = int(time.time() * 1000)
+        if ms <= _ulid_last[0]:
+            ms, rnd = _ulid_last[0], _ulid_last[1] + 1
+        else:
+            rnd = int.from_bytes(os.urandom(10), "big")
+        _ulid_last[:] = [ms, rnd]
+    return _b32(ms, 10) + _b32(rnd & ((1 << 80) - 1), 16)
+
+def parse_report_id(rid: str) -> tuple[dt.datetime, str] | None:
+    """(čas založení v UTC, OEČ) z nového ID; None pro starší formáty."""
+    m = _ULID_RE.match(str(rid))
+    if not m: return None
+    ms = 0
+    for ch in m.group(1)[:10]: ms = ms * 32 + _B32.index(ch)
+    return dt.datetime.fromtimestamp(ms / 1000, dt.timezone.utc), m.group(2)
+
+def _shard_dir(rid: str) -> Path | None:
+    # Složka YYYY/MM podle UTC – stejná na všech replikách bez ohledu na časové pásmo a letní čas
+    parsed = parse_report_id(rid)
+    if not parsed: return None
+    return REPORTS_DIR / f"{parsed[0]:%Y}" / f"{parsed[0]:%m}"
 
 def report_path(rid: str) -> Path:
-    return REPORTS_DIR / f"{fs_safe(rid)}.json"
+    shard = _shard_dir(rid)
+    if shard is not None:
+        return shard / f"{rid}.json"
+    return REPORTS_DIR / f"{fs_safe(rid)}.json"   # kompatibilita se staršími ID
 
-def attachments_dir(rid: str) -> Path:
-    d = REPORTS_DIR / fs_safe(rid)
-    d.mkdir(parents=True, exist_ok=True)
+def attachments_dir(rid: str, create: bool = True) -> Path:
+    shard = _shard_dir(rid)
+    d = (shard / rid) if shard is not None else REPORTS_DIR / fs_safe(rid)
+    if create: d.mkdir(parents=True, exist_ok=True)
     return d
 
+def find_report_file(p: Path) -> Path | None:
+    """Existující soubor reportu v libovolném formátu (x.json, x.json.gz, x.json.zst)."""
+    if p.exists(): return p
+    for v in codec.variants(p):
+        if v.exists(): return v
+    return None
+
+def report_mtime(rid: str) -> int:
+    """mtime_ns souboru reportu (0 = neexistuje)."""
+    p = find_report_file(report_path(rid))
+    try: return p.stat().st_mtime_ns if p else 0
+    except OSError: return 0
+
+def written_here(rid: str, mtime: int) -> bool:
+    """Je `mtime` od posledního zápisu reportu tímto procesem?"""
+    return _written.get(rid) == mtime
+
+@timed("storage.read_json")
 def read_json(p: Path) -> dict:
-    try: return json.loads(p.read_text(encoding="utf-8"))
+    try:
+        f = find_report_file(p)
+        return codec.decode(f.read_bytes(), codec.format_of(f)) if f else {}
     except Exception: return {}
 
-def write_json(p: Path, data: dict) -> None:
+def store_report_file(p: Path, data: dict, fmt: str | None = None) -> Path:
+    """Zapíše report v daném formátu a smaže jeho ostatní varianty; indexy neaktualizuje."""
+    dest = codec.variant(p, fmt or codec.configured_format())
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dest.with_name(dest.name + ".tmp")
+    tmp.write_bytes(codec.encode(data, codec.format_of(dest)))
+    tmp.replace(dest)
+    for v in codec.variants(p):
+        if v != dest and v.exists(): v.unlink()
+    return dest
+
+_written: dict[str, int] = {}   # rid -> mtime_ns posledního zápisu z tohoto procesu
+
+def _saved(dest: Path, rid: str | None) -> None:
+    metrics.inc("zpp_report_saves_total", doc="Počet uložení reportů.")
+    st = dest.stat()
+    if rid: _written[rid] = st.st_mtime_ns
+    size = st.st_size
+    metrics.inc("zpp_report_bytes_written_total", size, doc="Zapsané bajty reportů.")
+    metrics.log_event("report_save", rid=rid, bytes=size)
+
+@timed("storage.write_json")
+def write_json(p: Path, data: dict, by: str = "") -> None:
+    """Uloží report; `by` = kdo zapisuje (session.owner(), "" = dávka/CLI) – jde do verze reportu."""
+    with metrics.timer("zpp_report_save_duration_ms", doc="Doba uložení reportu."):
+        dest = store_report_file(p, data)
+    rid = (data.get("meta") or {}).get("id")
+    _saved(dest, rid)
+    if rid:
+        shared.bump("report", rid, by=by)
+        _update_indexes([(rid, data)])
+
+@timed("storage.write_many")
+def write_many(items: list[tuple[Path, dict]], workers: int | None = None, by: str = "") -> int:
+    """Uloží dávku reportů paralelně (vlákna); indexy se přepočtou jednou za celou dávku."""
+    def one(item: tuple[Path, dict]) -> None:
+        p, data = item
+        with metrics.timer("zpp_report_save_duration_ms", doc="Doba uložení reportu."):
+            dest = store_report_file(p, data)
+        rid = (data.get("meta") or {}).get("id")
+        _saved(dest, rid)
+        if rid: shared.bump("report", rid, by=by)
+    with ThreadPoolExecutor(max_workers=workers or min(8, (os.cpu_count() or 1) * 2)) as ex:
+        list(ex.map(one, items))
+    _update_indexes([(d["meta"]["id"], d) for _, d in items if (d.get("meta") or {}).get("id")])
+    return len(items)
+
+def write_index(p: Path, data: dict) -> None:
+    """Atomický zápis pomocných souborů (indexy) – bez přepočtu indexů."""
+    p.parent.mkdir(parents=True, exist_ok=True)
     tmp = p.with_suffix(".tmp")
-    tmp.write_text(json.dumps(data, ensure_ascii=False, indent=2, default=str), encoding="utf-8")
+    tmp.write_text(json.dumps(data, ensure_ascii=False, separators=(",", ":"), default=str), encoding="utf-8")
     tmp.replace(p)
 
-def list_reports_for(oec: str | None) -> list[dict]:
+_index_locks: dict[str, threading.Lock] = {}
+_index_locks_guard = threading.Lock()
+
+@contextlib.contextmanager
+def index_lock(name: str):
+    """Výhradní přístup k indexu pro čtení-úpravu-zápis: zámek vláken + flock souboru
+    reports/_index/<name>.lock, takže se zápisy nepřepíšou ani mezi procesy (repliky, CLI)
+    na stejném disku."""
+    with _index_locks_guard:
+        lock = _index_locks.setdefault(name, threading.Lock())
+    with lock:
+        INDEX_DIR.mkdir(parents=True, exist_ok=True)
+        with open(INDEX_DIR / f"{name}.lock", "a") as f:
+            if fcntl: fcntl.flock(f, fcntl.LOCK_EX)
+            try: yield
+            finally:
+                if fcntl: fcntl.flock(f, fcntl.LOCK_UN)
+
+def _update_indexes(items: list[tuple[str, dict]]) -> None:
+    # Index nesmí nikdy shodit uložení samotného reportu
+    from . import geo, similar, stats
+    for index in (geo, similar, stats):
+        try: index.update_many(items)
+        except Exception: pass
+
+def _sharded_files():
+    # Nejnovější první – ULID v názvu řadí soubory chronologicky
+    for y in sorted((d for d in REPORTS_DIR.glob("[0-9][0-9][0-9][0-9]") if d.is_dir()), reverse=True):
+        for m in sorted((d for d in y.glob("[0-9][0-9]") if d.is_dir()), reverse=True):
+            yield from sorted(_report_files_in(m), reverse=True)
+
+def _report_files_in(folder: Path) -> list[Path]:
+    return [p for pat in ("*.json", "*.json.gz", "*.json.zst") for p in folder.glob(pat)]
+
+def _legacy_files():
+    return sorted(_report_files_in(REPORTS_DIR))
+
+def report_stem(p: Path) -> str:
+    return codec.base_path(p).stem
+
+def iter_report_files():
+    yield from _sharded_files()
+    yield from _legacy_files()
+
+# Hlavičky reportů pro výpis – znovu se čtou jen soubory, jejichž mtime se změnil
+_meta_cache: dict[str, tuple[float, dict]] = {}
+
+def _report_meta(p: Path) -> dict:
+    try: mtime = p.stat().st_mtime
+    except OSError: return {}
+    hit = _meta_cache.get(str(p))
+    metrics.cache("report_meta", bool(hit and hit[0] == mtime))
+    if hit and hit[0] == mtime: return hit[1]
+    meta = read_json(p).get("meta", {})
+    _meta_cache[str(p)] = (mtime, meta)
+    return meta
+
+def read_report(rid: str) -> dict:
+    """Report z pracovní složky, případně (jen pro čtení) z archivu uzavřených reportů."""
+    data = read_json(report_path(rid))
+    if data: return data
+    from . import archive
+    return archive.read_report(rid)
+
+@timed("storage.list_reports_for")
+def list_reports_for(oec: str | None, include_archived: bool = False) -> list[dict]:
+    metrics.inc("zpp_report_list_scans_total", doc="Počet výpisů reportů.")
+    with metrics.timer("zpp_report_list_duration_ms", doc="Doba výpisu reportů."):
+        return _list_reports_for(oec, include_archived)
+
+def _list_reports_for(oec: str | None, include_archived: bool) -> list[dict]:
     out = []
-    for p in sorted(REPORTS_DIR.glob("*.json")):
-        d = read_json(p)
-        rid = d.get("meta", {}).get("id") or p.stem
+    for p in _sharded_files():
+        rid = report_stem(p)
+        created, f_oec = parse_report_id(rid) or (None, None)
+        if created is None or (oec and f_oec != oec): continue
+        meta = _report_meta(p)
         out.append({
             "id": rid,
-            "title": d.get("meta", {}).get("title", rid),
-            "oec": d.get("meta", {}).get("oec"),
-            "created": d.get("meta", {}).get("created", ""),
+            "title": meta.get("title", rid),
+            "oec": f_oec,
+            "created": meta.get("created") or created.astimezone().replace(tzinfo=None).isoformat(timespec="seconds"),
+        })
+    legacy = []
+    for p in _legacy_files():
+        meta = _report_meta(p)
+        rid = meta.get("id") or report_stem(p)
+        legacy.append({
+            "id": rid,
+            "title": meta.get("title", rid),
+            "oec": meta.get("oec"),
+            "created": meta.get("created", ""),
         })
     if oec:
-        out = [r for r in out if r.get("oec") == oec]
-    out.sort(key=lambda r: r.get("created", ""), reverse=True)
-    return out
+        legacy = [r for r in legacy if r.get("oec") == oec]
+    legacy.sort(key=lambda r: r.get("created", ""), reverse=True)
+    if include_archived:
+        from . import archive
+        hot = {r["id"] for r in out} | {r["id"] for r in legacy}
+        return out + legacy + [r for r in archive.list_archived(oec) if r["id"] not in hot]
+    return out + legacy
 
 def gen_report_id(oec: str) -> str:
-    now = dt.datetime.now()
-    return f"{now:%H:%M}_{now:%d.%m.%Y}_{oec}"
+    return f"{new_ulid()}_{fs_safe(oec)}"
 
 def ensure_skeleton(rid: str, oec: str) -> dict:
     now = dt.datetime.now().isoformat(timespec="seconds")
@@ -64,5 +271,6 @@ def ensure_skeleton(rid: str, oec: str) -> dict:
         "witnesses": "",
         "sketch": "",
         "attachments": [],
+        "checklist": {},
         "notes": "",
     }
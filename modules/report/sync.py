@@ -0,0 +1,193 @@
+from __future__ import annotations
+import datetime as dt
+import json
+import threading
+from pathlib import Path
+import streamlit as st
+import streamlit.components.v1 as components
+from . import storage
+from .utils import fs_safe, ui_key
+
+try:
+    from streamlit_javascript import st_javascript
+except Exception:  # bez komponenty funguje jen serverový deník konceptů
+    st_javascript = None
+
+# Koncepty (drafty) reportu jako verzované delty.
+# Každý rerun, který změní ctx.data, vytvoří dávku {"v": n, "ops": [[cesta, hodnota], ...]}.
+# Dávka se zapíše do serverového deníku reports/_drafts/<rid>.jsonl a zároveň do IndexedDB
+# v prohlížeči. Po ztrátě relace (výpadek spojení, restart serveru) se report při otevření
+# doplní z deníku i z IndexedDB – apply_batch je jediný vstupní bod ("sync endpoint").
+DRAFTS_DIR = storage.REPORTS_DIR / "_drafts"
+_DELETE = {"$del": True}
+_MISSING = object()
+_lock = threading.Lock()
+
+def _norm(data: dict) -> dict:
+    return json.loads(json.dumps(data, ensure_ascii=False, default=str))
+
+def journal_path(rid: str) -> Path:
+    return DRAFTS_DIR / f"{fs_safe(rid)}.jsonl"
+
+def diff(old: dict, new: dict, prefix: tuple = ()) -> list[list]:
+    """Ploché změny mezi dvěma stromy – seznamy se porovnávají jako celek."""
+    ops = []
+    for k in old.keys() - new.keys():
+        ops.append([list(prefix + (k,)), _DELETE])
+    for k, v in new.items():
+        ov = old.get(k, _MISSING)
+        if isinstance(v, dict) and isinstance(ov, dict):
+            ops.extend(diff(ov, v, prefix + (k,)))
+        elif ov != v:
+            ops.append([list(prefix + (k,)), v])
+    return ops
+
+def apply_ops(data: dict, ops: list[list]) -> dict:
+    for path, value in ops:
+        node = data
+        for k in path[:-1]:
+            if not isinstance(node.get(k), dict): node[k] = {}
+            node = node[k]
+        if value == _DELETE: node.pop(path[-1], None)
+        else: node[path[-1]] = value
+    return data
+
+def read_journal(rid: str, after: int = 0) -> list[dict]:
+    out = []
+    try:
+        with journal_path(rid).open(encoding="utf-8") as f:
+            for line in f:
+                try: b = json.loads(line)
+                except Exception: continue  # useknutý poslední řádek po pádu
+                if int(b.get("v", 0)) > after: out.append(b)
+    except FileNotFoundError:
+        pass
+    return out
+
+def _append_journal(rid: str, batch: dict) -> None:
+    with _lock:
+        DRAFTS_DIR.mkdir(parents=True, exist_ok=True)
+        with journal_path(rid).open("a", encoding="utf-8") as f:
+            f.write(json.dumps(batch, ensure_ascii=False, default=str) + "\n")
+
+def saved_version(data: dict) -> int:
+    return int((data.get("meta") or {}).get("sync_version") or 0)
+
+def current_version(ctx) -> int:
+    return st.session_state.get(ui_key("sync_v", ctx.rid), saved_version(ctx.data))
+
+def apply_batch(ctx, deltas: list[dict]) -> int:
+    """Aplikuje dávky s verzí vyšší než aktuální; vrací novou verzi. Opakované doručení je neškodné."""
+    k_ver = ui_key("sync_v", ctx.rid)
+    ver = st.session_state.get(k_ver, saved_version(ctx.data))
+    for b in sorted(deltas or [], key=lambda b: int(b.get("v", 0))):
+        v = int(b.get("v", 0))
+        if v <= ver: continue
+        apply_ops(ctx.data, b.get("ops") or [])
+        ver = v
+    st.session_state[k_ver] = ver
+    return ver
+
+def is_restored(ctx) -> bool:
+    return ui_key("sync_base", ctx.rid) in st.session_state
+
+def restore(ctx) -> int:
+    """Při otevření reportu doplní neuložené dávky ze serverového deníku."""
+    base = saved_version(ctx.data)
+    pending = read_journal(ctx.rid, after=base)
+    st.session_state[ui_key("sync_v", ctx.rid)] = base
+    apply_batch(ctx, pending)
+    st.session_state[ui_key("sync_base", ctx.rid)] = _norm(ctx.data)
+    return len(pending)
+
+def record(ctx) -> dict | None:
+    """Zapíše změny od posledního rerunu jako novou dávku (deník + prohlížeč)."""
+    k_base, k_ver = ui_key("sync_base", ctx.rid), ui_key("sync_v", ctx.rid)
+    cur = _norm(ctx.data)
+    base = st.session_state.get(k_base)
+    st.session_state[k_base] = cur
+    if base is None: return None
+    ops = diff(base, cur)
+    if not ops: return None
+    batch = {"v": st.session_state.get(k_ver, saved_version(ctx.data)) + 1,
+             "ts": dt.datetime.now().isoformat(timespec="seconds"), "ops": ops}
+    st.session_state[k_ver] = batch["v"]
+    _append_journal(ctx.rid, batch)
+    return batch
+
+def remember(rid: str, data: dict, replace: bool = True) -> None:
+    """Stav reportu při otevření nebo posledním uložení – k němu se vrací „Zavřít bez uložení“."""
+    k = ui_key("sync_saved", rid)
+    if replace or k not in st.session_state:
+        st.session_state[k] = _norm(data)
+
+def checkpoint(ctx) -> None:
+    """Volá se při uložení reportu – uložená verze zneplatní deník i buffer v prohlížeči."""
+    ctx.data.setdefault("meta", {})["sync_version"] = current_version(ctx)
+    remember(ctx.rid, ctx.data)
+    with _lock:
+        try: journal_path(ctx.rid).unlink()
+        except FileNotFoundError: pass
+
+def discard(ctx) -> None:
+    """Zavření bez uložení – soubor se vrátí do stavu při otevření / posledním uložení (i změny,
+    které mezitím zapsal autosave), koncept se zahodí i v prohlížeči (posune se uložená verze)."""
+    from . import autosave, session
+    w = autosave.writer()
+    w.cancel(ctx.path())                 # po návratu už autosave nic staršího nezapíše
+    ver = current_version(ctx)
+    disk = storage.read_json(ctx.path())
+    base = st.session_state.get(ui_key("sync_saved", ctx.rid))
+    out = _norm(base) if base else disk
+    if out:
+        out.setdefault("meta", {})["sync_version"] = max(ver, saved_version(disk or {}))
+        if out != disk: w.write_now(ctx.path(), out, by=session.owner())
+    with _lock:
+        try: journal_path(ctx.rid).unlink()
+        except FileNotFoundError: pass
+    for k in ("sync_base", "sync_v", "sync_pulled", "sync_saved"):
+        st.session_state.pop(ui_key(k, ctx.rid), None)
+
+# --- klientský buffer (IndexedDB) ---
+_IDB_OPEN = """
+function zppOpen(){ return new Promise((res, rej) => {
+  const rq = indexedDB.open('zpp_drafts', 1);
+  rq.onupgradeneeded = () => rq.result.createObjectStore('deltas', {keyPath: ['rid', 'v']});
+  rq.onsuccess = () => res(rq.result); rq.onerror = () => rej(rq.error);
+}); }
+"""
+
+def render_client_buffer(ctx, batch: dict | None) -> None:
+    """Uloží dávku do IndexedDB a smaže dávky, které už server potvrdil uložením."""
+    acked = saved_version(ctx.data)
+    payload = json.dumps({"rid": ctx.rid, "batch": batch, "acked": acked}, ensure_ascii=False, default=str).replace("</", "<\\/")
+    components.html(f"""<script>
+    {_IDB_OPEN}
+    (async () => {{ try {{
+      const P = {payload};
+      const db = await zppOpen();
+      const tx = db.transaction('deltas', 'readwrite'); const store = tx.objectStore('deltas');
+      if (P.batch) store.put({{rid: P.rid, v: P.batch.v, ts: P.batch.ts, ops: P.batch.ops}});
+      store.delete(IDBKeyRange.bound([P.rid, 0], [P.rid, P.acked]));
+    }} catch (e) {{}} }})();
+    </script>""", height=0)
+
+def pull_client_deltas(ctx) -> list[dict]:
+    """Jednou za otevření reportu načte z IndexedDB dávky, které server ještě nemá."""
+    if st_javascript is None: return []
+    k_done = ui_key("sync_pulled", ctx.rid)
+    if st.session_state.get(k_done): return []
+    after = current_version(ctx)
+    res = st_javascript(f"""await (async () => {{ try {{
+      {_IDB_OPEN}
+      const db = await zppOpen();
+      return await new Promise((res) => {{
+        const rq = db.transaction('deltas').objectStore('deltas')
+          .getAll(IDBKeyRange.bound([{json.dumps(ctx.rid)}, {after + 1}], [{json.dumps(ctx.rid)}, Infinity]));
+        rq.onsuccess = () => res(rq.result || []); rq.onerror = () => res([]);
+      }});
+    }} catch (e) {{ return []; }} }})()""", key=k_done + "_js")
+    if isinstance(res, list):
+        st.session_state[k_done] = True
+        return res
+    return []
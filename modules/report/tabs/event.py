@@ -2,6 +2,20 @@
 from __future__ import annotations
 import streamlit as st
 from ..utils import safe_date, safe_time
+from .. import geo
+
+try:
+    from streamlit_javascript import st_javascript
+except Exception:  # volitelná závislost – bez ní zůstává jen ruční zadání
+    st_javascript = None
+
+_GEO_JS = """await new Promise((resolve) => {
+  if (!navigator.geolocation) { resolve({error: "Zařízení nepodporuje geolokaci."}); return; }
+  navigator.geolocation.getCurrentPosition(
+    (p) => resolve({lat: p.coords.latitude, lon: p.coords.longitude, acc: p.coords.accuracy}),
+    (e) => resolve({error: e.message}),
+    {enableHighAccuracy: true, timeout: 15000, maximumAge: 60000});
+})"""
 
 def _addr_inputs(ctx, data: dict) -> dict:
     a1, a2, a3 = st.columns([1,1,1])
@@ -17,6 +31,55 @@ def _addr_inputs(ctx, data: dict) -> dict:
         data["psc"]      = st.text_input("PSČ", value=data.get("psc",""), key=ctx.key("addr_psc"))
     return data
 
+def _gps_inputs(ctx, gps: dict) -> dict:
+    k_lat, k_lon, k_pending = ctx.key("gps_lat"), ctx.key("gps_lon"), ctx.key("gps_pending")
+    # k_pending drží pořadové číslo dotazu – nový klíč komponenty = nový dotaz na polohu
+    nonce = st.session_state.get(k_pending)
+    if nonce and st_javascript is not None:
+        res = st_javascript(_GEO_JS, key=ctx.key(f"gps_js_{nonce}"))
+        if isinstance(res, dict) and res.get("error"):
+            st.session_state[k_pending] = False
+            st.warning(f"Polohu se nepodařilo zjistit: {res['error']}")
+        elif isinstance(res, dict) and res.get("lat") is not None:
+            st.session_state[k_pending] = False
+            st.session_state[k_lat] = f"{res['lat']:.6f}"
+            st.session_state[k_lon] = f"{res['lon']:.6f}"
+            if res.get("acc"): st.session_state[ctx.key("gps_pozn")] = f"Poloha zařízení (±{round(res['acc'])} m)"
+        else:
+            st.caption("⏳ Zjišťuji polohu zařízení…")
+
+    # Hodnoty widgetů jen přes session_state (poloha zařízení je tam zapisuje) – value= by se s tím tloukla
+    k_pozn = ctx.key("gps_pozn")
+    st.session_state.setdefault(k_lat, "" if gps.get("lat") is None else str(gps.get("lat")))
+    st.session_state.setdefault(k_lon, "" if gps.get("lon") is None else str(gps.get("lon")))
+    st.session_state.setdefault(k_pozn, gps.get("pozn", ""))
+    g1, g2, g3 = st.columns([1,1,1])
+    with g1:
+        lat = st.text_input("GPS šířka (lat)", key=k_lat, placeholder="např. 49.747")
+    with g2:
+        lon = st.text_input("GPS délka (lon)", key=k_lon, placeholder="např. 13.377")
+    with g3:
+        if st.button("📍 Načíst polohu zařízení", key=ctx.key("gps_btn"), use_container_width=True,
+                     disabled=st_javascript is None):
+            st.session_state[k_pending] = st.session_state.get(ctx.key("gps_nonce"), 0) + 1
+            st.session_state[ctx.key("gps_nonce")] = st.session_state[k_pending]
+            st.rerun()
+    gps["pozn"] = st.text_input("Poznámka k poloze", key=k_pozn)
+
+    gps["lat"], gps["lon"] = geo.parse_coord(lat), geo.parse_coord(lon)
+    if (lat and gps["lat"] is None) or (lon and gps["lon"] is None):
+        st.warning("Souřadnice zadej jako desetinné číslo (např. 49.7475).")
+    return gps
+
+def _render_nearby(ctx, gps: dict) -> None:
+    if gps.get("lat") is None or gps.get("lon") is None: return
+    near = geo.nearby(gps["lat"], gps["lon"], radius_km=2.0, days=365, exclude=ctx.rid)
+    with st.expander(f"🔥 Požáry v okolí 2 km za posledních 12 měsíců: {len(near)}", expanded=bool(near)):
+        if not near:
+            st.caption("V okolí nejsou žádné další reporty.")
+        for r in near:
+            st.write(f"• {r.get('date','')} – {r.get('title', r['id'])} ({r['distance_km']:.2f} km, OEČ {r.get('oec','')})")
+
 def render_tab(ctx):
     st.subheader("📆 Událost")
     ev = ctx.data.get("event") or {}
@@ -53,4 +116,8 @@ def render_tab(ctx):
 
     st.markdown("**Adresa**")
     ev["adresa"] = _addr_inputs(ctx, ev.get("adresa") or {})
+
+    st.markdown("**Poloha (GPS)**")
+    ev["gps"] = _gps_inputs(ctx, ev.get("gps") or {})
+    _render_nearby(ctx, ev["gps"])
     ctx.data["event"] = ev
@@ -1,8 +1,32 @@
 # modules/report/tabs/sketch.py
 from __future__ import annotations
-import base64
+from pathlib import Path
 import streamlit as st
 import streamlit.components.v1 as components
+from .. import attachments, capture
+from ...perf import timed
+
+
+def _ingest(ctx, fileobj, name: str, prefix: str):
+    # Stejný soubor v uploaderu se při dalších rerunech už znovu nečte ani nehashuje
+    seen = st.session_state.setdefault(ctx.key("ingested"), {})
+    fid = getattr(fileobj, "file_id", None)
+    if fid and fid in seen:
+        return attachments.find_by_hash(ctx, seen[fid]), False
+    try:
+        entry, created = attachments.ingest(ctx, fileobj, name, kind="sketch", prefix=prefix)
+    except attachments.QuotaError as e:
+        st.error(str(e))
+        return None, False
+    if fid: seen[fid] = entry["sha256"]
+    return entry, created
+
+
+def _last_photo_dataurl(ctx) -> str:
+    p = ctx.data.get("last_photo_file")
+    if p and Path(p).exists():
+        return attachments.data_url(p, ctx.data.get("last_photo_mime") or "image/jpeg")
+    return ctx.data.get("last_photo_dataurl", "")  # starší reporty
 
 
 def render_tab(ctx):
@@ -19,16 +43,14 @@ def render_tab(ctx):
     )
     bg_dataurl = ""
     if bg_file is not None:
-        raw = bg_file.getvalue()
-        mime = bg_file.type or "image/png"
-        bg_dataurl = f"data:{mime};base64,{base64.b64encode(raw).decode('ascii')}"
+        bg_dataurl = attachments.data_url(bg_file, bg_file.type or "image/png")
 
     grid_on = st.checkbox("Zapnout rastr", value=False, key=ctx.key("sk_grid_on"))
     grid_step = st.slider("Hustota rastru [px]", 20, 120, 40, key=ctx.key("sk_grid_step"))
 
     # === 3) FOTO – uložená poslední fotka pro tlačítko "Poklad" ===
-    # Uchováváme poslední pořízenou fotku v ctx.data, aby šla vložit jako podklad později.
-    last_photo_dataurl = ctx.data.get("last_photo_dataurl", "")
+    # Cestu k poslední pořízené fotce držíme v ctx.data, aby šla vložit jako podklad později.
+    last_photo_dataurl = _last_photo_dataurl(ctx)
 
     html = _build_sketch_html(
         rid=ctx.rid,
@@ -45,33 +67,26 @@ def render_tab(ctx):
     )
 
     st.markdown("#### 2) 📤 Nahrát náčrtek (PNG/JPG/PDF)")
+    # Po uložení dostane uploader nový klíč – Streamlit uvolní buffer souboru, který už je na disku
+    up_nonce_key = ctx.key("sketch_upload_nonce")
     up = st.file_uploader(
         "Nahraj soubor s náčrtkem",
         type=["png", "jpg", "jpeg", "pdf"],
-        key=ctx.key("sketch_upload"),
+        key=ctx.key(f"sketch_upload_{st.session_state.get(up_nonce_key, 0)}"),
     )
     if up is not None:
-        save_dir = ctx.attachments_dir()
-        dest = save_dir / f"sketch_{up.name}"
-        with dest.open("wb") as f:
-            f.write(up.getbuffer())
-        atts = ctx.data.get("attachments") or []
-        from datetime import datetime
-
-        atts.append(
-            {
-                "type": "sketch",
-                "name": up.name,
-                "file": str(dest),
-                "uploaded": datetime.now().isoformat(timespec="seconds"),
-            }
-        )
-        ctx.data["attachments"] = atts
-        ctx.save()
-        st.success("Soubor uložen k reportu.")
+        entry, created = _ingest(ctx, up, up.name, prefix="sketch_")
+        if created:
+            ctx.autosave()
+        if entry:
+            st.session_state[up_nonce_key] = st.session_state.get(up_nonce_key, 0) + 1
+            st.toast("Soubor uložen k reportu." if created else f"Soubor už je u reportu uložen ({entry.get('name')}).")
+            st.rerun()
 
     st.markdown("#### 3) 📸 Vyfotit tabletem/zařízením")
     cam_flag_key = ctx.key("camera_open")
+    # Po každém snímku dostane fotoaparát nový klíč – je hned připraven na další (sériové focení)
+    shot_key = ctx.key("camera_shot")
     c1, c2 = st.columns([1, 4])
     with c1:
         if st.button("📸 Otevřít fotoaparát", key=ctx.key("camera_btn"), use_container_width=True):
@@ -79,58 +94,79 @@ def render_tab(ctx):
     with c2:
         photo = (
             st.camera_input(
-                "Pořídit fotografii náčrtku", key=ctx.key("camera")
+                "Pořídit fotografii náčrtku", key=ctx.key(f"camera_{st.session_state.get(shot_key, 0)}")
             )
             if st.session_state.get(cam_flag_key)
             else None
         )
 
     if photo is not None:
-        # Uložit fotografii k reportu
-        save_dir = ctx.attachments_dir()
-        ext = ".jpg" if getattr(photo, "type", "") != "image/png" else ".png"
-        dest = save_dir / f"sketch_cam_{ext}"
-        with dest.open("wb") as f:
-            f.write(photo.getbuffer())
-        atts = ctx.data.get("attachments") or []
-        from datetime import datetime
-
-        atts.append(
-            {
-                "type": "sketch",
-                "name": dest.name,
-                "file": str(dest),
-                "uploaded": datetime.now().isoformat(timespec="seconds"),
-            }
-        )
-        ctx.data["attachments"] = atts
-
-        # ZÁROVEŇ si uložíme base64 fotky, aby šla kdykoli vložit jako podklad (tlačítko Poklad)
-        raw = photo.getbuffer()
+        # Uložení a náhled řeší vlákno na pozadí, záznam přílohy převezme collect()
         mime = photo.type or "image/jpeg"
-        last_photo_dataurl = f"data:{mime};base64,{base64.b64encode(raw).decode('ascii')}"
-        ctx.data["last_photo_dataurl"] = last_photo_dataurl
-
-        ctx.save()
-        st.success("Fotografie uložena k reportu.")
-
-    # Přehled uložených náčrtů
+        try:
+            entry, created = capture.enqueue_photo(ctx, photo.getvalue(), mime)
+        except attachments.QuotaError as e:
+            st.error(str(e)); entry, created = None, False
+        if entry:
+            ctx.data["last_photo_file"] = entry["file"]
+            ctx.data["last_photo_mime"] = mime
+            ctx.data.pop("last_photo_dataurl", None)
+        if created:
+            ctx.autosave()
+            st.session_state[shot_key] = st.session_state.get(shot_key, 0) + 1
+            st.toast(f"Fotografie {entry['name']} se ukládá k reportu.")
+            st.rerun()
+
+    if capture.collect(ctx):
+        ctx.autosave()
+    for name in capture.worker().take_failed(ctx.attachments_dir()):
+        st.error(f"Fotografii {name} se nepodařilo uložit – pořiď ji prosím znovu.")
+    pending = capture.worker().pending(ctx.attachments_dir())
+    if pending:
+        st.caption(f"⏳ Ukládám fotografie na pozadí: {pending}")
+
+    _render_gallery(ctx)
+
+
+GALLERY_PAGE = 12
+
+
+def _render_gallery(ctx):
     atts = [a for a in ctx.data.get("attachments", []) if a.get("type") == "sketch"]
-    if atts:
-        st.markdown("**Uložené náčrty**")
-        for a in atts:
-            st.write(f"• {a.get('name')} ({a.get('file')}) – {a.get('uploaded')}")
-    else:
-        st.info("Zatím nejsou uloženy žádné náčrtky.")
-
-
+    if not atts:
+        st.info("Zatím nejsou uloženy žádné náčrtky."); return
+    st.markdown(f"**Uložené náčrty ({len(atts)})**")
+    # Náhledy se načítají až na vyžádání a po stránkách
+    if not st.toggle("🖼️ Zobrazit galerii", value=False, key=ctx.key("gallery_on")):
+        for a in atts[-5:][::-1]:
+            st.write(f"• {a.get('name')} – {a.get('uploaded')}")
+        return
+    shown_key = ctx.key("gallery_n")
+    n = st.session_state.get(shown_key, GALLERY_PAGE)
+    newest = atts[::-1][:n]
+    cols = st.columns(4)
+    for i, a in enumerate(newest):
+        with cols[i % 4]:
+            img = next((p for p in (a.get("thumb"), a.get("file")) if p and Path(p).exists()), None)
+            if img and not img.lower().endswith(".pdf"):
+                st.image(img, caption=a.get("name"), use_container_width=True)
+            else:
+                st.caption(f"📄 {a.get('name')}")
+    if n < len(atts) and st.button("Načíst další", key=ctx.key("gallery_more"), use_container_width=True):
+        st.session_state[shown_key] = n + GALLERY_PAGE; st.rerun()
+
+
+@timed("sketch.build_html")
 def _build_sketch_html(
     rid: str, bg_dataurl: str, grid_on: bool, grid_step: int, photo_dataurl: str = ""
 ) -> str:
     """HTML/JS komponenta – plná šířka, overlay rastr, stabilní fullscreen s viditelným toolbarem.
 
-    Novinky:
-      • Tlačítko "Poklad" – vloží jako podklad poslední fotku z bodu 3).
+    Vrstvy podklad / kresba / rastr jsou samostatná plátna. Kresba se drží jako seznam tahů
+    v pevném logickém rozlišení (LW × LH) a v bitmapě téhož rozlišení, takže změna velikosti
+    okna jen přeškáluje hotové vrstvy (bez toDataURL). Podklad se dekóduje a zmenší jednou
+    (createImageBitmap), export PNG skládá a kóduje worker s OffscreenCanvas.
+    Tlačítko "Poklad" vloží jako podklad poslední fotku z bodu 3).
     """
     fname = f"sketch_{rid}.png"
     html = r"""
@@ -156,14 +192,14 @@ def _build_sketch_html(
       .sk-toolbar input[type=color]{ height:44px; width:44px; padding:0; border:none; }
       .sk-toolbar input[type=checkbox]{ transform:scale(1.4); margin-right:.35rem; }
 
-      /* Plátno – stage vždy 100 % šířka rodiče */
+      /* Plátno – stage vždy 100 % šířka rodiče, vrstvy přes sebe */
       .sk-stage {
         position: relative; width: 100%;
-        border:1px solid #444; border-radius:8px; background:#fff; overflow:hidden;
+        border:1px solid #444; border-radius:8px; background:#eee; overflow:hidden;
         touch-action:none;
       }
-      canvas.sk-draw, canvas.sk-grid { position:absolute; inset:0; display:block; width:100%; height:100%; }
-      canvas.sk-grid { pointer-events:none; }
+      canvas.sk-layer { position:absolute; inset:0; display:block; width:100%; height:100%; }
+      canvas.sk-bg, canvas.sk-grid { pointer-events:none; }
 
       /* Širší rozhraní pro prsty */
       @media (pointer:coarse){
@@ -204,8 +240,9 @@ def _build_sketch_html(
       </div>
 
       <div id="skStage" class="sk-stage">
-        <canvas id="skCanvas" class="sk-draw"></canvas>
-        <canvas id="skGrid" class="sk-grid"></canvas>
+        <canvas id="skBg" class="sk-layer sk-bg"></canvas>
+        <canvas id="skInk" class="sk-layer sk-ink"></canvas>
+        <canvas id="skGrid" class="sk-layer sk-grid"></canvas>
       </div>
       <div id='skHint' style='color:#888;margin-top:6px'>
         Kresli myší/stylusem. Změna nástrojů nemá vliv na již nakreslené.
@@ -215,19 +252,23 @@ def _build_sketch_html(
     <script>
     (function(){
       const RID = '[[RID]]';
-      const storageKey = 'sketch_'+RID;
+      const storageKey = 'sketch_v2_'+RID;
+      const legacyKey = 'sketch_'+RID;          // dřívější formát – PNG v data URL
       const BG_DATA  = '[[BG]]';
       const SHOW_GRID = [[GRID_ON]];
       const GRID_STEP = [[GRID_STEP]];
       const DOWNLOAD_NAME = '[[FILENAME]]';
       const PHOTO_DATA = '[[PHOTO]]';
+      const LW = 1600, LH = 1200;               // logické rozlišení kresby (4:3)
 
       const root = document.getElementById('skRoot');
       const toolbar = document.getElementById('skToolbar');
       const stage = document.getElementById('skStage');
-      const canvas = document.getElementById('skCanvas');
+      const bgCv = document.getElementById('skBg');
+      const inkView = document.getElementById('skInk');
       const gridCv = document.getElementById('skGrid');
-      const ctx = canvas.getContext('2d');
+      const btx = bgCv.getContext('2d');
+      const vtx = inkView.getContext('2d');
       const gtx = gridCv.getContext('2d');
 
       const elT = document.getElementById('skThickness');
@@ -240,9 +281,17 @@ def _build_sketch_html(
       const elFS = document.getElementById('skFS');
       const elPhoto = document.getElementById('skInsertPhoto');
 
-      let drawing=false, lastX=0, lastY=0;
-      let undoStack=[], redoStack=[];
-      let bgImg = null;
+      // Kresba v logických souřadnicích: tahy + bitmapa LW×LH, do které se tahy promítají
+      function makeCanvas(w, h){
+        if (typeof OffscreenCanvas !== 'undefined') return new OffscreenCanvas(w, h);
+        const c = document.createElement('canvas'); c.width = w; c.height = h; return c;
+      }
+      const inkCv = makeCanvas(LW, LH);
+      const itx = inkCv.getContext('2d');
+      let strokes = [], redoStack = [], current = null;
+      let legacyInk = null;                      // obrázek ze starého formátu jako základ kresby
+      let bgBmp = null;
+      let view = {s:1, ox:0, oy:0, w:0, h:0, r:1};
 
       function dpr(){ return window.devicePixelRatio || 1; }
       function isFullscreen(){ return document.fullscreenElement && (document.fullscreenElement===root || root.contains(document.fullscreenElement)); }
@@ -259,124 +308,218 @@ def _build_sketch_html(
           const toolH = (toolbar?.offsetHeight || 0);
           h = Math.max(320, window.innerHeight - toolH - 8);
         } else {
-          h = Math.max(480, Math.min(window.innerHeight - 220, 1600));
+          h = Math.max(320, Math.min(Math.round(w * LH / LW), Math.max(480, window.innerHeight - 220)));
         }
         return {w, h};
       }
 
-      function clearCanvas(){
-        const {w,h} = targetSizes();
-        ctx.fillStyle = '#FFFFFF';
-        ctx.fillRect(0,0,w,h);
-      }
-      function drawBG(){
-        const {w,h} = targetSizes();
-        if (bgImg){ try { ctx.drawImage(bgImg, 0,0, w,h); } catch(e){} }
+      // Logické souřadnice -> obrazovka (list papíru vycentrovaný v ploše)
+      function applyView(g){ const k = view.r * view.s; g.setTransform(k,0,0,k, view.r*view.ox, view.r*view.oy); }
+
+      // ---------- vrstvy ----------
+      function drawBgLayer(){
+        btx.setTransform(1,0,0,1,0,0); btx.clearRect(0,0,bgCv.width,bgCv.height);
+        applyView(btx);
+        btx.fillStyle = '#FFFFFF'; btx.fillRect(0,0,LW,LH);
+        if (bgBmp){ try { btx.drawImage(bgBmp, 0,0, LW,LH); } catch(e){} }
       }
-      function drawGrid(){
-        const {w,h} = targetSizes();
-        gtx.clearRect(0,0,w,h);
+      function drawGridLayer(){
+        gtx.setTransform(1,0,0,1,0,0); gtx.clearRect(0,0,gridCv.width,gridCv.height);
         if (!SHOW_GRID) return;
-        gtx.save(); gtx.strokeStyle = '#e0e0e0'; gtx.lineWidth = 1; gtx.beginPath();
-        for(let x=GRID_STEP; x<w; x+=GRID_STEP){ gtx.moveTo(x,0); gtx.lineTo(x,h); }
-        for(let y=GRID_STEP; y<h; y+=GRID_STEP){ gtx.moveTo(0,y); gtx.lineTo(w,y); }
-        gtx.stroke(); gtx.restore();
+        applyView(gtx);
+        gtx.strokeStyle = '#e0e0e0'; gtx.lineWidth = 1 / view.s; gtx.beginPath();
+        for(let x=GRID_STEP; x<LW; x+=GRID_STEP){ gtx.moveTo(x,0); gtx.lineTo(x,LH); }
+        for(let y=GRID_STEP; y<LH; y+=GRID_STEP){ gtx.moveTo(0,y); gtx.lineTo(LW,y); }
+        gtx.stroke();
+      }
+      function blitInk(){
+        vtx.setTransform(1,0,0,1,0,0); vtx.clearRect(0,0,inkView.width,inkView.height);
+        applyView(vtx);
+        vtx.drawImage(inkCv, 0,0);
+      }
+
+      // ---------- tahy ----------
+      function strokeStyle(g, st){
+        g.lineCap='round'; g.lineJoin='round'; g.lineWidth=st.w;
+        g.globalCompositeOperation = st.e ? 'destination-out' : 'source-over';
+        g.strokeStyle = st.e ? '#000' : st.c;
+      }
+      function drawStroke(g, st, from){
+        const p = st.p;
+        if (st.k === 'clear'){ g.save(); g.setTransform(1,0,0,1,0,0); g.clearRect(0,0,g.canvas.width,g.canvas.height); g.restore(); return; }
+        strokeStyle(g, st);
+        g.beginPath();
+        const i0 = Math.max(0, (from||0) - 2);
+        g.moveTo(p[i0], p[i0+1]);
+        if (p.length <= 2) g.lineTo(p[0]+0.01, p[1]);   // tečka
+        for (let i=i0+2; i<p.length; i+=2) g.lineTo(p[i], p[i+1]);
+        g.stroke();
+        g.globalCompositeOperation = 'source-over';
+      }
+      function rebuildInk(){
+        itx.setTransform(1,0,0,1,0,0); itx.clearRect(0,0,LW,LH);
+        let start = 0;
+        for (let i=strokes.length-1; i>=0; i--) if (strokes[i].k === 'clear'){ start = i+1; break; }
+        if (start === 0 && legacyInk){
+          // starý obrázek měl poměr stran podle okna – vložit bez deformace, vycentrovaný
+          const iw = legacyInk.width, ih = legacyInk.height, k = Math.min(LW / iw, LH / ih);
+          try { itx.drawImage(legacyInk, (LW - iw*k)/2, (LH - ih*k)/2, iw*k, ih*k); } catch(e){}
+        }
+        for (let i=start; i<strokes.length; i++) drawStroke(itx, strokes[i]);
+        blitInk();
       }
 
-      function saveLocal(){ try { localStorage.setItem(storageKey, canvas.toDataURL('image/png')); } catch(e){} }
-      function snapshot(){ try { return canvas.toDataURL('image/png'); } catch(e){ return null; } }
-      function restoreFrom(dataUrl, cb){
-        if (!dataUrl) { if (cb) cb(); return; }
-        const img = new Image();
-        img.onload = ()=>{ 
-          const {w,h} = targetSizes();
-          ctx.drawImage(img, 0,0, w,h);
-          if (cb) cb();
-        };
-        img.src = dataUrl;
+      // ---------- uložení v prohlížeči (tahy jako JSON, ukládá se v nečinnosti) ----------
+      let saveTimer = null;
+      function saveLocal(){
+        if (saveTimer) return;
+        const idle = window.requestIdleCallback || ((fn)=>setTimeout(fn, 200));
+        saveTimer = idle(()=>{
+          saveTimer = null;
+          try { localStorage.setItem(storageKey, JSON.stringify({v:2, strokes})); } catch(e){}
+        });
       }
 
-      function setCanvasSize(preserve=true){
-        const keep = preserve ? snapshot() : null;
+      // ---------- velikost – jen přeškálování hotových vrstev ----------
+      function layout(){
         const {w, h} = targetSizes();
         const r = dpr();
-
+        const s = Math.min(w / LW, h / LH);
+        view = {s, ox:(w - LW*s)/2, oy:(h - LH*s)/2, w, h, r};
         stage.style.width = w + 'px';
         stage.style.height = h + 'px';
-
-        [canvas, gridCv].forEach(cv=>{
+        [bgCv, inkView, gridCv].forEach(cv=>{
           cv.style.width = w + 'px';
           cv.style.height = h + 'px';
           cv.width  = Math.floor(w * r);
           cv.height = Math.floor(h * r);
         });
-
-        ctx.setTransform(r,0,0,r,0,0);
-        gtx.setTransform(r,0,0,r,0,0);
-
-        clearCanvas();
-        drawBG();
-        restoreFrom(keep, ()=>{ drawGrid(); });
+        drawBgLayer(); blitInk(); drawGridLayer();
+      }
+      let layoutPending = false;
+      function scheduleLayout(){
+        if (layoutPending) return;
+        layoutPending = true;
+        requestAnimationFrame(()=>{ layoutPending = false; layout(); });
       }
 
-      function styleFromUI(){
-        const width = parseInt(elT.value||'4');
-        const eraser = !!elE.checked;
-        ctx.lineCap='round'; ctx.lineJoin='round'; ctx.lineWidth=width;
-        ctx.strokeStyle = eraser ? '#FFFFFF' : (elC.value||'#000000');
+      // ---------- podklad: dekódování a zmenšení mimo hlavní vlákno ----------
+      async function loadBitmap(dataUrl, resize = true){
+        try {
+          const blob = await (await fetch(dataUrl)).blob();
+          return await createImageBitmap(blob, resize ? {resizeWidth: LW, resizeHeight: LH, resizeQuality: 'medium'} : {});
+        } catch(e){
+          return await new Promise((ok)=>{ const img = new Image(); img.onload = ()=>ok(img); img.onerror = ()=>ok(null); img.src = dataUrl; });
+        }
       }
-      function pos(e){
-        const rect = canvas.getBoundingClientRect();
-        const p = (e.pointerType) ? e : (e.touches && e.touches[0] ? e.touches[0] : e);
-        return [p.clientX - rect.left, p.clientY - rect.top];
+      async function setBackground(dataUrl){
+        const bmp = await loadBitmap(dataUrl);
+        if (!bmp) return;
+        if (bgBmp && bgBmp.close) bgBmp.close();
+        bgBmp = bmp; drawBgLayer();
       }
 
-      function start(e){ drawing=true; styleFromUI(); const p=pos(e); lastX=p[0]; lastY=p[1]; ctx.beginPath(); ctx.moveTo(lastX,lastY); e.preventDefault(); }
-      function move(e){ if(!drawing) return; const p=pos(e); ctx.lineTo(p[0],p[1]); ctx.stroke(); lastX=p[0]; lastY=p[1]; e.preventDefault(); }
-      function end(){ if(!drawing) return; drawing=false; ctx.closePath(); pushUndo(); saveLocal(); }
+      // ---------- kreslení ----------
+      function pos(e){
+        const rect = inkView.getBoundingClientRect();
+        return [Math.round((e.clientX - rect.left - view.ox) / view.s * 2) / 2,
+                Math.round((e.clientY - rect.top - view.oy) / view.s * 2) / 2];
+      }
+      function start(e){
+        const p = pos(e);
+        current = {c: elC.value || '#000000', w: Math.max(0.5, parseInt(elT.value||'4') / view.s), e: !!elE.checked, p: [p[0], p[1]]};
+        drawStroke(itx, current); blitInk();
+        e.preventDefault();
+      }
+      function move(e){
+        if (!current) return;
+        const from = current.p.length;
+        const evs = (e.getCoalescedEvents && e.getCoalescedEvents().length) ? e.getCoalescedEvents() : [e];
+        for (const ev of evs){ const p = pos(ev); current.p.push(p[0], p[1]); }
+        // Do bitmapy i na obrazovku jen nový úsek tahu
+        drawStroke(itx, current, from);
+        applyView(vtx); drawStroke(vtx, current, from);
+        e.preventDefault();
+      }
+      function end(){
+        if (!current) return;
+        strokes.push(current); current = null; redoStack = [];
+        blitInk();                              // guma: obrazovka = přesná bitmapa
+        saveLocal();
+      }
 
-      function pushUndo(){ try { undoStack.push(canvas.toDataURL('image/png')); if (undoStack.length>50) undoStack.shift(); } catch(e){}; redoStack=[]; }
+      // ---------- export: skládání a PNG v workeru ----------
+      let worker = null;
+      function exportWorker(){
+        if (worker !== null) return worker;
+        try {
+          if (typeof OffscreenCanvas === 'undefined') throw 0;
+          const src = "self.onmessage = async (ev) => {" +
+            "const d = ev.data; const oc = new OffscreenCanvas(d.w, d.h); const g = oc.getContext('2d');" +
+            "g.fillStyle = '#FFFFFF'; g.fillRect(0, 0, d.w, d.h);" +
+            "if (d.bg) { g.drawImage(d.bg, 0, 0, d.w, d.h); d.bg.close(); }" +
+            "g.drawImage(d.ink, 0, 0); d.ink.close();" +
+            "self.postMessage(await oc.convertToBlob({type: 'image/png'}));};";
+          worker = new Worker(URL.createObjectURL(new Blob([src], {type: 'text/javascript'})));
+        } catch(e){ worker = false; }
+        return worker;
+      }
+      function download(blob){
+        const a = document.createElement('a');
+        a.download = DOWNLOAD_NAME; a.href = URL.createObjectURL(blob); a.click();
+        setTimeout(()=>URL.revokeObjectURL(a.href), 10000);
+      }
+      async function exportPng(){
+        const w = exportWorker();
+        if (w){
+          const ink = await createImageBitmap(inkCv);
+          const bg = bgBmp ? await createImageBitmap(bgBmp) : null;
+          w.onmessage = (ev)=>download(ev.data);
+          w.postMessage({w: LW, h: LH, ink, bg}, bg ? [ink, bg] : [ink]);
+          return;
+        }
+        const c = document.createElement('canvas'); c.width = LW; c.height = LH;
+        const g = c.getContext('2d');
+        g.fillStyle = '#FFFFFF'; g.fillRect(0,0,LW,LH);
+        if (bgBmp) g.drawImage(bgBmp, 0,0, LW,LH);
+        g.drawImage(inkCv, 0,0);
+        c.toBlob(download, 'image/png');
+      }
 
       // Ovládací prvky
-      elClear.onclick = ()=>{ pushUndo(); clearCanvas(); drawBG(); drawGrid(); saveLocal(); };
-      elUndo.onclick = ()=>{ if(undoStack.length){ const d=undoStack.pop(); redoStack.push(canvas.toDataURL('image/png')); clearCanvas(); drawBG(); restoreFrom(d, ()=>{ drawGrid(); saveLocal(); }); } };
-      elRedo.onclick = ()=>{ if(redoStack.length){ const d=redoStack.pop(); undoStack.push(canvas.toDataURL('image/png')); clearCanvas(); drawBG(); restoreFrom(d, ()=>{ drawGrid(); saveLocal(); }); } };
-      elDL.onclick   = ()=>{ const a=document.createElement('a'); a.download=DOWNLOAD_NAME; a.href=canvas.toDataURL('image/png'); a.click(); };
+      elClear.onclick = ()=>{ strokes.push({k:'clear'}); redoStack = []; rebuildInk(); saveLocal(); };
+      elUndo.onclick = ()=>{ if(strokes.length){ redoStack.push(strokes.pop()); rebuildInk(); saveLocal(); } };
+      elRedo.onclick = ()=>{ if(redoStack.length){ strokes.push(redoStack.pop()); rebuildInk(); saveLocal(); } };
+      elDL.onclick   = ()=>{ exportPng(); };
       elFS.onclick   = ()=>{ if (root.requestFullscreen) root.requestFullscreen(); };
       elPhoto.onclick = ()=>{
         if (!PHOTO_DATA){ alert('Žádná fotografie z bodu 3) zatím není k dispozici.'); return; }
-        const img = new Image();
-        img.onload = ()=>{ bgImg = img; setCanvasSize(false); saveLocal(); };
-        img.src = PHOTO_DATA;
+        setBackground(PHOTO_DATA);
       };
 
-      // Resize & fullscreen změny – vždy zachovat kresbu
-      window.addEventListener('resize', ()=>setCanvasSize(true));
-      document.addEventListener('fullscreenchange', ()=>setCanvasSize(true));
+      // Resize & fullscreen – nejvýš jednou za snímek, kresba zůstává v bitmapě
+      window.addEventListener('resize', scheduleLayout);
+      document.addEventListener('fullscreenchange', scheduleLayout);
 
       // Jednotné pointer události (myš/pero/dotyk)
-      canvas.addEventListener('pointerdown', (e)=>{ start(e); if (canvas.setPointerCapture) canvas.setPointerCapture(e.pointerId); });
-      canvas.addEventListener('pointermove', (e)=>{ move(e); });
+      inkView.addEventListener('pointerdown', (e)=>{ start(e); if (inkView.setPointerCapture) inkView.setPointerCapture(e.pointerId); });
+      inkView.addEventListener('pointermove', (e)=>{ move(e); });
       window.addEventListener('pointerup', ()=>end());
       window.addEventListener('pointercancel', ()=>end());
-      canvas.addEventListener('pointerleave', ()=>end());
-
-      // Načti podklad z uploaderu (1)
-      if (BG_DATA){
-        const img = new Image();
-        img.onload = ()=>{ bgImg = img; setCanvasSize(false); };
-        img.src = BG_DATA;
-      } else {
-        setCanvasSize(false);
-      }
+      inkView.addEventListener('pointerleave', ()=>end());
 
-      // Obnov z localStorage
+      layout();
+      if (BG_DATA) setBackground(BG_DATA);
+
+      // Obnov z localStorage: tahy (nový formát) nad obrázkem ze starého formátu, pokud existuje.
+      // Starý klíč se nemaže – obrázek se ukládá jen tam, tahy jsou nad ním.
       (function(){
-        const d = localStorage.getItem(storageKey);
-        if (d){
-          restoreFrom(d, ()=>{ drawGrid(); });
-          try { undoStack.push(d); } catch(e){}
-        }
+        try {
+          const d = JSON.parse(localStorage.getItem(storageKey) || 'null');
+          if (d && Array.isArray(d.strokes)){ strokes = d.strokes; rebuildInk(); }
+        } catch(e){}
+        const old = localStorage.getItem(legacyKey);
+        if (old){ loadBitmap(old, false).then((bmp)=>{ legacyInk = bmp; rebuildInk(); }); }
       })();
 
     })();
@@ -0,0 +1,238 @@
+from __future__ import annotations
+import json
+import os
+import secrets
+import socket
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import unquote, urlparse
+from . import metrics
+
+# Sdílený stav mezi replikami aplikace (víc procesů Streamlitu za load balancerem):
+#  - přihlášené relace (token v úložišti prohlížeče, po přepojení na jinou repliku se relace
+#    obnoví; platnost je pevná od přihlášení, neprodlužuje se),
+#  - verze dat pro zneplatnění cache (uživatelé, reporty) napříč replikami,
+#  - zámky úprav reportu (kdo má report právě otevřený k úpravám).
+# ZPP_SHARED_URL=redis://[:heslo@]host:6379/0 -> server s protokolem Redis (RESP2);
+# bez proměnné se stav drží v paměti procesu (jediná replika). Pro zkoušky slouží
+# python -m bench.resp_server. Výpadek serveru aplikaci neshodí – operace vrátí výchozí
+# hodnotu (zámky se pak neuplatní) a započte se zpp_shared_errors_total.
+PREFIX = "zpp:"
+SESSION_TTL_S = int(os.environ.get("ZPP_SESSION_TTL_S", str(12 * 3600)))
+LOCK_TTL_S = 120
+
+class RespError(Exception):
+    pass
+
+class MemoryBackend:
+    """Úložiště v paměti procesu se stejným rozhraním jako RespBackend."""
+    def __init__(self):
+        self._data: Dict[str, Tuple[str, Optional[float]]] = {}
+        self._lock = threading.Lock()
+
+    def _live(self, key: str) -> Optional[str]:
+        hit = self._data.get(key)
+        if hit and hit[1] is not None and hit[1] <= time.monotonic():
+            del self._data[key]; return None
+        return hit[0] if hit else None
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock: return self._live(key)
+
+    def set(self, key: str, value: str, ttl_ms: Optional[int] = None, nx: bool = False, xx: bool = False) -> bool:
+        with self._lock:
+            cur = self._live(key)
+            if (nx and cur is not None) or (xx and cur is None): return False
+            self._data[key] = (str(value), time.monotonic() + ttl_ms / 1000 if ttl_ms else None)
+            return True
+
+    def delete(self, key: str) -> int:
+        with self._lock: return int(self._data.pop(key, None) is not None)
+
+    def pexpire(self, key: str, ttl_ms: int) -> bool:
+        with self._lock:
+            cur = self._live(key)
+            if cur is None: return False
+            self._data[key] = (cur, time.monotonic() + ttl_ms / 1000)
+            return True
+
+    def pttl(self, key: str) -> int:
+        with self._lock:
+            if self._live(key) is None: return -2
+            exp = self._data[key][1]
+            return -1 if exp is None else max(0, int((exp - time.monotonic()) * 1000))
+
+class RespBackend:
+    """Minimální klient protokolu Redis (RESP2); jedno spojení na vlákno."""
+    def __init__(self, url: str, timeout: float = 2.0):
+        u = urlparse(url)
+        self.host, self.port = u.hostname or "127.0.0.1", u.port or 6379
+        self.password = unquote(u.password) if u.password else None
+        self.db = int((u.path or "/0").lstrip("/") or 0)
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._local.conn = (sock, sock.makefile("rb"))
+        if self.password: self._call("AUTH", self.password)
+        if self.db: self._call("SELECT", self.db)
+        return self._local.conn
+
+    def _close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        self._local.conn = None
+        if conn:
+            try: conn[1].close(); conn[0].close()
+            except OSError: pass
+
+    def _read(self, f) -> Any:
+        line = f.readline()
+        if not line.endswith(b"\r\n"): raise ConnectionError("spojení se sdíleným úložištěm přerušeno")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+": return rest.decode()
+        if kind == b"-": raise RespError(rest.decode())
+        if kind == b":": return int(rest)
+        if kind == b"$":
+            n = int(rest)
+            if n < 0: return None
+            return f.read(n + 2)[:-2].decode("utf-8")
+        if kind == b"*":
+            n = int(rest)
+            return None if n < 0 else [self._read(f) for _ in range(n)]
+        raise RespError(f"neznámá odpověď {line!r}")
+
+    def _call(self, *args) -> Any:
+        sock, f = getattr(self._local, "conn", None) or self._connect()
+        parts = [str(a).encode("utf-8") for a in args]
+        sock.sendall(b"".join([b"*%d\r\n" % len(parts)] + [b"$%d\r\n%s\r\n" % (len(p), p) for p in parts]))
+        return self._read(f)
+
+    def call(self, *args) -> Any:
+        try: return self._call(*args)
+        except (OSError, ConnectionError):
+            self._close()                       # jeden nový pokus (server restartoval, spojení vypršelo)
+            try: return self._call(*args)
+            except (OSError, ConnectionError): self._close(); raise
+
+    def get(self, key: str) -> Optional[str]:
+        return self.call("GET", key)
+
+    def set(self, key: str, value: str, ttl_ms: Optional[int] = None, nx: bool = False, xx: bool = False) -> bool:
+        args = ["SET", key, value] + (["PX", ttl_ms] if ttl_ms else []) + (["NX"] if nx else []) + (["XX"] if xx else [])
+        return self.call(*args) == "OK"
+
+    def delete(self, key: str) -> int:
+        return self.call("DEL", key)
+
+    def pexpire(self, key: str, ttl_ms: int) -> bool:
+        return self.call("PEXPIRE", key, ttl_ms) == 1
+
+    def pttl(self, key: str) -> int:
+        return self.call("PTTL", key)
+
+_backend = None
+_backend_lock = threading.Lock()
+
+def backend():
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            url = os.environ.get("ZPP_SHARED_URL", "").strip()
+            _backend = RespBackend(url) if url else MemoryBackend()
+        return _backend
+
+def is_shared() -> bool:
+    """True, když backend sdílí stav mezi procesy (RESP); MemoryBackend vidí jen vlastní proces."""
+    return not isinstance(backend(), MemoryBackend)
+
+def configure(b) -> None:
+    """Nastaví backend ručně (kontrolní skripty, více „replik“ v jednom procesu)."""
+    global _backend
+    with _backend_lock: _backend = b
+
+def _safe(default, fn, *args, **kw):
+    try: return fn(*args, **kw)
+    except (OSError, ConnectionError, RespError, ValueError) as e:
+        metrics.inc("zpp_shared_errors_total", doc="Chyby sdíleného úložiště (replik).")
+        metrics.log_event("shared_error", op=getattr(fn, "__name__", "?"), error=str(e))
+        return default
+
+# ---------- relace ----------
+
+def create_session(user: Dict[str, Any], fp: str = "") -> str:
+    """Nová relace; `fp` = otisk klienta (hash User-Agent), obnova jinde než v tomtéž prohlížeči selže."""
+    token = secrets.token_urlsafe(24)
+    _safe(False, backend().set, f"{PREFIX}sess:{token}", json.dumps({"user": user, "state": {}, "fp": fp}),
+          SESSION_TTL_S * 1000)
+    return token
+
+def load_session(token: str) -> Optional[Dict[str, Any]]:
+    """Záznam relace {"user", "state", "fp"}; čtení platnost neprodlužuje."""
+    raw = _safe(None, backend().get, f"{PREFIX}sess:{token}")
+    if not raw: return None
+    try: return json.loads(raw)
+    except ValueError: return None
+
+def save_session(token: str, user: Dict[str, Any], state: Dict[str, Any], fp: str = "") -> None:
+    # Zbývající platnost zůstává – přepis záznamu relaci neprodlouží
+    key = f"{PREFIX}sess:{token}"
+    ttl = _safe(-2, backend().pttl, key)
+    if ttl <= 0: return
+    _safe(False, backend().set, key, json.dumps({"user": user, "state": state, "fp": fp}, default=str), ttl, xx=True)
+
+def drop_session(token: str) -> None:
+    _safe(0, backend().delete, f"{PREFIX}sess:{token}")
+
+# ---------- verze dat (zneplatnění cache) ----------
+
+def bump(ns: str, key: str = "", by: str = "") -> str:
+    """Oznámí ostatním replikám změnu dat. Verze je "<čas>:<kdo změnil>" – relace tak pozná
+    vlastní zápis a cache zahodí jen po cizí změně."""
+    ver = f"{time.time_ns():x}:{by}"
+    _safe(False, backend().set, f"{PREFIX}ver:{ns}:{key}", ver)
+    return ver
+
+def version(ns: str, key: str = "") -> str:
+    return _safe(None, backend().get, f"{PREFIX}ver:{ns}:{key}") or ""
+
+# ---------- zámky úprav ----------
+
+def _lock_key(name: str) -> str:
+    return f"{PREFIX}lock:{name}"
+
+def report_lock(rid: str) -> str:
+    return f"report:{rid}"
+
+def lock_holder(name: str) -> Optional[Dict[str, Any]]:
+    raw = _safe(None, backend().get, _lock_key(name))
+    try: return json.loads(raw) if raw else None
+    except ValueError: return None
+
+def acquire_lock(name: str, owner: str, info: Optional[Dict[str, Any]] = None,
+                 force: bool = False) -> Tuple[Optional[Dict[str, Any]], bool]:
+    """Zamkne (nebo prodlouží vlastní zámek). Vrací (držitel, nově): držitel None = zámek je náš,
+    jinak záznam cizího držitele; nově = zámek jsme právě získali (nebyl náš, mohl vypršet
+    a data se mezitím změnit), ne jen prodloužili."""
+    rec = json.dumps({**(info or {}), "owner": owner, "since": time.strftime("%Y-%m-%dT%H:%M:%S")})
+    b, key = backend(), _lock_key(name)
+    if force:
+        _safe(False, b.set, key, rec, LOCK_TTL_S * 1000); return None, True
+    if _safe(True, b.set, key, rec, LOCK_TTL_S * 1000, nx=True):
+        return None, True
+    holder = lock_holder(name)
+    if holder is None:                      # mezitím vypršel
+        if _safe(True, b.set, key, rec, LOCK_TTL_S * 1000, nx=True): return None, True
+        return lock_holder(name), False
+    if holder.get("owner") == owner:
+        _safe(False, b.pexpire, key, LOCK_TTL_S * 1000)
+        return None, False
+    return holder, False
+
+def release_lock(name: str, owner: str) -> None:
+    # Kontrola a smazání nejsou atomické – zámky jsou poradní (UI), ne ochrana dat
+    holder = lock_holder(name)
+    if holder and holder.get("owner") == owner:
+        _safe(0, backend().delete, _lock_key(name))
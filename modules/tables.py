@@ -0,0 +1,116 @@
+from __future__ import annotations
+import json
+import os
+import unicodedata
+from pathlib import Path
+from typing import Dict, List, Optional
+import pandas as pd
+import streamlit as st
+from .perf import span, timed
+
+# Tabulky PTCH / Iniciátory – hledání bez ohledu na diakritiku a velikost písmen.
+# List se načte jednou za verzi souboru (cache procesu), filtrování, řazení a stránkování
+# běží na serveru a do prohlížeče jde jen aktuální stránka. Výběr sloupců si pamatuje
+# každý uživatel zvlášť (data/users/prefs/<OEČ>.json).
+PTCH_XLSX = "data ptch.xlsx"
+PREFS_DIR = Path("data") / "users" / "prefs"
+PAGE_SIZES = [25, 50, 100, 200]
+
+def normalize_text(text: str) -> str:
+    return "".join(
+        c for c in unicodedata.normalize("NFD", str(text))
+        if unicodedata.category(c) != "Mn"
+    ).lower()
+
+def normalize_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Normalizované texty buněk pro query()."""
+    return df.astype(str).apply(lambda col: col.map(normalize_text))
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def _sheet(path: str, sheet: str, mtime: float) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """(tabulka, normalizované texty buněk) – jednou za verzi souboru, sdílené všemi relacemi."""
+    with span("table.read_excel"):
+        df = pd.read_excel(path, sheet_name=sheet, engine="openpyxl")
+    return df, normalize_frame(df)
+
+def load_sheet(sheet: str, path: str = PTCH_XLSX) -> tuple[pd.DataFrame, pd.DataFrame]:
+    return _sheet(path, sheet, os.path.getmtime(path))
+
+@timed("table.query")
+def query(df: pd.DataFrame, norm: pd.DataFrame, cols: List[str], q_all: str = "", q_col: str = "",
+          col_name: Optional[str] = None, col_filter: Optional[tuple] = None,
+          sort_by: Optional[str] = None, ascending: bool = True) -> pd.Index:
+    """Řádky (index) odpovídající hledání, filtru sloupce a řazení – bez kopírování dat."""
+    mask = pd.Series(True, index=df.index)
+    if q_col and col_name in norm.columns:
+        mask &= norm[col_name].str.contains(normalize_text(q_col), regex=False)
+    elif q_all:
+        qn = normalize_text(q_all)
+        mask &= norm[cols or list(norm.columns)].apply(lambda c: c.str.contains(qn, regex=False)).any(axis=1)
+    if col_filter and col_filter[0] in norm.columns and col_filter[1]:
+        mask &= norm[col_filter[0]].str.contains(normalize_text(col_filter[1]), regex=False)
+    idx = df.index[mask.to_numpy()]
+    if sort_by in df.columns:
+        idx = df.loc[idx, sort_by].sort_values(ascending=ascending, kind="stable", na_position="last").index
+    return idx
+
+def load_prefs(oec: Optional[str]) -> Dict[str, List[str]]:
+    if not oec: return {}
+    try: return json.loads((PREFS_DIR / f"{oec}.json").read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError): return {}
+
+def save_prefs(oec: str, sheet: str, cols: List[str]) -> None:
+    prefs = load_prefs(oec)
+    prefs[sheet] = cols
+    PREFS_DIR.mkdir(parents=True, exist_ok=True)
+    p = PREFS_DIR / f"{oec}.json"
+    tmp = p.with_name(p.name + ".tmp")
+    tmp.write_text(json.dumps(prefs, ensure_ascii=False), encoding="utf-8")
+    tmp.replace(p)
+
+def _render_grid(page: pd.DataFrame) -> None:
+    try:
+        from st_aggrid import AgGrid, GridOptionsBuilder
+    except ImportError:
+        st.dataframe(page, use_container_width=True, height=560, hide_index=True); return
+    gb = GridOptionsBuilder.from_dataframe(page)
+    # Řazení a filtry řeší server nad celou tabulkou – v gridu by platily jen pro stránku
+    gb.configure_default_column(sortable=False, filter=False, resizable=True, wrapText=True, autoHeight=True)
+    AgGrid(page, gridOptions=gb.build(), height=560, fit_columns_on_grid_load=len(page.columns) <= 6,
+           allow_unsafe_jscode=False, reload_data=True)
+
+def render_table(sheet: str, key: str, placeholder: str = "", name_col: str = "Název") -> None:
+    df, norm = load_sheet(sheet)
+    all_cols = list(df.columns)
+    oec = (st.session_state.get("user") or {}).get("oec")
+    saved = [c for c in load_prefs(oec).get(sheet, []) if c in all_cols]
+
+    with st.expander("⚙️ Zobrazení sloupců", expanded=False):
+        cols = st.multiselect("Vyber sloupce", all_cols, default=saved or all_cols, key=f"tbl_cols_{key}")
+        if oec and cols and cols != (saved or all_cols):
+            save_prefs(oec, sheet, cols)
+    cols = cols or all_cols
+
+    st.markdown("#### 🔎 Vyhledávání")
+    c1, c2 = st.columns(2)
+    q_all = c1.text_input("Hledat v celé tabulce", value="", placeholder=placeholder, key=f"tbl_q_{key}")
+    q_name = c2.text_input(f"Hledat jen ve sloupci „{name_col}“", value="", key=f"tbl_qn_{key}")
+    with st.expander("↕️ Řazení a filtr sloupce", expanded=False):
+        f1, f2, f3, f4 = st.columns([2, 1, 2, 2])
+        sort_by = f1.selectbox("Řadit podle", ["—"] + cols, key=f"tbl_sort_{key}")
+        ascending = f2.radio("Směr", ["↑", "↓"], horizontal=True, key=f"tbl_dir_{key}") == "↑"
+        fcol = f3.selectbox("Filtrovat sloupec", ["—"] + cols, key=f"tbl_fcol_{key}")
+        ftext = f4.text_input("obsahuje", value="", key=f"tbl_ftext_{key}")
+
+    idx = query(df, norm, cols, q_all=q_all, q_col=q_name, col_name=name_col,
+                col_filter=(fcol, ftext) if fcol != "—" else None,
+                sort_by=None if sort_by == "—" else sort_by, ascending=ascending)
+
+    p1, p2, p3 = st.columns([1, 1, 3])
+    size = p1.selectbox("Řádků na stránku", PAGE_SIZES, key=f"tbl_size_{key}")
+    pages = max(1, -(-len(idx) // size))
+    if st.session_state.get(f"tbl_page_{key}", 1) > pages:   # po zúžení filtru
+        st.session_state[f"tbl_page_{key}"] = pages
+    page = int(p2.number_input("Stránka", min_value=1, max_value=pages, step=1, key=f"tbl_page_{key}"))
+    p3.caption(f"Nalezeno {len(idx)} z {len(df)} řádků, stránka {page}/{pages}")
+    _render_grid(df.loc[idx[(page - 1) * size: page * size], cols].reset_index(drop=True))